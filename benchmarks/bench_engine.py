@@ -0,0 +1,78 @@
+import pytest
+
+from benchmarks.world import build_world
+from tanks.entity.tank_bot import TankBot
+from tanks.world.state import capture_world, restore_world
+
+
+@pytest.fixture
+def world():
+    return build_world(tanks=200, bots=100, shells=100)
+
+
+def test_find_contacts(benchmark, world):
+    benchmark(world.entity_manager.find_contacts)
+
+
+def test_entity_manager_tick(benchmark, world):
+    benchmark(world.entity_manager.tick, rounds=30)
+
+
+def test_tank_bot_find_nearest_player(benchmark, world):
+    bots = [entity for entity in world.entity_manager.entities.values() if isinstance(entity, TankBot)]
+
+    def find_all():
+        for bot in bots:
+            bot.find_nearest_player()
+
+    benchmark(find_all)
+
+
+def test_world_tick(benchmark, world):
+    benchmark(world.tick, rounds=30)
+
+
+def test_world_tick_with_obstacles(benchmark):
+    world = build_world(tanks=200, bots=100, shells=100, obstacles=0.1)
+    benchmark(world.tick, rounds=30)
+
+
+def test_entity_manager_tick_many_bots(benchmark):
+    # Решения ботов распределяются по тикам в пределах бюджета планировщика
+    world = build_world(tanks=50, bots=500, shells=0)
+    for _ in range(10):
+        world.tick()
+    benchmark(world.entity_manager.tick, rounds=30)
+
+
+def test_world_churn_tick(benchmark):
+    # Все танки стреляют каждый тик: много появлений и удалений за тик
+    world = build_world(tanks=300, bots=0, shells=0)
+    tanks = list(world.entity_manager.entities.values())
+    for tank in tanks:
+        tank.reload_time = 0
+
+    def churn():
+        for tank in tanks:
+            if not tank._removed:
+                tank.shoot()
+        world.tick()
+
+    benchmark(churn, rounds=30)
+
+
+@pytest.fixture
+def snapshot_world():
+    world = build_world(tanks=400, bots=300, shells=300)
+    for _ in range(5):
+        world.tick()
+    return world
+
+
+def test_capture_world(benchmark, snapshot_world):
+    benchmark(capture_world, snapshot_world, 0)
+
+
+def test_restore_world(benchmark, snapshot_world):
+    snapshot = capture_world(snapshot_world, 0)
+    benchmark(restore_world, snapshot_world, snapshot)
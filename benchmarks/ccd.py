@@ -0,0 +1,70 @@
+"""
+Стоимость непрерывной проверки коллизий в расчёте на один снаряд.
+
+Запуск: python -m benchmarks.ccd
+"""
+from __future__ import annotations
+
+import random
+import time
+from math import tau
+
+from tanks.entity.tank import Tank
+from tanks.entity.tank_shell import TankShell
+from tanks.world.world import World
+
+
+def build(tanks: int, shells: int, seed: int = 0) -> World:
+    rng = random.Random(seed)
+    side = max(((tanks + shells) ** 0.5) * 8.0, 50.0)
+    world = World(width=side, height=side)
+    creators = []
+    for _ in range(tanks):
+        tank = Tank(x=rng.uniform(0, side), y=rng.uniform(0, side), world=world)
+        world.add_entity(tank)
+        creators.append(tank)
+
+    for _ in range(shells):
+        shell = TankShell(
+            x=rng.uniform(0, side), y=rng.uniform(0, side), angle=rng.uniform(0, tau),
+            velocity=10.0, world=world, creator=rng.choice(creators),
+        )
+        # Путь за тик, как после движения снаряда
+        shell.prev_x = shell.x - shell.velocity_x * 2
+        shell.prev_y = shell.y - shell.velocity_y * 2
+        world.add_entity(shell)
+    return world
+
+
+def run(tanks: int = 200, shells: int = 1000, repeats: int = 50) -> dict:
+    world = build(tanks, shells)
+    manager = world.entity_manager
+    # Снаряды не переносим в точку касания, чтобы каждый прогон был одинаковым
+    positions = [(shell, shell.x, shell.y) for shell in manager.continuous.values()]
+
+    elapsed = 0.0
+    hits = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        hits = len(manager.find_swept_contacts())
+        elapsed += time.perf_counter() - started
+        for shell, x, y in positions:
+            shell.x = x
+            shell.y = y
+            manager.update_entity(shell)
+
+    return {
+        'shells': shells,
+        'hits': hits,
+        'per_shell_us': elapsed / repeats / shells * 1e6,
+    }
+
+
+def main() -> None:
+    for shells in (100, 1000, 5000):
+        result = run(shells=shells)
+        print(f"{result['shells']:5} shells: {result['per_shell_us']:6.2f} us/shell, {result['hits']} hits per tick")
+
+
+if __name__ == '__main__':
+    main()
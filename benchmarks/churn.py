@@ -0,0 +1,53 @@
+"""
+Пропускная способность при частом появлении и удалении сущностей:
+все танки стреляют каждый тик, снаряды быстро вылетают за границы мира.
+
+Запуск: python -m benchmarks.churn
+"""
+from __future__ import annotations
+
+import random
+import time
+from math import tau
+
+from tanks.entity.tank import Tank
+from tanks.world.world import World
+
+
+def run(tanks: int = 300, ticks: int = 300, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    world = World(width=120.0, height=120.0)
+    shooters = []
+    for _ in range(tanks):
+        tank = Tank(x=rng.uniform(5, 115), y=rng.uniform(5, 115), world=world)
+        tank.angle = rng.uniform(0, tau)
+        tank.reload_time = 0
+        world.add_entity(tank)
+        shooters.append(tank)
+
+    spawned = 0
+    started = time.perf_counter()
+    for _ in range(ticks):
+        for tank in shooters:
+            if not tank._removed:
+                tank.shoot()
+                spawned += 1
+        world.tick()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'ticks_per_sec': ticks / elapsed,
+        'spawns_per_sec': spawned / elapsed,
+        'alive': len(world.entity_manager.entities),
+    }
+
+
+def main() -> None:
+    result = run()
+    print(f"ticks/sec:  {result['ticks_per_sec']:10.1f}")
+    print(f"spawns/sec: {result['spawns_per_sec']:10.0f}")
+    print(f"alive:      {result['alive']:10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Память на сущность и пропускная способность создания снарядов.
+
+Запуск: python -m benchmarks.entities
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+from tanks.entity.tank import Tank
+from tanks.entity.tank_shell import TankShell
+from tanks.world.world import World
+
+
+def bytes_per_entity(factory, count: int = 10_000) -> float:
+    """Средний объём памяти, занимаемый одной сущностью (вместе с её атрибутами)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        entities = [factory() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del entities
+    return (after - before) / count
+
+
+def spawn_throughput(world: World, creator: Tank, count: int = 50_000) -> float:
+    """Сколько снарядов в секунду создаётся, добавляется в мир и удаляется"""
+    started = time.perf_counter()
+    for _ in range(count):
+        shell = TankShell(x=50.0, y=50.0, angle=0.0, velocity=10.0, world=world, creator=creator)
+        world.add_entity(shell)
+        shell.remove()
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    world = World()
+    creator = Tank(x=10.0, y=10.0, world=world)
+
+    tank_bytes = bytes_per_entity(lambda: Tank(x=10.0, y=10.0, world=world))
+    shell_bytes = bytes_per_entity(
+        lambda: TankShell(x=50.0, y=50.0, angle=0.0, velocity=10.0, world=world, creator=creator)
+    )
+    print(f'Tank:      {tank_bytes:8.1f} bytes/entity')
+    print(f'TankShell: {shell_bytes:8.1f} bytes/entity')
+    print(f'spawn:     {spawn_throughput(world, creator):8.0f} shells/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""
+Нагрузочный тест сервера: тысячи имитированных игроков socket.io.
+
+Каждый игрок подключается по websocket (сервер принимает только этот
+транспорт, см. tanks.server.socket_manager), входит в игру, шлёт ввод с
+заданной частотой, подтверждает и применяет снимки мира и периодически
+замеряет время приёма-передачи событием echo. Клиент socket.io здесь
+минимальный - поверх websockets, зависимости uvicorn: нагрузочному тесту
+нужны сотни соединений на процесс без лишних слоёв.
+
+Запуск: python main.py loadtest --clients 1000 --duration 30
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from itertools import count
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import websockets
+
+from benchmarks.world import percentile
+from tanks.network.snapshot import HEADER, apply_snapshot
+
+# Типы пакетов Engine.IO и Socket.IO (протоколы 4 и 5)
+EIO_OPEN, EIO_CLOSE, EIO_PING, EIO_PONG, EIO_MESSAGE = '0', '1', '2', '3', '4'
+SIO_CONNECT, SIO_DISCONNECT, SIO_EVENT, SIO_ACK, SIO_CONNECT_ERROR, SIO_BINARY_EVENT = '012345'
+
+# Сколько последних применённых снимков хранит клиент для дельт
+STATE_HISTORY = 64
+
+
+class SocketIOClient:
+    """
+    Клиент socket.io по websocket с событиями, подтверждениями и бинарными вложениями.
+
+    Параметры:
+    - url: str - адрес сервера (http://host:port)
+    - handlers: dict[str, Callable] - обработчики событий сервера: handler(data)
+    """
+    def __init__(self, url: str, handlers: dict[str, Callable[[Any], None]]) -> None:
+        self.url = url.replace('http', 'ws', 1).rstrip('/') + '/socket.io/?EIO=4&transport=websocket'
+        self.handlers = handlers
+        self.bytes_received = 0
+        self._socket: websockets.ClientConnection | None = None
+        self._acks: dict[int, asyncio.Future] = {}
+        self._ack_ids = count(1)
+        self._reader: asyncio.Task | None = None
+
+    async def connect(self) -> None:
+        self._socket = await websockets.connect(self.url, max_queue=None, compression=None)
+        opened = await self._socket.recv()
+        if not opened.startswith(EIO_OPEN):
+            raise ConnectionError(f'Неожиданный пакет открытия: {opened[:40]!r}')
+        await self._socket.send(EIO_MESSAGE + SIO_CONNECT)
+        while True:
+            reply = await self._socket.recv()
+            if reply.startswith(EIO_PING):
+                await self._socket.send(EIO_PONG)
+                continue
+            if reply.startswith(EIO_MESSAGE + SIO_CONNECT):
+                break
+            if reply.startswith(EIO_MESSAGE + SIO_CONNECT_ERROR):
+                raise ConnectionError(f'Сервер отклонил подключение: {reply[2:80]}')
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._socket is not None:
+            await self._socket.close()
+
+    async def emit(self, event: str, data: Any = None) -> None:
+        await self._socket.send(EIO_MESSAGE + SIO_EVENT + json.dumps([event, data], separators=(',', ':')))
+
+    async def call(self, event: str, data: Any = None) -> Any:
+        """Отправляет событие и ждёт подтверждения сервера"""
+        ack_id = next(self._ack_ids)
+        future = self._acks[ack_id] = asyncio.get_running_loop().create_future()
+        await self._socket.send(
+            EIO_MESSAGE + SIO_EVENT + str(ack_id) + json.dumps([event, data], separators=(',', ':'))
+        )
+        return await future
+
+    async def _read(self) -> None:
+        socket = self._socket
+        binary_event: tuple[str, int] | None = None
+        try:
+            async for message in socket:
+                if isinstance(message, bytes):
+                    # Вложение бинарного события: у событий сервера оно одно - сам снимок
+                    self.bytes_received += len(message)
+                    if binary_event is not None:
+                        self._dispatch(binary_event[0], message)
+                        binary_event = None
+                    continue
+
+                self.bytes_received += len(message)
+                if message == EIO_PING:
+                    await socket.send(EIO_PONG)
+                elif message.startswith(EIO_MESSAGE + SIO_BINARY_EVENT):
+                    header, payload = message[2:].split('-', 1)
+                    binary_event = (json.loads(payload)[0], int(header))
+                elif message.startswith(EIO_MESSAGE + SIO_EVENT):
+                    event, *args = json.loads(message[message.index('['):])
+                    self._dispatch(event, args[0] if args else None)
+                elif message.startswith(EIO_MESSAGE + SIO_ACK):
+                    bracket = message.index('[')
+                    future = self._acks.pop(int(message[2:bracket]), None)
+                    if future is not None and not future.done():
+                        args = json.loads(message[bracket:])
+                        future.set_result(args[0] if args else None)
+                elif message.startswith(EIO_CLOSE) or message.startswith(EIO_MESSAGE + SIO_DISCONNECT):
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self._acks.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Соединение закрыто'))
+
+    def _dispatch(self, event: str, data: Any) -> None:
+        handler = self.handlers.get(event)
+        if handler is not None:
+            handler(data)
+
+
+class SimulatedPlayer:
+    """
+    Имитированный игрок: ввод с частотой input_rate, применение снимков и замеры задержек.
+
+    Параметры:
+    - url: str - адрес сервера
+    - input_rate: float - сообщений ввода в секунду
+    - echo_interval: float - период замера времени приёма-передачи в секундах
+    - rng: random.Random - источник случайности ввода
+    """
+    def __init__(self, url: str, input_rate: float, echo_interval: float, rng: random.Random) -> None:
+        self.input_rate = input_rate
+        self.echo_interval = echo_interval
+        self.rng = rng
+        self.client = SocketIOClient(url, {'snapshot': self.on_snapshot})
+        self.states: dict[int, dict] = {0: {}}
+        self.connect_time: float | None = None
+        self.round_trips: list[float] = []
+        # Тики снимков и время их прихода
+        self.arrivals: list[tuple[int, float]] = []
+        self.snapshots = 0
+        self.inputs = 0
+        self.errors = 0
+        self.started = 0.0
+        self._acks: list[int] = []
+
+    def on_snapshot(self, data: bytes) -> None:
+        arrived = time.perf_counter()
+        try:
+            _, tick, baseline_tick, _, _ = HEADER.unpack_from(data)
+            # Дельта применяется к состоянию её базового тика
+            tick, state = apply_snapshot(self.states.get(baseline_tick, {}), data)
+        except Exception:  # noqa: BLE001 - битый снимок считается ошибкой клиента
+            self.errors += 1
+            return
+        self.arrivals.append((tick, arrived))
+        self.snapshots += 1
+        states = self.states
+        states[tick] = state
+        if len(states) > STATE_HISTORY:
+            del states[min(states)]
+        self._acks.append(tick)
+
+    async def connect(self) -> None:
+        """Подключается и входит в игру"""
+        await self.client.connect()
+        await self.client.call('join')
+
+    async def play(self, until: float) -> None:
+        """Шлёт ввод и замеряет задержки до момента until"""
+        client = self.client
+        rng = self.rng
+        interval = 1.0 / self.input_rate
+        next_echo = time.perf_counter() + rng.uniform(0, self.echo_interval)
+        left = right = 0.0
+        # Случайный сдвиг, чтобы игроки не слали ввод синхронно
+        await asyncio.sleep(rng.uniform(0, interval))
+        while time.perf_counter() < until:
+            # Гусеницы меняются плавно, как при удержании клавиш
+            left = max(-1.0, min(1.0, left + rng.uniform(-0.5, 0.5)))
+            right = max(-1.0, min(1.0, right + rng.uniform(-0.5, 0.5)))
+            self.inputs += 1
+            await client.emit('input', {
+                'seq': self.inputs, 'tracks': [round(left, 2), round(right, 2)], 'shoot': rng.random() < 0.05,
+            })
+            if self._acks:
+                await client.emit('snapshot_ack', max(self._acks))
+                self._acks.clear()
+
+            now = time.perf_counter()
+            if now >= next_echo:
+                next_echo = now + self.echo_interval
+                await client.call('echo', now)
+                self.round_trips.append(time.perf_counter() - now)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - now)))
+
+    def jitters(self, tick_interval: float) -> list[float]:
+        """Отклонения промежутков между приходом снимков от ожидаемых"""
+        result = []
+        for (tick, arrived), (next_tick, next_arrived) in zip(self.arrivals, self.arrivals[1:]):
+            if next_tick > tick:
+                result.append(abs(next_arrived - arrived - (next_tick - tick) * tick_interval))
+        return result
+
+
+async def run_players(url: str, clients: int, duration: float, input_rate: float, echo_interval: float,
+                      connect_concurrency: int, seed: int = 0) -> tuple[list[SimulatedPlayer], list[str], float]:
+    """
+    Запускает игроков против сервера url на duration секунд с начала подключений.
+
+    Возвращает подключившихся игроков, ошибки неподключившихся и
+    длительность фазы подключения в секундах.
+    """
+    rng = random.Random(seed)
+    players = [SimulatedPlayer(url, input_rate, echo_interval, random.Random(rng.random())) for _ in range(clients)]
+    started = time.perf_counter()
+    until = started + duration
+    # Параллельность ограничена только при подключении
+    semaphore = asyncio.Semaphore(connect_concurrency)
+    connected: list[SimulatedPlayer] = []
+    failures: list[str] = []
+    last_connect = started
+
+    async def run(player: SimulatedPlayer) -> None:
+        nonlocal last_connect
+        try:
+            async with semaphore:
+                connect_started = time.perf_counter()
+                await player.connect()
+                last_connect = time.perf_counter()
+                player.connect_time = last_connect - connect_started
+            connected.append(player)
+            player.started = time.perf_counter()
+            await player.play(until)
+        except (OSError, ConnectionError, websockets.WebSocketException) as error:
+            failures.append(type(error).__name__)
+        finally:
+            await player.client.close()
+
+    await asyncio.gather(*(run(player) for player in players))
+    return connected, failures, last_connect - started
+
+
+def parse_metrics(text: str) -> dict[str, list[float]]:
+    """Значения метрик текстового формата Prometheus по именам (метки отбрасываются)"""
+    values: dict[str, list[float]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        values.setdefault(name.split('{', 1)[0], []).append(float(value))
+    return values
+
+
+def server_metrics(url: str) -> dict[str, list[float]]:
+    with urllib.request.urlopen(f'{url.rstrip("/")}/metrics', timeout=10) as response:
+        return parse_metrics(response.read().decode())
+
+
+def build_report(players: list[SimulatedPlayer], failures: list[str], connect_duration: float,
+                 tick_interval: float, before: dict[str, list[float]], after: dict[str, list[float]]) -> dict:
+    """
+    Сводит замеры игроков и метрики сервера до и после теста в отчёт.
+
+    Задержки и отклонения - в миллисекундах, трафик - в байтах в секунду на клиента.
+    """
+    def delta(name: str) -> float:
+        return sum(after.get(name, ())) - sum(before.get(name, ()))
+
+    def spread(values: list[float]) -> dict:
+        if not values:
+            return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+        return {
+            'p50': percentile(values, 0.5) * 1000,
+            'p90': percentile(values, 0.9) * 1000,
+            'p99': percentile(values, 0.99) * 1000,
+            'max': max(values) * 1000,
+        }
+
+    now = time.perf_counter()
+    ticks = delta('tanks_tick_duration_seconds_count')
+    return {
+        'clients': len(players),
+        'failed': len(failures),
+        'failures': dict(sorted({name: failures.count(name) for name in failures}.items())),
+        'connect_rate': len(players) / connect_duration if connect_duration > 0 else 0.0,
+        'connect_ms': spread([player.connect_time for player in players]),
+        'round_trip_ms': spread([value for player in players for value in player.round_trips]),
+        'snapshot_jitter_ms': spread([value for player in players for value in player.jitters(tick_interval)]),
+        'server_ticks': int(ticks),
+        'server_jitter_mean_ms': delta('tanks_tick_jitter_seconds_total') / ticks * 1000 if ticks else 0.0,
+        'server_jitter_max_ms': max(after.get('tanks_tick_jitter_seconds_max', [0.0])) * 1000,
+        'server_overruns': int(delta('tanks_tick_overruns_total')),
+        'server_dropped_ticks': int(delta('tanks_dropped_ticks_total')),
+        'bytes_per_sec': statistics.fmean(
+            player.client.bytes_received / (now - player.started) for player in players
+        ) if players else 0.0,
+        'snapshots_per_sec': statistics.fmean(
+            player.snapshots / (now - player.started) for player in players
+        ) if players else 0.0,
+        'inputs_sent': sum(player.inputs for player in players),
+        'client_errors': sum(player.errors for player in players),
+    }
+
+
+def start_server(port: int, tick_rate: float, workers: int = 0, map_path: str | None = None) -> subprocess.Popen:
+    """Запускает сервер (main.py server) в отдельном процессе и ждёт, пока он начнёт отвечать"""
+    command = [
+        sys.executable, str(Path(__file__).resolve().parent.parent / 'main.py'), 'server', '--release',
+        '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+        '--tick-rate', str(tick_rate), '--workers', str(workers),
+    ]
+    if map_path is not None:
+        command += ['--map', map_path]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30.0
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Сервер завершился с кодом {process.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Сервер не начал отвечать за 30 секунд')
+
+
+def loadtest(clients: int, duration: float, input_rate: float = 20.0, echo_interval: float = 1.0,
+             connect_concurrency: int = 100, tick_rate: float = 60.0, url: str | None = None,
+             port: int = 8090, workers: int = 0, map_path: str | None = None, seed: int = 0) -> dict:
+    """
+    Нагрузочный тест: без url поднимает локальный сервер на port, иначе нагружает уже запущенный.
+
+    tick_rate должен совпадать с частотой тиков сервера: по ней считаются отклонения снимков.
+    """
+    process = None
+    if url is None:
+        process = start_server(port, tick_rate, workers, map_path)
+        url = f'http://127.0.0.1:{port}'
+    try:
+        before = server_metrics(url)
+        players, failures, connect_duration = asyncio.run(
+            run_players(url, clients, duration, input_rate, echo_interval, connect_concurrency, seed)
+        )
+        after = server_metrics(url)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    return build_report(players, failures, connect_duration, 1.0 / tick_rate, before, after)
@@ -0,0 +1,96 @@
+"""
+Подбор 10 000 игроков: время от заявки до матча и стоимость проходов подбора.
+
+Игроки встают в очереди всех режимов разом, комнаты создаются в реестре
+текущего процесса (планировщик не запущен, игры не тикаются). Замер идёт,
+пока подбор собирает полные матчи внутри корзин (рейтинг, задержка), и
+останавливается задолго до skill_widen_after: игроки, которым в их корзине
+не хватило пары, остаются ждать расширения подбора и в замер не попадают.
+
+Запуск: python -m benchmarks.matchmaking
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+
+from benchmarks.world import percentile
+from tanks.game.scheduler import GameScheduler
+from tanks.server.matchmaking import Matchmaker
+from tanks.server.rooms import RoomRegistry
+
+# Сколько проходов подряд без новых матчей считать окончанием подбора в корзинах
+IDLE_PASSES = 10
+
+
+async def _send(sid: str, data: bytes) -> None:
+    pass
+
+
+async def run_async(players: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    rooms = RoomRegistry(GameScheduler(), _send)
+    matchmaker = Matchmaker(rooms)
+    modes = list(matchmaker.match_sizes)
+
+    started = time.perf_counter()
+    waits: list[float] = []
+
+    def matched(future: asyncio.Future) -> None:
+        if not future.cancelled():
+            waits.append(time.perf_counter() - started)
+
+    for index in range(players):
+        future = matchmaker.enqueue(
+            f'player-{index}', mode=rng.choice(modes), skill=rng.gauss(1000, 200), latency=rng.expovariate(1 / 0.06),
+        )
+        future.add_done_callback(matched)
+    enqueued = time.perf_counter() - started
+    await matchmaker.start()
+    idle = 0
+    last = -1
+    while idle < IDLE_PASSES:
+        await asyncio.sleep(matchmaker.interval)
+        matches = sum(stats.matches for stats in matchmaker.stats_by_mode.values())
+        idle = idle + 1 if matches == last else 0
+        last = matches
+    elapsed = time.perf_counter() - started
+    await matchmaker.stop()
+    assert elapsed < matchmaker.skill_widen_after, 'замер дошёл до расширения подбора'
+
+    modes_stats = {mode: stats.as_dict() for mode, stats in matchmaker.stats_by_mode.items()}
+    return {
+        'players': players,
+        'matched': len(waits),
+        'waiting': sum(stats['queued'] for stats in modes_stats.values()),
+        'rooms': len(rooms.rooms),
+        'enqueue_ms': enqueued * 1000,
+        'elapsed_ms': elapsed * 1000,
+        'mean_wait_ms': sum(waits) / len(waits) * 1000,
+        'p99_wait_ms': percentile(waits, 0.99) * 1000,
+        'max_wait_ms': max(waits) * 1000,
+        'modes': modes_stats,
+    }
+
+
+def run(players: int = 10_000, seed: int = 0) -> dict:
+    return asyncio.run(run_async(players, seed))
+
+
+def main() -> None:
+    result = run()
+    print(f"players:   {result['players']} ({result['matched']} matched into {result['rooms']} rooms, "
+          f"{result['waiting']} wait for widening)")
+    print(f"enqueue:   {result['enqueue_ms']:.1f} ms")
+    print(f"settled:   {result['elapsed_ms']:.1f} ms")
+    print(f"wait:      mean {result['mean_wait_ms']:.1f} ms, p99 {result['p99_wait_ms']:.1f} ms, "
+          f"max {result['max_wait_ms']:.1f} ms")
+    for mode, stats in result['modes'].items():
+        mean = stats['wait_total'] / max(stats['matched'], 1) * 1000
+        print(f"{mode:>10}: {stats['matched']:5} matched, {stats['matches']:4} matches, "
+              f"mean {mean:.1f} ms, max {stats['wait_max'] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
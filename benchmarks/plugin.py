@@ -0,0 +1,95 @@
+"""
+Плагин pytest для бенчмарков движка в стиле pytest-benchmark.
+
+Фикстура benchmark измеряет функцию несколько раундов и сравнивает медиану
+с сохранённой базовой линией (baseline.json). Если медиана хуже базовой
+больше чем на --tolerance, тест падает.
+
+Запуск: python main.py bench --suite [--update-baseline]
+"""
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+_results: dict[str, dict] = {}
+
+
+def pytest_addoption(parser) -> None:
+    group = parser.getgroup('benchmarks')
+    group.addoption('--update-baseline', action='store_true', help='Save results as the new baseline')
+    group.addoption('--tolerance', type=float, default=0.5,
+                    help='Allowed slowdown relative to the baseline (0.5 = 50%)')
+
+
+def load_baseline() -> dict[str, dict]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+class Benchmark:
+    """Измеряет функцию rounds раз после warmup прогревочных вызовов"""
+    def __init__(self, name: str, baseline: dict | None, tolerance: float) -> None:
+        self.name = name
+        self.baseline = baseline
+        self.tolerance = tolerance
+
+    def __call__(self, func, *args, rounds: int = 20, warmup: int = 2, **kwargs):
+        for _ in range(warmup):
+            func(*args, **kwargs)
+
+        timings = []
+        result = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+
+        stats = {
+            'median': statistics.median(timings),
+            'min': min(timings),
+            'max': max(timings),
+            'rounds': rounds,
+        }
+        _results[self.name] = stats
+
+        if self.baseline is not None:
+            limit = self.baseline['median'] * (1 + self.tolerance)
+            if stats['median'] > limit:
+                pytest.fail(
+                    f"{self.name}: медиана {stats['median'] * 1000:.3f} мс хуже базовой "
+                    f"{self.baseline['median'] * 1000:.3f} мс больше чем на {self.tolerance:.0%}"
+                )
+        return result
+
+
+@pytest.fixture
+def benchmark(request) -> Benchmark:
+    config = request.config
+    baseline = None if config.getoption('update_baseline') else load_baseline().get(request.node.name)
+    return Benchmark(request.node.name, baseline, config.getoption('tolerance'))
+
+
+def pytest_terminal_summary(terminalreporter, config) -> None:
+    if not _results:
+        return
+
+    baseline = load_baseline()
+    terminalreporter.section('benchmarks')
+    for name, stats in sorted(_results.items()):
+        line = f"{name:<45} median {stats['median'] * 1000:9.3f} ms"
+        if name in baseline:
+            line += f"  (baseline {baseline[name]['median'] * 1000:9.3f} ms)"
+        terminalreporter.write_line(line)
+
+    if config.getoption('update_baseline'):
+        baseline.update(_results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        terminalreporter.write_line(f'baseline saved to {BASELINE_PATH}')
@@ -0,0 +1,74 @@
+"""
+Сценарий с 200 ботами: паузы сборщика мусора с пулом снарядов и без него.
+
+Запуск: python -m benchmarks.pool
+"""
+from __future__ import annotations
+
+import gc
+import random
+import time
+
+from tanks.entity.tank_bot import TankBot
+from tanks.world.world import World
+
+
+class GcTimer:
+    """Суммирует паузы сборщика мусора через gc.callbacks"""
+    def __init__(self) -> None:
+        self.pauses: list[float] = []
+        self._started = 0.0
+
+    def __call__(self, phase: str, info: dict) -> None:
+        if phase == 'start':
+            self._started = time.perf_counter()
+        else:
+            self.pauses.append(time.perf_counter() - self._started)
+
+    def __enter__(self) -> GcTimer:
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        gc.callbacks.remove(self)
+
+
+def run(shell_pool_size: int, bots: int = 200, ticks: int = 600, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    world = World(width=150.0, height=150.0, shell_pool_size=shell_pool_size)
+    for _ in range(bots):
+        bot = TankBot(x=rng.uniform(10, 140), y=rng.uniform(10, 140), world=world)
+        bot.reload_time = 10
+        world.add_entity(bot)
+
+    gc.collect()
+    started = time.perf_counter()
+    with GcTimer() as timer:
+        for _ in range(ticks):
+            world.tick()
+    elapsed = time.perf_counter() - started
+
+    pool = world.entity_manager.shell_pool.stats()
+    return {
+        'elapsed_ms': elapsed * 1000,
+        'gc_collections': len(timer.pauses),
+        'gc_total_ms': sum(timer.pauses) * 1000,
+        'gc_max_ms': max(timer.pauses, default=0.0) * 1000,
+        'shots': pool['hits'] + pool['misses'],
+        **pool,
+    }
+
+
+def main() -> None:
+    for label, size in (('no pool', 0), ('pool', 256)):
+        result = run(size)
+        print(
+            f"{label:>8}: {result['elapsed_ms']:8.1f} ms, shots {result['shots']:5}, "
+            f"hits {result['hits']:5}, misses {result['misses']:5}, "
+            f"gc {result['gc_collections']:4} runs / {result['gc_total_ms']:7.2f} ms "
+            f"(max {result['gc_max_ms']:.3f} ms)"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Размер и время кодирования снимков мира для 100, 1 000 и 10 000 сущностей.
+
+Запуск: python -m benchmarks.snapshot
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from tanks.entity.tank import Tank
+from tanks.network.snapshot import NetworkIdAllocator, capture_state, encode_snapshot
+from tanks.world.world import World
+
+ENTITY_COUNTS = (100, 1_000, 10_000)
+
+
+def build_world(entity_count: int, seed: int = 0) -> World:
+    rng = random.Random(seed)
+    side = (entity_count ** 0.5) * 10.0
+    world = World(width=side, height=side)
+    for _ in range(entity_count):
+        tank = Tank(x=rng.uniform(0, side), y=rng.uniform(0, side), world=world)
+        tank.angle = rng.uniform(0, 6.28)
+        world.add_entity(tank)
+    return world
+
+
+def run(entity_count: int, ticks: int = 30, moving_share: float = 0.2) -> dict:
+    rng = random.Random(entity_count)
+    world = build_world(entity_count)
+    id_allocator = NetworkIdAllocator()
+    tanks = list(world.entity_manager.entities.values())
+
+    started = time.perf_counter()
+    state = capture_state(world, id_allocator)
+    capture_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    keyframe = encode_snapshot(0, state)
+    keyframe_time = time.perf_counter() - started
+
+    delta_sizes = []
+    delta_time = 0.0
+    for tick in range(1, ticks + 1):
+        for tank in rng.sample(tanks, int(len(tanks) * moving_share)):
+            tank.x += rng.uniform(-0.5, 0.5)
+            tank.angle = (tank.angle + 0.1) % 6.28
+        baseline = state
+        state = capture_state(world, id_allocator)
+
+        started = time.perf_counter()
+        delta = encode_snapshot(tick, state, tick - 1, baseline)
+        delta_time += time.perf_counter() - started
+        delta_sizes.append(len(delta))
+
+    return {
+        'entities': entity_count,
+        'capture_ms': capture_time * 1000,
+        'keyframe_bytes': len(keyframe),
+        'keyframe_ms': keyframe_time * 1000,
+        'delta_bytes': sum(delta_sizes) / len(delta_sizes),
+        'delta_ms': delta_time / ticks * 1000,
+    }
+
+
+def main() -> None:
+    print(f"{'entities':>9} {'capture ms':>11} {'keyframe B':>11} {'keyframe ms':>12} {'delta B':>9} {'delta ms':>9}")
+    for entity_count in ENTITY_COUNTS:
+        result = run(entity_count)
+        print(
+            f"{result['entities']:>9} {result['capture_ms']:>11.3f} {result['keyframe_bytes']:>11} "
+            f"{result['keyframe_ms']:>12.3f} {result['delta_bytes']:>9.0f} {result['delta_ms']:>9.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
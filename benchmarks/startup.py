@@ -0,0 +1,129 @@
+"""
+Холодный старт сервера: куда уходит время импорта и когда сервер начинает
+принимать игроков.
+
+Сервер (main.py server) запускается в отдельном процессе runs раз без
+--preload и с ним; замеряется время от запуска процесса до первого
+принятого TCP-соединения, первого HTTP-ответа и входа первого игрока в
+комнату (без --preload на него приходится импорт игровых модулей).
+
+Запуск: python -m benchmarks.startup
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.loadtest import SocketIOClient
+
+MAIN = Path(__file__).resolve().parent.parent / 'main.py'
+
+
+def import_report(module: str = 'tanks.server', top: int = 15) -> dict:
+    """
+    Время импорта module в чистом интерпретаторе (python -X importtime).
+
+    Возвращает общее время и собственное время импорта модулей,
+    сгруппированное по пакетам верхнего уровня, в миллисекундах.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=MAIN.parent, capture_output=True, text=True, check=True,
+    )
+    packages: dict[str, float] = defaultdict(float)
+    modules: list[tuple[float, str]] = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        self_ms = int(self_us) / 1000
+        packages[name.split('.')[0]] += self_ms
+        modules.append((self_ms, name))
+        if name == module:
+            total = int(cumulative_us) / 1000
+    modules.sort(reverse=True)
+    return {
+        'module': module,
+        'total_ms': total,
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+        'modules': {name: self_ms for self_ms, name in modules[:top]},
+    }
+
+
+async def _join(url: str) -> None:
+    client = SocketIOClient(url, {})
+    await client.connect()
+    try:
+        await client.call('join')
+    finally:
+        await client.close()
+
+
+def measure(port: int, preload: bool, map_path: str | None = None, timeout: float = 30.0) -> dict:
+    """Один холодный старт: секунды до первого соединения, HTTP-ответа и входа в игру"""
+    command = [
+        sys.executable, str(MAIN), 'server', '--release', '--host', '127.0.0.1', '--port', str(port),
+        '--log-level', 'warning',
+    ]
+    if map_path is not None:
+        command += ['--map', map_path]
+    if preload:
+        command.append('--preload')
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'Сервер завершился с кодом {process.returncode}')
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'Сервер не начал принимать соединения за {timeout:.0f} секунд')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.005)
+        accepted = time.perf_counter() - started
+        url = f'http://127.0.0.1:{port}'
+        urllib.request.urlopen(f'{url}/', timeout=timeout).close()
+        responded = time.perf_counter() - started
+        asyncio.run(_join(url))
+        joined = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+    return {'accept': accepted, 'http': responded, 'join': joined}
+
+
+def run(runs: int = 5, port: int = 8091, map_path: str | None = None) -> dict:
+    """Медианы замеров measure без --preload ('lazy') и с ним ('preload'), в миллисекундах"""
+    result = {}
+    for preload in (False, True):
+        samples = [measure(port, preload, map_path) for _ in range(runs)]
+        result['preload' if preload else 'lazy'] = {
+            key: statistics.median(sample[key] for sample in samples) * 1000 for key in samples[0]
+        }
+    return result
+
+
+def main() -> None:
+    report = import_report()
+    print(f"import {report['module']}: {report['total_ms']:.1f} ms")
+    for package, self_ms in report['packages'].items():
+        print(f'  {package:>24}: {self_ms:7.1f} ms')
+    for name, timings in run().items():
+        print(f"{name:>8}: accept {timings['accept']:.0f} ms, first response {timings['http']:.0f} ms, "
+              f"first join {timings['join']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
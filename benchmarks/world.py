@@ -0,0 +1,119 @@
+"""
+Безголовый прогон мира: тики в секунду, задержка тика, память и аллокации.
+
+Запуск: python main.py bench --tanks 100 --bots 100 --shells 100 --ticks 300
+"""
+from __future__ import annotations
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from math import tau
+
+from tanks.entity.tank import Tank
+from tanks.entity.tank_bot import TankBot
+from tanks.entity.tank_shell import TankShell
+from tanks.world.tilemap import Tile, TileMap
+from tanks.world.world import World
+
+
+def build_tilemap(side: int, obstacles: float, rng: random.Random) -> TileMap:
+    """Карта со стенами и кирпичами квадратами 4×4, занимающими долю obstacles площади"""
+    tilemap = TileMap(side, side)
+    for _ in range(int(side * side * obstacles / 16)):
+        left, top = rng.randrange(side - 4), rng.randrange(side - 4)
+        kind = rng.choice((Tile.WALL, Tile.BRICK))
+        for ty in range(top, top + 4):
+            for tx in range(left, left + 4):
+                tilemap.set(tx, ty, kind)
+    return tilemap
+
+
+def build_world(tanks: int = 100, bots: int = 100, shells: int = 100, seed: int = 0,
+                vectorized: bool = False, obstacles: float = 0.0) -> World:
+    """
+    Создаёт мир с заданным количеством танков, ботов и снарядов при постоянной плотности.
+
+    При obstacles > 0 в мире есть карта препятствий с такой долей занятых клеток.
+    """
+    rng = random.Random(seed)
+    side = max(((tanks + bots + shells) ** 0.5) * 8.0, 50.0)
+    if obstacles > 0:
+        side = int(side)
+        world = World(vectorized=vectorized, tilemap=build_tilemap(side, obstacles, rng))
+    else:
+        world = World(width=side, height=side, vectorized=vectorized)
+
+    for _ in range(tanks):
+        tank = Tank(x=rng.uniform(0, side), y=rng.uniform(0, side), world=world)
+        tank.angle = rng.uniform(0, tau)
+        tank.set_tracks(left=rng.uniform(-1, 1), right=rng.uniform(-1, 1))
+        world.add_entity(tank)
+
+    for _ in range(bots):
+        world.add_entity(TankBot(x=rng.uniform(0, side), y=rng.uniform(0, side), world=world))
+
+    creators = list(world.entity_manager.entities.values())
+    for _ in range(shells):
+        world.add_entity(TankShell(
+            x=rng.uniform(0, side),
+            y=rng.uniform(0, side),
+            angle=rng.uniform(0, tau),
+            velocity=rng.uniform(0.1, 1.0),
+            world=world,
+            creator=rng.choice(creators) if creators else None,
+        ))
+    return world
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def run_world(world: World, ticks: int) -> dict:
+    """Прогоняет ticks тиков и собирает статистику"""
+    durations = []
+    blocks_before = sys.getallocatedblocks()
+    gc_before = sum(stat['collections'] for stat in gc.get_stats())
+
+    started = time.perf_counter()
+    for _ in range(ticks):
+        tick_started = time.perf_counter()
+        world.tick()
+        durations.append(time.perf_counter() - tick_started)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'ticks': ticks,
+        'entities': len(world.entity_manager.entities),
+        'ticks_per_sec': ticks / elapsed,
+        'p50_ms': percentile(durations, 0.5) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+        # Чистый прирост живых блоков памяти за тик (аллокации минус освобождения)
+        'blocks_per_tick': (sys.getallocatedblocks() - blocks_before) / ticks,
+        'gc_collections': sum(stat['collections'] for stat in gc.get_stats()) - gc_before,
+    }
+
+
+def measure_peak_memory(build, ticks: int) -> int:
+    """Пиковая память (байты) при создании мира и прогоне тиков под tracemalloc"""
+    tracemalloc.start()
+    try:
+        world = build()
+        for _ in range(ticks):
+            world.tick()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(tanks: int, bots: int, shells: int, ticks: int, vectorized: bool = False) -> dict:
+    def build() -> World:
+        return build_world(tanks, bots, shells, vectorized=vectorized)
+
+    result = run_world(build(), ticks)
+    result['peak_memory_kb'] = measure_peak_memory(build, min(ticks, 50)) / 1024
+    return result
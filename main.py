@@ -9,21 +9,68 @@ def cli():
 @click.command(help='Start the server')
 @click.option('--release', is_flag=True, help='Run in release mode')
 @click.option('--log-level', default='info', help='Log level')
-def server(release: bool, log_level: str):
+@click.option('--host', default='0.0.0.0', help='Address to bind')
+@click.option('--port', type=int, default=8080, help='Port to bind')
+@click.option('--tick-rate', type=float, default=None, help='Game ticks per second')
+@click.option('--workers', type=int, default=0, help='Room worker processes (0 - run rooms in-process)')
+@click.option('--profile', is_flag=True, help='Collect tick phase timings (exposed at /metrics)')
+@click.option('--profile-slow-ticks', type=click.Path(file_okay=False), default=None,
+              help='Dump folded stacks of slow ticks into this directory')
+@click.option('--slow-tick-ms', type=float, default=50.0, help='Tick duration considered slow, ms')
+@click.option('--map', 'map_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Obstacle map file for all rooms')
+@click.option('--mode', type=click.Choice(['classic', 'territory', 'apocalypse']), default=None,
+              help='Game mode of all rooms (default: endless game)')
+@click.option('--stats-db', 'stats_path', type=click.Path(dir_okay=False), default=None,
+              help='SQLite database for kills, damage and match results (enables leaderboards)')
+@click.option('--replay-dir', type=click.Path(file_okay=False), default=None,
+              help='Record room matches (inputs, joins and leaves) and save replays into this directory')
+@click.option('--preload', is_flag=True,
+              help='Import game modules and load the map before accepting connections (and before forking workers)')
+def server(release: bool, log_level: str, host: str, port: int, tick_rate: float | None, workers: int, profile: bool,
+           profile_slow_ticks: str | None, slow_tick_ms: float, map_path: str | None, mode: str | None,
+           stats_path: str | None, replay_dir: str | None, preload: bool):
     click.echo('Starting server...')
 
+    import gc
+
+    # Импорт FastAPI и socket.io создаёт много долгоживущих объектов, и сборщик
+    # мусора только зря обходит их во время старта. После создания приложения
+    # они замораживаются: полные сборки их больше не обходят, а страницы с ними
+    # остаются общими с процессами-воркерами после fork
+    gc.disable()
     import uvicorn
     from tanks.server import create_server
 
-    app = create_server(debug=not release)
+    app = create_server(
+        debug=not release, tick_rate=tick_rate, workers=workers, profile=profile,
+        slow_tick_dir=profile_slow_ticks, slow_tick_threshold=slow_tick_ms / 1000, map_path=map_path,
+        mode=mode, preload=preload, stats_path=stats_path, replay_dir=replay_dir,
+    )
+    gc.freeze()
+    gc.enable()
     uvicorn.run(
         app,
-        host='0.0.0.0',
-        port=8080,
+        host=host,
+        port=port,
         log_level=log_level,
     )
 
 
+@click.command(help='Compile a text obstacle map (. empty, # wall, + brick) into the binary map format')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.argument('target', type=click.Path(dir_okay=False))
+@click.option('--tile-size', type=float, default=1.0, help='Tile side in world units')
+def build_map(source: str, target: str, tile_size: float):
+    from tanks.world.tilemap import TileMap
+
+    with open(source) as file:
+        rows = [line.rstrip('\n') for line in file if line.strip()]
+    tilemap = TileMap.from_rows(rows, tile_size)
+    tilemap.save(target)
+    click.echo(f'{target}: {tilemap.width}x{tilemap.height} tiles')
+
+
 @click.command(help='Run the tests')
 @click.option('--enable-warnings', is_flag=True, help='Enable warnings')
 def tests(enable_warnings: bool):
@@ -37,8 +84,97 @@ def tests(enable_warnings: bool):
     pytest.main(args)
 
 
+@click.command(help='Run the headless engine benchmarks')
+@click.option('--tanks', default=100, help='Number of tanks')
+@click.option('--bots', default=100, help='Number of tank bots')
+@click.option('--shells', default=100, help='Number of shells')
+@click.option('--ticks', default=300, help='Number of ticks to simulate')
+@click.option('--vectorized', is_flag=True, help='Use the NumPy physics backend')
+@click.option('--suite', is_flag=True, help='Run the benchmark suite against the stored baseline')
+@click.option('--update-baseline', is_flag=True, help='Store suite results as the new baseline')
+def bench(tanks: int, bots: int, shells: int, ticks: int, vectorized: bool, suite: bool, update_baseline: bool):
+    if suite or update_baseline:
+        click.echo('Running benchmark suite...')
+
+        import pytest
+
+        args = ['-q', '-p', 'benchmarks.plugin', '-o', 'python_files=bench_*.py', 'benchmarks']
+        if update_baseline:
+            args.append('--update-baseline')
+        raise SystemExit(pytest.main(args))
+
+    from benchmarks.world import report
+
+    result = report(tanks, bots, shells, ticks, vectorized=vectorized)
+    click.echo(f"entities:        {result['entities']}")
+    click.echo(f"ticks/sec:       {result['ticks_per_sec']:.1f}")
+    click.echo(f"p50 tick:        {result['p50_ms']:.3f} ms")
+    click.echo(f"p99 tick:        {result['p99_ms']:.3f} ms")
+    click.echo(f"peak memory:     {result['peak_memory_kb']:.0f} KiB")
+    click.echo(f"blocks per tick: {result['blocks_per_tick']:.1f}")
+    click.echo(f"gc collections:  {result['gc_collections']}")
+
+
+@click.command(help='Load-test the server with simulated socket.io players')
+@click.option('--clients', default=1000, help='Number of simulated players')
+@click.option('--duration', type=float, default=30.0, help='Test duration in seconds, connection ramp included')
+@click.option('--input-rate', type=float, default=20.0, help='Input messages per second per player')
+@click.option('--echo-interval', type=float, default=1.0, help='Seconds between round-trip probes per player')
+@click.option('--connect-concurrency', default=100, help='Connections opened in parallel')
+@click.option('--tick-rate', type=float, default=60.0, help='Server ticks per second')
+@click.option('--url', default=None, help='Load an already running server instead of starting one')
+@click.option('--port', type=int, default=8090, help='Port of the locally started server')
+@click.option('--workers', type=int, default=0, help='Room worker processes of the locally started server')
+@click.option('--map', 'map_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Obstacle map file for the locally started server')
+def loadtest(clients: int, duration: float, input_rate: float, echo_interval: float, connect_concurrency: int,
+             tick_rate: float, url: str | None, port: int, workers: int, map_path: str | None):
+    from benchmarks.loadtest import loadtest as run_loadtest
+
+    click.echo(f'Load-testing with {clients} players for {duration:.0f} s...')
+    result = run_loadtest(
+        clients, duration, input_rate=input_rate, echo_interval=echo_interval,
+        connect_concurrency=connect_concurrency, tick_rate=tick_rate, url=url, port=port,
+        workers=workers, map_path=map_path,
+    )
+
+    def spread(values: dict) -> str:
+        return f"p50 {values['p50']:.2f}  p90 {values['p90']:.2f}  p99 {values['p99']:.2f}  max {values['max']:.2f} ms"
+
+    click.echo(f"connected:       {result['clients']} ({result['failed']} failed {result['failures']})")
+    click.echo(f"connect rate:    {result['connect_rate']:.1f} clients/sec")
+    click.echo(f"connect time:    {spread(result['connect_ms'])}")
+    click.echo(f"round trip:      {spread(result['round_trip_ms'])}")
+    click.echo(f"snapshot jitter: {spread(result['snapshot_jitter_ms'])}")
+    click.echo(f"server ticks:    {result['server_ticks']} ({result['server_overruns']} overruns, "
+               f"{result['server_dropped_ticks']} dropped)")
+    click.echo(f"tick jitter:     mean {result['server_jitter_mean_ms']:.2f}  max {result['server_jitter_max_ms']:.2f} ms")
+    click.echo(f"per client:      {result['bytes_per_sec']:.0f} bytes/sec, {result['snapshots_per_sec']:.1f} snapshots/sec")
+    click.echo(f"inputs sent:     {result['inputs_sent']} ({result['client_errors']} client errors)")
+
+
+@click.command(help='Show where server startup goes: import time of a module grouped by package')
+@click.option('--module', default='tanks.server', help='Module to import')
+@click.option('--top', default=15, help='Number of packages and modules to show')
+def import_report(module: str, top: int):
+    from benchmarks.startup import import_report as run_import_report
+
+    report = run_import_report(module, top)
+    click.echo(f"import {report['module']}: {report['total_ms']:.1f} ms")
+    click.echo('by package (self time):')
+    for package, self_ms in report['packages'].items():
+        click.echo(f'  {package:>32}: {self_ms:7.1f} ms')
+    click.echo('slowest modules (self time):')
+    for name, self_ms in report['modules'].items():
+        click.echo(f'  {name:>32}: {self_ms:7.1f} ms')
+
+
 cli.add_command(server)
 cli.add_command(tests)
+cli.add_command(bench)
+cli.add_command(build_map)
+cli.add_command(loadtest)
+cli.add_command(import_report)
 
 if __name__ == '__main__':
     cli()
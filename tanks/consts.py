@@ -0,0 +1,42 @@
+# Частота симуляции игр на сервере (тиков в секунду)
+TICK_RATE = 60.0
+# Сколько тиков подряд отставшая игра может догонять за один проход планировщика
+MAX_CATCH_UP_TICKS = 5
+# Радиус области интереса игрока: дальше сущности клиенту не рассылаются
+INTEREST_RADIUS = 40.0
+# Допустимая частота сообщений ввода одного игрока (в секунду) и размер всплеска
+INPUT_RATE = 120.0
+INPUT_BURST = 30
+# Навигация ботов: раскрытий клеток за тик, предел одного поиска, размер кэша маршрутов
+# и с какого числа ботов на одну цель строить общее поле расстояний
+NAV_BUDGET = 2000
+NAV_SEARCH_LIMIT = 2000
+NAV_CACHE_SIZE = 256
+FLOW_FIELD_AGENTS = 4
+# Решения ботов: сколько ботов решает за тик, и раз в сколько тиков решают боты
+# ближе и дальше INTEREST_RADIUS от своей цели
+AI_THINK_BUDGET = 128
+AI_NEAR_INTERVAL = 1
+AI_FAR_INTERVAL = 10
+# Компенсация задержки: на сколько тиков назад можно откатить цели при попадании
+# (при 60 тиках в секунду - 200 мс)
+LAG_COMPENSATION_TICKS = 12
+# Матчмейкинг: игроков в матче и в турнирной сетке арены дуэлей, рейтинг по умолчанию
+# и ширина корзины рейтинга, границы корзин задержки (секунды), через сколько секунд
+# ожидания игрока подбирают без учёта рейтинга, а затем и задержки, период проходов подбора
+MATCH_SIZE = 8
+DUEL_BRACKET_SIZE = 8
+DEFAULT_SKILL = 1000.0
+SKILL_BUCKET = 100.0
+LATENCY_BUCKETS = (0.05, 0.1, 0.2)
+MATCH_SKILL_WIDEN_AFTER = 8.0
+MATCH_LATENCY_WIDEN_AFTER = 20.0
+MATCH_INTERVAL = 0.05
+# Статистика матчей: период записи событий в базу (секунды), событий в одной транзакции,
+# сколько событий может ждать записи (лишние отбрасываются), время жизни и число
+# записей кэша чтений
+STATS_FLUSH_INTERVAL = 0.5
+STATS_BATCH_SIZE = 1000
+STATS_MAX_PENDING = 100_000
+STATS_CACHE_TTL = 1.0
+STATS_CACHE_SIZE = 1024
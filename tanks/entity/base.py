@@ -4,6 +4,9 @@ import uuid
 from uuid import UUID
 from typing import TYPE_CHECKING
 
+from tanks.entity.typing import EntityId
+from tanks.world.collision import CollisionLayer
+
 if TYPE_CHECKING:
     from tanks.world.base import BaseWorld
 
@@ -12,36 +15,81 @@ class BaseEntity:
     Базовый класс для всех сущностей в игре.
     
     Каждая сущность имеет:
-    - Уникальный идентификатор (uuid)
+    - Целочисленный идентификатор (id), уникальный в пределах мира
+    - UUID для внешних клиентов (uuid), создаётся лениво
     - Позицию в мире (x, y)
     - Ссылку на игровой мир (world)
     - Размер (size) - определяет радиус круглой коллизии сущности
+
+    Сущности используют __slots__. Миксины объявляют пустые __slots__ и
+    перечисляют свои поля в mixin_slots, а конечный класс собирает их в своих
+    __slots__: у нескольких баз с непустыми слотами возник бы конфликт раскладки.
     """
+    __slots__ = ('id', '_uuid', 'x', 'y', 'world', 'size', '_removed')
+
+    # Движение сущности интегрируется пакетно (см. tanks.world.physics)
+    physics_batched: bool = False
+    # Удалённая сущность возвращается в пул мира (см. tanks.world.pool)
+    poolable: bool = False
+    # Сущность попадает в индекс целей / ищет цели через него (см. tanks.world.targeting)
+    targetable: bool = False
+    seeks_targets: bool = False
+    # Слой сущности и слои, с которыми она сталкивается (см. tanks.world.collision)
+    collision_layer: int = CollisionLayer.DEFAULT
+    collision_mask: int = CollisionLayer.ALL
+    # Поля-ссылки на другие сущности: в снимке состояния хранятся как id (см. tanks.world.state)
+    state_refs: tuple[str, ...] = ()
+    # Быстрая сущность: коллизии ищутся по отрезку пути за тик от (prev_x, prev_y)
+    continuous: bool = False
+    # Позиции сущности запоминаются для отката при попаданиях (см. tanks.world.lag)
+    lag_compensated: bool = False
+    # Задержка стрелявшего в тиках: по каким позициям целей проверять попадания
+    lag: int = 0
+
     def __init__(self, x: float, y: float, world: 'BaseWorld', entity_id: UUID | None = None, size: float = 1.0, **kwargs) -> None:
-        self.uuid: UUID = entity_id if entity_id is not None else uuid.uuid4()
+        self.id: EntityId = world.entity_manager.allocate_id()
+        self._uuid: UUID | None = entity_id
         self.x: float = x
         self.y: float = y
         self.world: BaseWorld = world
         self.size: float = size
         self._removed: bool = False
-    
+
+    @property
+    def uuid(self) -> UUID:
+        """UUID сущности для внешних клиентов, создаётся при первом обращении"""
+        if self._uuid is None:
+            self._uuid = uuid.uuid4()
+        return self._uuid
+
     def tick(self) -> None:
-        # Проверяем коллизии со всеми сущностями в мире
-        for entity in self.world.entity_manager.entities.values():
-            if entity.uuid == self.uuid:
-                continue
-                
-            # Вычисляем расстояние между центрами сущностей
-            dx = self.x - entity.x
-            dy = self.y - entity.y
-            distance = (dx * dx + dy * dy) ** 0.5
-            
-            # Проверяем пересечение коллизий
-            if distance < (self.size + entity.size):
-                self.on_collision(entity)
-    
+        # Коллизии проверяются отдельной стадией тика мира (BaseWorld.collide)
+        pass
+
     def on_collision(self, other: BaseEntity) -> None:
-        """Вызывается при столкновении с другой сущностью"""
+        """
+        Вызывается при столкновении с другой сущностью.
+
+        Для каждой пары за тик вызывается один раз у обеих сущностей.
+        """
+        pass
+
+    def collides_with(self, other: BaseEntity) -> bool:
+        """
+        Может ли сущность столкнуться с other.
+
+        Учитывается при непрерывной проверке: из сущностей на пути
+        выбирается ближайшая, с которой столкновение возможно.
+        """
+        return True
+
+    def on_obstacle(self, tx: int, ty: int) -> None:
+        """
+        Вызывается при столкновении со стеной карты (клетка tx, ty).
+
+        К этому моменту мир уже вытолкнул сущность из стены, а быструю
+        сущность перенёс в точку входа в стену.
+        """
         pass
 
     def on_remove(self) -> None:
@@ -70,6 +118,12 @@ class VelocityMixin(BaseEntity):
     - acceleration: float - ускорение при движении
     - friction: float - коэффициент трения (замедление)
     """
+    __slots__ = ()
+    mixin_slots = ('velocity_x', 'velocity_y', 'max_speed', 'acceleration', 'friction', '_physics', '_row')
+
+    # Вид тела для векторизованной физики: free, tracked или ballistic
+    body_kind: str = 'free'
+
     def __init__(self, max_speed: float = 5.0, acceleration: float = 0.5, friction: float = 0.1, **kwargs) -> None:
         super().__init__(**kwargs)
         self.velocity_x: float = 0.0
@@ -81,13 +135,15 @@ class VelocityMixin(BaseEntity):
     def tick(self) -> None:
         """Обновляет позицию на основе скорости"""
         super().tick()
-        self.apply_velocity()
+        if not self.physics_batched:
+            self.apply_velocity()
         
     def apply_velocity(self) -> None:
         """Применяет текущую скорость к позиции"""
         self.x += self.velocity_x
         self.y += self.velocity_y
-        
+        self.world.entity_manager.update_entity(self)
+
         # Применяем трение
         self.velocity_x *= (1 - self.friction)
         self.velocity_y *= (1 - self.friction)
@@ -117,6 +173,9 @@ class RepelMixin(VelocityMixin, BaseEntity):
     Параметры:
     - repel_force: float - сила отталкивания (0 для полной остановки)
     """
+    __slots__ = ()
+    mixin_slots = ('repel_force',)
+
     def __init__(self, repel_force: float = 0.0, **kwargs) -> None:
         super().__init__(**kwargs)
         self.repel_force = repel_force
@@ -124,8 +183,10 @@ class RepelMixin(VelocityMixin, BaseEntity):
     def on_collision(self, other: BaseEntity) -> None:
         """
         При столкновении:
-        - Если repel_force = 0, просто останавливаем движение
-        - Иначе отталкиваем обе сущности в противоположные стороны
+        - Если repel_force = 0, просто останавливаемся
+        - Иначе отталкиваемся от другой сущности
+
+        Другая сущность получает симметричный вызов сама.
         """
         if not isinstance(other, RepelMixin):
             return
@@ -143,15 +204,12 @@ class RepelMixin(VelocityMixin, BaseEntity):
         ny = dy / distance
         
         if self.repel_force == 0:
-            # Просто останавливаем
+            # Просто останавливаемся
             self.velocity_x = 0
             self.velocity_y = 0
-            other.velocity_x = 0 
-            other.velocity_y = 0
         else:
             # Применяем силу отталкивания через ускорение
             self.accelerate(nx * self.repel_force, ny * self.repel_force)
-            other.accelerate(-nx * other.repel_force, -ny * other.repel_force)
 
 class DamageMixin(BaseEntity):
     """
@@ -160,6 +218,9 @@ class DamageMixin(BaseEntity):
     Параметры:
     - damage: int - количество урона, которое сущность может нанести
     """
+    __slots__ = ()
+    mixin_slots = ('damage',)
+
     def __init__(self, damage: int = 10, **kwargs) -> None:
         super().__init__(**kwargs)
         self.damage = damage
@@ -172,12 +233,19 @@ class HealthMixin(BaseEntity):
     Параметры:
     - health: int - количество здоровья сущности
     """
+    __slots__ = ()
+    mixin_slots = ('health',)
+    lag_compensated = True
+
     def __init__(self, health: int = 100, **kwargs) -> None:
         super().__init__(**kwargs)
         self.health = health
     
-    def damage(self, amount: int) -> None:
-        """Наносит урон сущности"""
+    def damage(self, amount: int, source: BaseEntity | None = None) -> None:
+        """Наносит урон сущности; source - кто его нанёс (None - окружение)"""
         self.health -= amount
+        log = self.world.entity_manager.damage_log
+        if log is not None and not self._removed:
+            log.append((self, source, amount, self.health <= 0))
         if self.health <= 0:
             self.remove()
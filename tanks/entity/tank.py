@@ -3,14 +3,24 @@ from __future__ import annotations
 from uuid import UUID
 from typing import TYPE_CHECKING
 from math import sin, cos, pi
+from tanks.consts import LAG_COMPENSATION_TICKS
 from tanks.entity.base import BaseEntity, RepelMixin, VelocityMixin, HealthMixin
-from tanks.entity.tank_shell import TankShell
+from tanks.world.collision import CollisionLayer
 
 if TYPE_CHECKING:
     from tanks.world.base import BaseWorld
 
 
-class Tank(VelocityMixin, RepelMixin, HealthMixin, BaseEntity):
+class Tank(RepelMixin, VelocityMixin, HealthMixin, BaseEntity):
+    __slots__ = (
+        *VelocityMixin.mixin_slots, *RepelMixin.mixin_slots, *HealthMixin.mixin_slots,
+        'angle', 'rotation_speed', 'left_track', 'right_track',
+        'shell_velocity', 'reload_time', 'reload_timer', 'view_lag',
+    )
+    body_kind = 'tracked'
+    collision_layer = CollisionLayer.TANK
+    targetable = True
+
     def __init__(self, x: float, y: float, world: BaseWorld, entity_id: UUID | None = None, size: float = 1.0) -> None:
         super().__init__(x=x, y=y, world=world, entity_id=entity_id, size=size,
                          max_speed=3.0, acceleration=0.3, friction=0.1, repel_force=0.5, health=100)
@@ -21,6 +31,7 @@ class Tank(VelocityMixin, RepelMixin, HealthMixin, BaseEntity):
         self.shell_velocity: float = 10.0  # Скорость снаряда
         self.reload_time: int = 60  # Время перезарядки в тиках
         self.reload_timer: int = 0  # Таймер перезарядки
+        self.view_lag: int = 0  # На сколько тиков отстаёт мир, который видит игрок
 
     def set_tracks(self, left: float, right: float) -> None:
         """
@@ -33,6 +44,16 @@ class Tank(VelocityMixin, RepelMixin, HealthMixin, BaseEntity):
         self.left_track = max(-1.0, min(1.0, left))
         self.right_track = max(-1.0, min(1.0, right))
 
+    def set_view_lag(self, lag: int) -> None:
+        """
+        Устанавливает задержку игрока: его выстрелы проверяются по позициям
+        целей, которые он видел (см. tanks.world.lag)
+
+        Параметры:
+        - lag: int - на сколько тиков мир клиента отстаёт от сервера
+        """
+        self.view_lag = max(0, min(LAG_COMPENSATION_TICKS, int(lag)))
+
     def shoot(self) -> None:
         """Производит выстрел из танка"""
         if self.reload_timer > 0:
@@ -43,25 +64,21 @@ class Tank(VelocityMixin, RepelMixin, HealthMixin, BaseEntity):
         shell_x = self.x + cos(self.angle) * spawn_distance
         shell_y = self.y + sin(self.angle) * spawn_distance
 
-        # Создаем и добавляем снаряд в мир
-        shell = TankShell(
+        # Берём снаряд из пула мира и добавляем его в мир
+        shell = self.world.entity_manager.spawn_shell(
             x=shell_x,
             y=shell_y,
             angle=self.angle,
             velocity=self.shell_velocity,
-            world=self.world,
-            creator=self
+            creator=self,
         )
-        self.world.add_entity(shell)
+        shell.lag = self.view_lag
 
         # Запускаем перезарядку
         self.reload_timer = self.reload_time
 
-    def tick(self) -> None:
-        # Обновляем таймер перезарядки
-        if self.reload_timer > 0:
-            self.reload_timer -= 1
-
+    def apply_tracks(self) -> None:
+        """Поворачивает и ускоряет танк в соответствии со скоростями гусениц"""
         # Вычисляем поворот на основе разницы скоростей гусениц
         rotation = (self.right_track - self.left_track) * self.rotation_speed
         self.angle = (self.angle + rotation) % (2 * pi)
@@ -76,4 +93,12 @@ class Tank(VelocityMixin, RepelMixin, HealthMixin, BaseEntity):
         # Применяем ускорение в нужном направлении
         self.accelerate(direction_x, direction_y)
 
+    def tick(self) -> None:
+        # Обновляем таймер перезарядки
+        if self.reload_timer > 0:
+            self.reload_timer -= 1
+
+        if not self.physics_batched:
+            self.apply_tracks()
+
         super().tick()
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
-from math import atan2, pi, cos, sin
+from math import atan2, inf, pi, cos, sin
 from typing import TYPE_CHECKING
+from tanks.consts import AI_FAR_INTERVAL
 from tanks.entity.tank import Tank
 
 if TYPE_CHECKING:
     from tanks.world.base import BaseWorld
+    from tanks.world.navigation import Route, TilePos
+
+# На сколько клеток может сместиться цель, прежде чем маршрут к ней перестраивается
+ROUTE_GOAL_SLACK = 2
+# Сколько тиков не запрашивать маршрут после неудачного поиска
+ROUTE_RETRY_TICKS = 30
 
 
 class TankBot(Tank):
+    __slots__ = (
+        'target', 'attack_range', 'update_target_interval', 'ticks_since_target_update',
+        'route', 'route_index', 'route_goal', 'route_wait', 'route_cooldown',
+        'heading', 'steering', 'target_angle', 'target_distance', 'think_wait', 'think_interval',
+    )
+    seeks_targets = True
+    state_refs = ('target',)
+
     def __init__(self, x: float, y: float, world: BaseWorld) -> None:
         super().__init__(x=x, y=y, world=world)
         self.target: Tank | None = None
@@ -16,23 +31,109 @@ class TankBot(Tank):
         self.rotation_speed = 0.1  # Скорость поворота
         self.update_target_interval = 10  # Частота обновления цели
         self.ticks_since_target_update = 0
+        # Маршрут в обход препятствий карты: клетки поворотов и номер следующей
+        self.route: Route = ()
+        self.route_index = 0
+        self.route_goal: TilePos | None = None
+        self.route_wait = 0  # Сколько тиков запрос маршрута ждёт бюджета навигации
+        self.route_cooldown = 0
+        # Последнее решение (см. think): куда поворачивать, едет ли бот по маршруту,
+        # угол и расстояние до цели. Между решениями бот только исполняет его
+        self.heading = 0.0
+        self.steering = False
+        self.target_angle = 0.0
+        self.target_distance = inf
+        # Тики с последнего решения и период решений; их назначает AIScheduler.
+        # Начальный сдвиг разносит решения ботов, созданных в один тик, по разным тикам
+        self.think_wait = self.id % AI_FAR_INTERVAL
+        self.think_interval = AI_FAR_INTERVAL
 
     def find_nearest_player(self) -> Tank | None:
-        """Находит ближайшего игрока-танк"""
-        nearest_distance = float('inf')
-        nearest_tank = None
-
-        for entity in self.world.entity_manager.entities.values():
-            if isinstance(entity, Tank) and entity != self:
-                dx = entity.x - self.x
-                dy = entity.y - self.y
-                distance = (dx * dx + dy * dy) ** 0.5
+        """Находит ближайшего игрока-танк через индекс целей мира"""
+        return self.world.entity_manager.nearest_target(self)
+
+    def target_update_due(self) -> bool:
+        """Обновит ли бот цель в ближайшем тике"""
+        return self.ticks_since_target_update + 1 >= self.update_target_interval
+
+    def route_request(self) -> TilePos | None:
+        """
+        Клетка цели, если боту нужен новый маршрут к ней (см. Navigator).
+
+        Маршрут не нужен, если цели нет, она видна напрямую или текущий
+        маршрут ведёт достаточно близко к ней.
+        """
+        target = self.target
+        if target is None or target._removed or self.route_cooldown > 0:
+            return None
+        if self.world.tilemap.raycast(self.x, self.y, target.x, target.y) is None:
+            self.route = ()
+            return None
+
+        goal = self.world.entity_manager.navigator.tile_of(target.x, target.y)
+        if self.route and self.route_goal is not None and \
+           max(abs(goal[0] - self.route_goal[0]), abs(goal[1] - self.route_goal[1])) <= ROUTE_GOAL_SLACK:
+            return None
+        return goal
+
+    def set_route(self, route: Route | None, goal: TilePos) -> None:
+        """Принимает маршрут от навигации; None - пути к цели нет"""
+        if route is None:
+            self.route = ()
+            self.route_cooldown = ROUTE_RETRY_TICKS
+        else:
+            self.route = route
+        self.route_index = 0
+        self.route_goal = goal
+        self.route_wait = 0
+
+    def next_waypoint(self) -> tuple[float, float] | None:
+        """Центр следующей клетки маршрута; пройденные клетки пропускаются"""
+        route = self.route
+        if not route:
+            return None
+        tile_size = self.world.tilemap.tile_size
+        # Танк за тик проезжает больше клетки, поэтому точка считается пройденной с запасом
+        reach_sq = (tile_size * 1.5 + self.max_speed) ** 2
+        while self.route_index < len(route):
+            tx, ty = route[self.route_index]
+            x = (tx + 0.5) * tile_size
+            y = (ty + 0.5) * tile_size
+            if (x - self.x) ** 2 + (y - self.y) ** 2 > reach_sq or self.route_index == len(route) - 1:
+                return x, y
+            self.route_index += 1
+        return None
+
+    def aim_point(self) -> tuple[float, float] | None:
+        """Точка, к которой бот поворачивает: следующая точка маршрута или сама цель"""
+        target = self.target
+        if target is None:
+            return None
+        waypoint = self.next_waypoint()
+        self.steering = waypoint is not None
+        return waypoint or (target.x, target.y)
+
+    def think(self) -> None:
+        """Принимает решение по текущим позициям (то же делает AIScheduler пакетом)"""
+        aim = self.aim_point()
+        if aim is None:
+            return
+        dx = self.target.x - self.x
+        dy = self.target.y - self.y
+        self.decide(atan2(aim[1] - self.y, aim[0] - self.x), atan2(dy, dx), (dx * dx + dy * dy) ** 0.5)
 
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_tank = entity
+    def decide(self, heading: float, target_angle: float, target_distance: float) -> None:
+        """
+        Запоминает решение до следующего раза.
 
-        return nearest_tank
+        Параметры:
+        - heading: float - угол на точку, к которой поворачивать
+        - target_angle: float - угол на цель
+        - target_distance: float - расстояние до цели
+        """
+        self.heading = heading
+        self.target_angle = target_angle
+        self.target_distance = target_distance
 
     def get_angle_to_target(self) -> float:
         """Вычисляет угол до цели"""
@@ -47,15 +148,15 @@ class TankBot(Tank):
         """Поворачивает танк к цели"""
         if not self.target:
             return
+        self.rotate_towards(self.target.x, self.target.y)
 
-        target_angle = self.get_angle_to_target()
-        angle_diff = target_angle - self.angle
+    def rotate_towards(self, x: float, y: float) -> float:
+        """Поворачивает танк к точке (x, y); возвращает оставшийся угол до неё"""
+        return self.turn_to(atan2(y - self.y, x - self.x))
 
-        # Нормализуем разницу углов в диапазон [-pi, pi]
-        while angle_diff > pi:
-            angle_diff -= 2 * pi
-        while angle_diff < -pi:
-            angle_diff += 2 * pi
+    def turn_to(self, angle: float) -> float:
+        """Поворачивает танк к направлению angle; возвращает оставшийся угол до него"""
+        angle_diff = angle_difference(angle, self.angle)
 
         # Поворачиваем в сторону цели
         if abs(angle_diff) > self.rotation_speed:
@@ -63,6 +164,8 @@ class TankBot(Tank):
                 self.angle += self.rotation_speed
             else:
                 self.angle -= self.rotation_speed
+            return abs(angle_diff) - self.rotation_speed
+        return 0.0
 
     def get_distance_to_target(self) -> float:
         """Вычисляет расстояние до цели"""
@@ -77,22 +180,45 @@ class TankBot(Tank):
         # Периодически обновляем цель
         self.ticks_since_target_update += 1
         if self.ticks_since_target_update >= self.update_target_interval:
-            self.target = self.find_nearest_player()
+            target = self.find_nearest_player()
             self.ticks_since_target_update = 0
+            if target is not self.target:
+                # Новая цель: решаем сразу, а период решений планировщик пересчитает в следующем тике
+                self.target = target
+                self.think()
+                self.think_wait = self.think_interval
+        elif self.target is not None and self.target._removed:
+            # Уничтоженная цель больше не преследуется
+            self.target = None
+
+        if self.route_cooldown > 0:
+            self.route_cooldown -= 1
 
         if self.target:
-            # Поворачиваемся к цели
-            self.rotate_to_target()
-
-            distance = self.get_distance_to_target()
+            # Поворачиваемся к цели или, если её закрывают стены, к следующей точке маршрута
+            remaining = self.turn_to(self.heading)
+            if self.steering:
+                # На поворотах маршрута сбрасываем ход, чтобы не вылететь в стену
+                speed = 0.2 if remaining > pi / 4 else 1.0
+                self.set_tracks(left=speed, right=speed)
 
             # Если цель далеко - движемся к ней
-            if distance > self.attack_range:
+            if not self.steering and self.target_distance > self.attack_range:
                 # Устанавливаем одинаковую скорость для обеих гусениц чтобы ехать прямо
                 self.set_tracks(left=1.0, right=1.0)
 
             # Если цель в зоне атаки и мы повернуты к ней - стреляем
-            elif abs(self.get_angle_to_target() - self.angle) < 0.1:
+            elif abs(angle_difference(self.target_angle, self.angle)) < 0.1:
                 self.shoot()
 
         super().tick()
+
+
+def angle_difference(angle: float, base: float) -> float:
+    """Разница углов angle - base, приведённая к диапазону [-pi, pi]"""
+    angle_diff = angle - base
+    while angle_diff > pi:
+        angle_diff -= 2 * pi
+    while angle_diff < -pi:
+        angle_diff += 2 * pi
+    return angle_diff
@@ -4,12 +4,23 @@ from uuid import UUID
 from typing import TYPE_CHECKING
 from math import sin, cos
 from tanks.entity.base import BaseEntity, VelocityMixin, DamageMixin, HealthMixin
+from tanks.world.collision import CollisionLayer
 
 if TYPE_CHECKING:
     from tanks.world.base import BaseWorld
     from tanks.entity.tank import Tank
 
 class TankShell(VelocityMixin, DamageMixin, BaseEntity):
+    __slots__ = (*VelocityMixin.mixin_slots, *DamageMixin.mixin_slots, 'creator', 'prev_x', 'prev_y', 'lag')
+    body_kind = 'ballistic'
+    collision_layer = CollisionLayer.SHELL
+    # Снаряды не сталкиваются друг с другом
+    collision_mask = CollisionLayer.ALL & ~CollisionLayer.SHELL
+    poolable = True
+    state_refs = ('creator',)
+    # За тик снаряд пролетает больше размера танка, поэтому проверяем весь путь
+    continuous = True
+
     def __init__(
         self, 
         x: float, 
@@ -34,27 +45,56 @@ class TankShell(VelocityMixin, DamageMixin, BaseEntity):
         )
         
         self.creator = creator
+        self.prev_x = x
+        self.prev_y = y
+        self.lag = 0  # Задержка стрелявшего в тиках (выставляет Tank.shoot)
         
         # Задаем начальную скорость снаряда
         self.velocity_x = cos(angle) * velocity
         self.velocity_y = sin(angle) * velocity
 
+    def reset(self, x: float, y: float, angle: float, velocity: float, creator: Tank) -> None:
+        """Переинициализирует снаряд из пула для нового выстрела"""
+        self.id = self.world.entity_manager.allocate_id()
+        self._uuid = None
+        self._removed = False
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+        self.max_speed = velocity
+        self.creator = creator
+        self.lag = 0
+        self.velocity_x = cos(angle) * velocity
+        self.velocity_y = sin(angle) * velocity
+
     def tick(self) -> None:
+        # Начало пути за тик для непрерывной проверки коллизий
+        self.prev_x = self.x
+        self.prev_y = self.y
+
         # Снаряд движется прямолинейно с постоянной скоростью
-        self.x += self.velocity_x
-        self.y += self.velocity_y
-        
+        if not self.physics_batched:
+            self.x += self.velocity_x
+            self.y += self.velocity_y
+            self.world.entity_manager.update_entity(self)
+
         super().tick()
         
+    def collides_with(self, other: BaseEntity) -> bool:
+        return other is not self.creator
+
     def on_collision(self, other: BaseEntity) -> None:
         if other == self.creator:
             return
 
         if isinstance(other, HealthMixin):
-            other.damage(self.damage)
+            other.damage(self.damage, self.creator)
             self.remove()
         else:
             self.remove()
 
+    def on_obstacle(self, tx: int, ty: int) -> None:
+        self.world.tilemap.damage(tx, ty)
+        self.remove()
+
     def on_world_boundary(self) -> None:
         self.remove()
@@ -0,0 +1,2 @@
+# Целочисленный идентификатор сущности, уникальный в пределах мира
+EntityId = int
@@ -1,3 +1,6 @@
 class BaseGame:
+    def __init__(self) -> None:
+        self.tick_count = 0  # Номер последнего выполненного тика
+
     def tick(self) -> None:
-        pass
+        self.tick_count += 1
@@ -1,11 +1,36 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from tanks.game.base import BaseGame
+from tanks.game.input import InputManager
 from tanks.world.world import World
 
+if TYPE_CHECKING:
+    from tanks.game.modes import GameMode
+    from tanks.world.profiler import TickProfiler
+    from tanks.world.tilemap import TileMap
+
 class Game(BaseGame):
-    def __init__(self) -> None:
+    def __init__(self, profiler: TickProfiler | None = None, tilemap: TileMap | None = None,
+                 mode: GameMode | None = None) -> None:
         super().__init__()
-        self.world = World()
+        self.world = World(profiler=profiler, tilemap=tilemap)
+        self.inputs = InputManager()
+        # Правила и условие победы (см. tanks.game.modes); None - игра без конца
+        self.mode = mode
+        if mode is not None:
+            mode.attach(self)
 
     def tick(self) -> None:
         super().tick()
+        profiler = self.world.profiler
+        if profiler is not None:
+            profiler.begin()
+        # Ввод игроков, пришедший между тиками, применяется одним пакетом
+        self.inputs.apply(self.tick_count)
+        if profiler is not None:
+            profiler.mark('input')
         self.world.tick()
+        if self.mode is not None:
+            self.mode.update(self.tick_count)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+from tanks.consts import INPUT_BURST, INPUT_RATE
+
+if TYPE_CHECKING:
+    from tanks.entity.tank import Tank
+    from tanks.world.state import ReplayRecorder
+
+# Команда ввода: имя метода танка и его аргументы
+Command = tuple[str, tuple]
+
+
+def parse_input(data: Any) -> tuple[int, int | None, list[Command]]:
+    """
+    Разбирает сообщение клиента вида {'seq': 12, 'view': 340, 'tracks': [1.0, -1.0], 'shoot': true}.
+
+    view - тик снимка, который клиент показывал в момент ввода (необязателен).
+    Возвращает номер последовательности, тик view и команды; при неверном
+    формате бросает ValueError.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Сообщение ввода должно быть объектом')
+    try:
+        seq = int(data['seq'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Нет номера последовательности') from None
+    view = data.get('view')
+    if view is not None:
+        try:
+            view = int(view)
+        except (TypeError, ValueError):
+            raise ValueError('Неверный тик снимка') from None
+
+    commands: list[Command] = []
+    tracks = data.get('tracks')
+    if tracks is not None:
+        try:
+            left, right = (float(value) for value in tracks)
+        except (TypeError, ValueError):
+            raise ValueError('Неверное состояние гусениц') from None
+        commands.append(('set_tracks', (left, right)))
+    if data.get('shoot'):
+        commands.append(('shoot', ()))
+    return seq, view, commands
+
+
+class PlayerInput:
+    """
+    Очередь ввода одного игрока.
+
+    Команды одного вида схлопываются: до начала тика хранится только
+    последнее состояние гусениц и один выстрел, поэтому очередь ограничена
+    числом видов команд. Частота сообщений ограничивается маркерным
+    ведром (token bucket), сообщения с номером не больше уже принятого
+    отбрасываются.
+
+    Параметры:
+    - tank: Tank - танк игрока
+    - rate: float - средняя допустимая частота сообщений в секунду
+    - burst: int - сколько сообщений можно прислать подряд сверх средней частоты
+    - now: float - текущее время
+    """
+    __slots__ = ('tank', 'rate', 'burst', 'tokens', 'updated', 'last_seq', 'applied_seq', 'view', 'pending')
+
+    def __init__(self, tank: Tank, rate: float, burst: int, now: float) -> None:
+        self.tank = tank
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.last_seq = -1  # Последний принятый номер
+        self.applied_seq = -1  # Последний номер, применённый в тике
+        self.view: int | None = None  # Последний тик, который видел клиент
+        self.pending: dict[str, tuple] = {}
+
+    def take_token(self, now: float) -> bool:
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class InputManager:
+    """
+    Приём ввода игроков и его пакетное применение в начале тика.
+
+    Обработчики сокета только кладут команды в очереди игроков, а
+    Game.tick применяет всё накопленное одним проходом, так что частота
+    сообщений не влияет на работу тика.
+
+    Перед выстрелом танку выставляется задержка игрока - сколько тиков прошло с
+    последнего увиденного им снимка (view), чтобы попадания проверялись по
+    тем позициям целей, по которым он целился (см. tanks.world.lag).
+
+    Параметры:
+    - rate: float - допустимая частота сообщений одного игрока в секунду
+    - burst: int - размер всплеска сообщений сверх частоты
+    - clock: Callable[[], float] - источник монотонного времени
+    """
+    def __init__(self, rate: float = INPUT_RATE, burst: int = INPUT_BURST,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.players: dict[Hashable, PlayerInput] = {}
+        self._dirty: dict[Hashable, PlayerInput] = {}
+        # Записывает применённые команды для воспроизведения матча
+        self.recorder: ReplayRecorder | None = None
+
+        self.received = 0
+        self.applied = 0
+        self.coalesced = 0  # Команды, заменённые более новыми до начала тика
+        self.rate_limited = 0
+        self.stale = 0  # Повторы и сообщения не по порядку
+        self.invalid = 0
+
+    def bind(self, key: Hashable, tank: Tank) -> None:
+        """Привязывает игрока к его танку"""
+        self.players[key] = PlayerInput(tank, self.rate, self.burst, self.clock())
+
+    def unbind(self, key: Hashable) -> None:
+        self.players.pop(key, None)
+        self._dirty.pop(key, None)
+
+    def submit(self, key: Hashable, data: Any) -> bool:
+        """Принимает сообщение игрока; возвращает False, если оно отброшено"""
+        player = self.players.get(key)
+        if player is None:
+            return False
+        self.received += 1
+
+        try:
+            seq, view, commands = parse_input(data)
+        except ValueError:
+            self.invalid += 1
+            return False
+        if seq <= player.last_seq:
+            self.stale += 1
+            return False
+        if not player.take_token(self.clock()):
+            self.rate_limited += 1
+            return False
+
+        player.last_seq = seq
+        if view is not None:
+            player.view = view
+        pending = player.pending
+        for command, args in commands:
+            if command in pending:
+                self.coalesced += 1
+            pending[command] = args
+        self._dirty[key] = player
+        return True
+
+    def apply(self, tick: int) -> None:
+        """Применяет накопленные команды всех игроков (в начале тика tick)"""
+        if not self._dirty:
+            return
+        dirty = self._dirty
+        self._dirty = {}
+        recorder = self.recorder
+        for player in dirty.values():
+            tank = player.tank
+            player.applied_seq = player.last_seq
+            if tank._removed:
+                player.pending.clear()
+                continue
+            if player.view is not None and 'shoot' in player.pending:
+                # Задержка - такая же команда, как остальные, чтобы повтор матча совпадал
+                lag = tick - player.view
+                tank.set_view_lag(lag)
+                if recorder is not None:
+                    recorder.record_input(tick, tank.id, 'set_view_lag', lag)
+            for command, args in player.pending.items():
+                getattr(tank, command)(*args)
+                if recorder is not None:
+                    recorder.record_input(tick, tank.id, command, *args)
+            self.applied += len(player.pending)
+            player.pending.clear()
+
+    def acked_seq(self, key: Hashable) -> int:
+        """Последний номер сообщения игрока, применённый в тике"""
+        player = self.players.get(key)
+        return -1 if player is None else player.applied_seq
+
+    def stats(self) -> dict:
+        return {
+            'players': len(self.players),
+            'received': self.received,
+            'applied': self.applied,
+            'coalesced': self.coalesced,
+            'rate_limited': self.rate_limited,
+            'stale': self.stale,
+            'invalid': self.invalid,
+        }
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from math import hypot
+from typing import TYPE_CHECKING
+
+from tanks.entity.base import HealthMixin
+from tanks.entity.typing import EntityId
+from tanks.world.collision import CollisionLayer
+from tanks.world.zones import Zone, ZoneTracker
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.game.game import Game
+
+
+class GameMode:
+    """
+    Режим игры: правила и условие победы поверх Game.
+
+    Режим не обходит сущности мира каждый тик. После тика мира он разбирает
+    события: появления и удаления сущностей слоёв layers (их копит
+    EntityManager) и входы и выходы из зон режима (ZoneTracker), - и по
+    ним поддерживает свои счётчики, так что условие победы проверяется
+    за время, пропорциональное числу событий.
+
+    Режим наследует GameMode и переопределяет нужные обработчики
+    (on_spawn, on_remove, on_enter, on_leave, on_tick), а по достижении
+    условия вызывает finish.
+    """
+    name = 'base'
+    # Слои сущностей, за которыми следит режим
+    layers: int = CollisionLayer.TANK
+
+    def __init__(self) -> None:
+        self.game: Game | None = None
+        self.zones: ZoneTracker | None = None
+        self.finished = False
+        self.winner: BaseEntity | None = None
+        self.finished_tick: int | None = None
+
+    def attach(self, game: Game) -> None:
+        """Подключает режим к игре; сущности, уже бывшие в мире, считаются появившимися"""
+        self.game = game
+        manager = game.world.entity_manager
+        manager.event_layers = self.layers
+        manager.events = []
+        self.zones = ZoneTracker(manager.spatial_hash)
+        self.setup()
+        for entity in list(manager.entities.values()):
+            if entity.collision_layer & self.layers:
+                self.on_spawn(entity)
+
+    def setup(self) -> None:
+        """Создаёт зоны режима; вызывается при подключении к игре"""
+
+    def update(self, tick: int) -> None:
+        """Разбирает события прошедшего тика мира; вызывается Game.tick"""
+        manager = self.game.world.entity_manager
+        events = manager.events
+        if events:
+            manager.events = []
+            for kind, entity in events:
+                if kind == 'spawn':
+                    self.on_spawn(entity)
+                else:
+                    self.on_remove(entity)
+        if self.zones.zones:
+            for kind, entity, zone in self.zones.update():
+                if kind == 'enter':
+                    self.on_enter(entity, zone)
+                else:
+                    self.on_leave(entity, zone)
+        if not self.finished:
+            self.on_tick(tick)
+
+    def on_spawn(self, entity: BaseEntity) -> None:
+        pass
+
+    def on_remove(self, entity: BaseEntity) -> None:
+        """Сущность уничтожена или покинула игру (например, игрок отключился)"""
+
+    def on_enter(self, entity: BaseEntity, zone: Zone) -> None:
+        pass
+
+    def on_leave(self, entity: BaseEntity, zone: Zone) -> None:
+        pass
+
+    def on_tick(self, tick: int) -> None:
+        """Правила, зависящие от времени; вызывается каждый тик до конца игры"""
+
+    def finish(self, winner: BaseEntity | None) -> None:
+        """Завершает игру победой winner (None - ничья)"""
+        if self.finished:
+            return
+        self.finished = True
+        self.winner = winner
+        self.finished_tick = self.game.tick_count
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.name,
+            'finished': self.finished,
+            'winner': self.winner.id if self.winner is not None else None,
+        }
+
+
+class ClassicMode(GameMode):
+    """
+    Классический режим: побеждает последний уцелевший танк.
+
+    Игра считается начавшейся, когда в ней одновременно были хотя бы два
+    танка; одиночный игрок в пустой комнате не побеждает.
+    """
+    name = 'classic'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.alive: dict[EntityId, BaseEntity] = {}
+        self.started = False
+
+    def on_spawn(self, entity: BaseEntity) -> None:
+        self.alive[entity.id] = entity
+        if len(self.alive) >= 2:
+            self.started = True
+
+    def on_remove(self, entity: BaseEntity) -> None:
+        self.alive.pop(entity.id, None)
+        if self.started and len(self.alive) <= 1:
+            self.finish(next(iter(self.alive.values()), None))
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'alive': len(self.alive)}
+
+
+class TerritoryMode(GameMode):
+    """
+    Захват территории: побеждает танк, который удерживал точку захвата
+    capture_ticks тиков (суммарно). Пока в точке больше одного танка,
+    она оспаривается и не засчитывается никому.
+
+    Параметры:
+    - x, y: float | None - центр точки захвата (по умолчанию - центр мира)
+    - radius: float - радиус точки захвата
+    - capture_ticks: int - сколько тиков нужно удерживать точку
+    """
+    name = 'territory'
+
+    def __init__(self, x: float | None = None, y: float | None = None, radius: float = 8.0,
+                 capture_ticks: int = 600) -> None:
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.capture_ticks = capture_ticks
+        self.point: Zone | None = None
+        self.progress: dict[EntityId, int] = {}
+
+    def setup(self) -> None:
+        world = self.game.world
+        x = world.width / 2 if self.x is None else self.x
+        y = world.height / 2 if self.y is None else self.y
+        self.point = Zone('point', x, y, self.radius, self.layers)
+        self.zones.add(self.point)
+
+    def on_tick(self, tick: int) -> None:
+        occupants = self.point.members
+        if len(occupants) != 1:
+            return
+        holder_id, holder = next(iter(occupants.items()))
+        progress = self.progress.get(holder_id, 0) + 1
+        self.progress[holder_id] = progress
+        if progress >= self.capture_ticks:
+            self.finish(holder)
+
+    def on_remove(self, entity: BaseEntity) -> None:
+        self.progress.pop(entity.id, None)
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'holders': len(self.point.members) if self.point is not None else 0}
+
+
+class ApocalypseMode(ClassicMode):
+    """
+    Апокалипсис: карта выгорает от краёв к центру, побеждает последний уцелевший.
+
+    Безопасная зона - круг, который сужается на shrink_speed за тик до
+    min_radius. Раз в burn_interval тиков танки вне зоны получают
+    burn_damage урона; их поиск идёт по ячейкам широкой фазы мира, и
+    ячейки целиком внутри зоны не проверяются (см. ZoneTracker.outside).
+
+    Параметры:
+    - shrink_speed: float - на сколько уменьшается радиус зоны за тик
+    - min_radius: float - наименьший радиус зоны
+    - burn_interval: int - период урона от огня в тиках
+    - burn_damage: int - урон от огня
+    """
+    name = 'apocalypse'
+
+    def __init__(self, shrink_speed: float = 0.02, min_radius: float = 5.0, burn_interval: int = 30,
+                 burn_damage: int = 5) -> None:
+        super().__init__()
+        self.shrink_speed = shrink_speed
+        self.min_radius = min_radius
+        self.burn_interval = burn_interval
+        self.burn_damage = burn_damage
+        self.safe_zone: Zone | None = None
+        self.burned = 0
+
+    def setup(self) -> None:
+        world = self.game.world
+        # В начале зона покрывает всю карту
+        radius = hypot(world.width, world.height) / 2
+        self.safe_zone = Zone('safe', world.width / 2, world.height / 2, radius, self.layers)
+
+    def on_tick(self, tick: int) -> None:
+        zone = self.safe_zone
+        zone.radius = max(self.min_radius, zone.radius - self.shrink_speed)
+        if tick % self.burn_interval:
+            return
+        for entity in self.zones.outside(zone):
+            if isinstance(entity, HealthMixin):
+                entity.damage(self.burn_damage)
+                self.burned += 1
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'safe_radius': self.safe_zone.radius if self.safe_zone is not None else 0.0}
+
+
+MODES: dict[str, type[GameMode]] = {
+    mode.name: mode for mode in (ClassicMode, TerritoryMode, ApocalypseMode)
+}
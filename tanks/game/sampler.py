@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+class SlowTickSampler:
+    """
+    Сэмплирующий профайлер медленных тиков.
+
+    Пока идёт тик, фоновый поток раз в interval секунд снимает стек потока
+    планировщика. Если тик оказался дольше threshold, собранные стеки
+    записываются в output_dir в «свёрнутом» формате (folded stacks), который
+    понимают flamegraph.pl и speedscope. Быстрые тики отбрасываются.
+
+    Параметры:
+    - output_dir: str | Path - куда сохранять профили медленных тиков
+    - threshold: float - длительность тика в секундах, начиная с которой он сохраняется
+    - interval: float - период снятия стеков в секундах
+    - max_dumps: int - сколько профилей сохранить не больше
+    """
+    def __init__(self, output_dir: str | Path, threshold: float = 0.05, interval: float = 0.001,
+                 max_dumps: int = 100) -> None:
+        self.output_dir = Path(output_dir)
+        self.threshold = threshold
+        self.interval = interval
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        self.samples: Counter[str] = Counter()
+        self._target: int | None = None
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='slow-tick-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def begin_tick(self) -> None:
+        """Вызывается потоком планировщика перед тиком"""
+        with self._lock:
+            self.samples.clear()
+        self._target = threading.get_ident()
+        self._active.set()
+
+    def end_tick(self, duration: float, label: str) -> Path | None:
+        """Вызывается после тика; возвращает путь к профилю, если тик был медленным"""
+        self._active.clear()
+        if duration < self.threshold or self.dumps >= self.max_dumps:
+            return None
+        with self._lock:
+            samples = self.samples.most_common()
+        if not samples:
+            return None
+
+        self.dumps += 1
+        path = self.output_dir / f'slow-tick-{label}-{self.dumps}.folded'
+        path.write_text(''.join(f'{stack} {count}\n' for stack, count in samples))
+        return path
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._active.wait()
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                stack = self._fold(frame)
+                with self._lock:
+                    if self._active.is_set():
+                        self.samples[stack] += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _fold(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
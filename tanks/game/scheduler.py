@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from itertools import count
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from tanks.game.base import BaseGame
+
+if TYPE_CHECKING:
+    from tanks.game.sampler import SlowTickSampler
+
+logger = logging.getLogger(__name__)
+
+TickListener = Callable[[BaseGame], Awaitable[None]]
+
+
+class TickStats:
+    """
+    Статистика длительности тиков одной игры.
+
+    Параметры:
+    - tick_interval: float - длительность одного тика в секундах (бюджет тика)
+    """
+    # Верхние границы корзин гистограммы в секундах
+    BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+
+    def __init__(self, tick_interval: float) -> None:
+        self.tick_interval = tick_interval
+        self.buckets = [0] * (len(self.BUCKETS) + 1)
+        self.ticks = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.overruns = 0  # Тики, длившиеся дольше tick_interval
+        self.dropped_ticks = 0  # Тики, пропущенные из-за ограничения догоняния
+        self.errors = 0  # Исключения в тиках игры и в слушателях тиков
+        # Отклонение промежутка между началами соседних тиков от tick_interval
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self._last_start: float | None = None
+
+    def observe(self, duration: float) -> None:
+        """Учитывает длительность очередного тика"""
+        self.buckets[bisect_left(self.BUCKETS, duration)] += 1
+        self.ticks += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+        if duration > self.tick_interval:
+            self.overruns += 1
+
+    def observe_start(self, started: float) -> None:
+        """Учитывает время начала очередного тика"""
+        if self._last_start is not None:
+            jitter = abs(started - self._last_start - self.tick_interval)
+            self.jitter_total += jitter
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+        self._last_start = started
+
+    def as_dict(self) -> dict:
+        bounds = [*map(str, self.BUCKETS), '+Inf']
+        cumulative = 0
+        histogram = {}
+        for bound, bucket in zip(bounds, self.buckets):
+            cumulative += bucket
+            histogram[bound] = cumulative
+
+        return {
+            'ticks': self.ticks,
+            'total_time': self.total_time,
+            'max_time': self.max_time,
+            'overruns': self.overruns,
+            'dropped_ticks': self.dropped_ticks,
+            'errors': self.errors,
+            'jitter_total': self.jitter_total,
+            'jitter_max': self.jitter_max,
+            'histogram': histogram,
+        }
+
+
+class ScheduledGame:
+    """Игра, зарегистрированная в планировщике, и её статистика"""
+    def __init__(self, game_id: int, game: BaseGame, tick_rate: float) -> None:
+        self.game_id = game_id
+        self.game = game
+        self.tick_rate = tick_rate
+        self.stats = TickStats(1.0 / tick_rate)
+        self.task: asyncio.Task | None = None
+
+
+class GameScheduler:
+    """
+    Планировщик, тикающий игры с фиксированным шагом в общем цикле asyncio.
+
+    Каждая игра крутится в своей задаче: накопитель (accumulator) собирает
+    прошедшее время и расходует его шагами по 1 / tick_rate. Если игра
+    отстала, она догоняет не больше max_catch_up_ticks тиков за раз,
+    а остаток времени отбрасывается. Между тиками управление возвращается
+    циклу событий, чтобы тик не задерживал обработку сокетов.
+
+    Исключение в тике игры или в слушателе не останавливает игру: оно
+    пишется в лог и считается в errors статистики игры, а игра тикает дальше.
+
+    Параметры:
+    - tick_rate: float - количество тиков в секунду по умолчанию
+    - max_catch_up_ticks: int - сколько тиков подряд игра может догонять
+    - clock: Callable[[], float] - источник монотонного времени
+    """
+    def __init__(
+        self,
+        tick_rate: float = 60.0,
+        max_catch_up_ticks: int = 5,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.tick_rate = tick_rate
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.clock = clock
+        self.games: dict[int, ScheduledGame] = {}
+        self.listeners: list[TickListener] = []
+        self.running = False
+        # Сэмплирующий профайлер медленных тиков (опционально)
+        self.sampler: SlowTickSampler | None = None
+        self._ids = count(1)
+
+    def add_game(self, game: BaseGame, tick_rate: float | None = None) -> ScheduledGame:
+        """Регистрирует игру; если планировщик запущен, сразу начинает её тикать"""
+        scheduled = ScheduledGame(next(self._ids), game, tick_rate or self.tick_rate)
+        self.games[scheduled.game_id] = scheduled
+        if self.running:
+            self._spawn(scheduled)
+        return scheduled
+
+    async def remove_game(self, game_id: int) -> None:
+        """Останавливает и удаляет игру"""
+        scheduled = self.games.pop(game_id)
+        await self._cancel(scheduled)
+
+    def add_listener(self, listener: TickListener) -> None:
+        """Добавляет корутину, вызываемую после каждого тика любой игры"""
+        self.listeners.append(listener)
+
+    async def start(self) -> None:
+        self.running = True
+        for scheduled in self.games.values():
+            self._spawn(scheduled)
+
+    async def stop(self) -> None:
+        self.running = False
+        for scheduled in self.games.values():
+            await self._cancel(scheduled)
+
+    def stats(self) -> dict[int, dict]:
+        return {game_id: scheduled.stats.as_dict() for game_id, scheduled in self.games.items()}
+
+    def _spawn(self, scheduled: ScheduledGame) -> None:
+        scheduled.task = asyncio.create_task(self._run(scheduled), name=f'game-{scheduled.game_id}')
+
+    @staticmethod
+    async def _cancel(scheduled: ScheduledGame) -> None:
+        if scheduled.task is None:
+            return
+        scheduled.task.cancel()
+        try:
+            await scheduled.task
+        except asyncio.CancelledError:
+            pass
+        scheduled.task = None
+
+    async def _run(self, scheduled: ScheduledGame) -> None:
+        clock = self.clock
+        interval = 1.0 / scheduled.tick_rate
+        stats = scheduled.stats
+        accumulator = 0.0
+        last_time = clock()
+
+        while True:
+            now = clock()
+            accumulator += now - last_time
+            last_time = now
+
+            steps = 0
+            while accumulator >= interval:
+                if steps == self.max_catch_up_ticks:
+                    # Слишком сильно отстали: отбрасываем остаток, чтобы не уйти в спираль
+                    dropped = int(accumulator // interval)
+                    stats.dropped_ticks += dropped
+                    accumulator -= dropped * interval
+                    break
+
+                sampler = self.sampler
+                if sampler is not None:
+                    sampler.begin_tick()
+                started = clock()
+                stats.observe_start(started)
+                try:
+                    scheduled.game.tick()
+                except Exception:
+                    stats.errors += 1
+                    logger.exception('Ошибка в тике %s игры %s', scheduled.game.tick_count, scheduled.game_id)
+                duration = clock() - started
+                stats.observe(duration)
+                if sampler is not None:
+                    sampler.end_tick(duration, f'game{scheduled.game_id}-tick{scheduled.game.tick_count}')
+                accumulator -= interval
+                steps += 1
+
+                for listener in self.listeners:
+                    try:
+                        await listener(scheduled.game)
+                    except Exception:
+                        stats.errors += 1
+                        logger.exception('Ошибка слушателя тиков игры %s', scheduled.game_id)
+                # Отдаём управление циклу событий между тиками
+                await asyncio.sleep(0)
+
+            await asyncio.sleep(max(0.0, interval - accumulator - (clock() - last_time)))
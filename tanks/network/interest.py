@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable
+
+from tanks.entity.typing import EntityId
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.world.base import BaseWorld
+
+# Фильтр видимости (наблюдатель, сущность) -> видна ли сущность.
+# Через такие фильтры подключаются освещение карты, туман и камуфляж.
+VisibilityFilter = Callable[['BaseEntity', 'BaseEntity'], bool]
+# Слушатель изменений области интереса: (ключ наблюдателя, вошедшие, покинувшие)
+InterestListener = Callable[[Hashable, list['BaseEntity'], list['BaseEntity']], None]
+
+
+class AreaOfInterest:
+    """
+    Область интереса вокруг наблюдателя.
+
+    Параметры:
+    - radius: float | None - радиус круглой области
+    - half_width, half_height: float | None - полуразмеры прямоугольной области
+      (используются, если radius не задан)
+    """
+    def __init__(self, radius: float | None = None, half_width: float | None = None,
+                 half_height: float | None = None) -> None:
+        if radius is None and (half_width is None or half_height is None):
+            raise ValueError('Нужно задать radius или half_width и half_height')
+        self.radius = radius
+        self.half_width = half_width if radius is None else radius
+        self.half_height = half_height if radius is None else radius
+
+    def query(self, world: BaseWorld, x: float, y: float) -> dict[EntityId, BaseEntity]:
+        """Возвращает сущности, пересекающие область с центром в (x, y)"""
+        candidates = world.entity_manager.spatial_hash.query_rect(
+            x - self.half_width, y - self.half_height,
+            x + self.half_width, y + self.half_height,
+        )
+
+        visible = {}
+        if self.radius is not None:
+            for entity_id, entity in candidates.items():
+                dx = entity.x - x
+                dy = entity.y - y
+                reach = self.radius + entity.size
+                if dx * dx + dy * dy <= reach * reach:
+                    visible[entity_id] = entity
+        else:
+            for entity_id, entity in candidates.items():
+                if abs(entity.x - x) <= self.half_width + entity.size and \
+                   abs(entity.y - y) <= self.half_height + entity.size:
+                    visible[entity_id] = entity
+        return visible
+
+
+class InterestManager:
+    """
+    Вычисляет для каждого наблюдателя набор видимых сущностей.
+
+    Кандидаты берутся из широкой фазы мира, поэтому стоимость зависит от
+    плотности сущностей вокруг наблюдателя, а не от размера карты. При каждом
+    обновлении слушатели получают сущности, вошедшие в область и покинувшие её.
+
+    Параметры:
+    - area: AreaOfInterest - форма области интереса
+    - filters: Iterable[VisibilityFilter] - дополнительные условия видимости
+    """
+    def __init__(self, area: AreaOfInterest, filters: Iterable[VisibilityFilter] = ()) -> None:
+        self.area = area
+        self.filters: list[VisibilityFilter] = list(filters)
+        self.listeners: list[InterestListener] = []
+        self.visible: dict[Hashable, dict[EntityId, BaseEntity]] = {}
+
+    def add_filter(self, visibility_filter: VisibilityFilter) -> None:
+        self.filters.append(visibility_filter)
+
+    def add_listener(self, listener: InterestListener) -> None:
+        self.listeners.append(listener)
+
+    def remove(self, key: Hashable) -> None:
+        self.visible.pop(key, None)
+
+    def update(self, key: Hashable, observer: BaseEntity) -> dict[EntityId, BaseEntity]:
+        """Пересчитывает видимые наблюдателем сущности и оповещает об изменениях"""
+        visible = self.area.query(observer.world, observer.x, observer.y)
+        if self.filters:
+            visible = {
+                entity_id: entity for entity_id, entity in visible.items()
+                if entity is observer or all(check(observer, entity) for check in self.filters)
+            }
+        if not observer._removed:
+            visible[observer.id] = observer
+
+        previous = self.visible.get(key, {})
+        self.visible[key] = visible
+
+        if self.listeners:
+            entered = [entity for entity_id, entity in visible.items() if entity_id not in previous]
+            left = [entity for entity_id, entity in previous.items() if entity_id not in visible]
+            if entered or left:
+                for listener in self.listeners:
+                    listener(key, entered, left)
+        return visible
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from tanks.entity.typing import EntityId
+from tanks.network.snapshot import (
+    EntityState, NetworkIdAllocator, WorldState, capture_state, encode_snapshot, quantize,
+)
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.network.interest import InterestManager
+    from tanks.world.base import BaseWorld
+
+SendCallback = Callable[[str, bytes], Awaitable[None]]
+
+
+class ClientState:
+    """Состояние синхронизации одного клиента"""
+    def __init__(self, sid: str, observer: BaseEntity | None = None) -> None:
+        self.sid = sid
+        self.observer = observer  # Сущность, вокруг которой строится область интереса
+        self.acked_tick: int | None = None  # Последний подтверждённый клиентом тик
+        self.history: dict[int, WorldState] = {}  # Отправленные клиенту состояния
+
+
+class NetworkManager:
+    """
+    Рассылает клиентам снимки мира.
+
+    Каждый клиент получает дельту относительно последнего подтверждённого им
+    снимка; если подтверждения нет (подключение) или оно устарело и выпало из
+    истории (потеря пакетов), отправляется ключевой кадр.
+
+    С менеджером интереса клиент с наблюдателем получает только сущности из
+    своей области интереса, и квантуются только сущности, видимые хотя бы
+    одним клиентом. Вход сущности в область приходит клиенту записью в дельте,
+    выход - удалением.
+
+    Параметры:
+    - world: BaseWorld - мир, состояние которого рассылается
+    - history_size: int - сколько последних снимков хранить для дельт
+    - interest: InterestManager | None - фильтрация по области интереса
+    """
+    def __init__(self, world: BaseWorld, history_size: int = 32,
+                 interest: InterestManager | None = None) -> None:
+        self.world = world
+        self.history_size = history_size
+        self.interest = interest
+        self.id_allocator = NetworkIdAllocator()
+        self.clients: dict[str, ClientState] = {}
+
+    def add_client(self, sid: str, observer: BaseEntity | None = None) -> None:
+        self.clients[sid] = ClientState(sid, observer)
+
+    def remove_client(self, sid: str) -> None:
+        self.clients.pop(sid, None)
+        if self.interest is not None:
+            self.interest.remove(sid)
+
+    def ack(self, sid: str, tick: int) -> None:
+        """Отмечает, что клиент получил снимок тика tick"""
+        client = self.clients.get(sid)
+        if client is None or tick not in client.history:
+            return
+        if client.acked_tick is None or tick > client.acked_tick:
+            client.acked_tick = tick
+
+    def capture(self) -> dict[str, WorldState]:
+        """Снимает для каждого клиента состояние видимой ему части мира"""
+        entities = self.world.entity_manager.entities
+        if self.interest is None:
+            state = capture_state(self.world, self.id_allocator)
+            states = {sid: state for sid in self.clients}
+        else:
+            get_id = self.id_allocator.get
+            quantized: dict[EntityId, EntityState] = {}
+            states = {}
+            for sid, client in self.clients.items():
+                if client.observer is None:
+                    visible = entities
+                else:
+                    visible = self.interest.update(sid, client.observer)
+
+                missing = {entity_id: entity for entity_id, entity in visible.items() if entity_id not in quantized}
+                if missing:
+                    quantized.update(quantize(self.world, missing))
+                states[sid] = {get_id(entity_id): quantized[entity_id] for entity_id in visible}
+
+        self.id_allocator.release_missing(entities.keys())
+        return states
+
+    def encode_for(self, client: ClientState, tick: int, state: WorldState) -> bytes:
+        """Кодирует для клиента дельту к подтверждённому снимку или ключевой кадр"""
+        baseline = client.history.get(client.acked_tick) if client.acked_tick is not None else None
+        if baseline is None:
+            client.acked_tick = None
+            data = encode_snapshot(tick, state)
+        else:
+            data = encode_snapshot(tick, state, client.acked_tick, baseline)
+
+        client.history[tick] = state
+        for old_tick in [old_tick for old_tick in client.history if old_tick <= tick - self.history_size]:
+            del client.history[old_tick]
+        return data
+
+    async def broadcast(self, tick: int, send: SendCallback) -> None:
+        """Снимает состояние и отправляет каждому клиенту его пакет"""
+        if not self.clients:
+            return
+
+        for sid, state in self.capture().items():
+            client = self.clients.get(sid)
+            if client is None:
+                # Клиент отключился, пока отправлялись пакеты предыдущим
+                continue
+            await send(sid, self.encode_for(client, tick, state))
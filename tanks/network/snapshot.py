@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import struct
+from collections import deque
+from itertools import chain
+from math import tau
+from typing import TYPE_CHECKING, Collection, Mapping
+
+from tanks.entity.typing import EntityId
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.world.base import BaseWorld
+
+# Заголовок: тип пакета, тик, базовый тик, число обновлений, число удалений
+HEADER = struct.Struct('<BIIHH')
+# Запись сущности: сетевой id, вид, x, y, угол, здоровье
+RECORD_FORMAT = 'HBHHBB'
+RECORD_SIZE = struct.calcsize('<' + RECORD_FORMAT)
+
+KEYFRAME = 0
+DELTA = 1
+
+ENTITY_KINDS = {'Tank': 1, 'TankBot': 2, 'TankShell': 3}
+
+# Квантованное состояние сущности: вид, x, y, угол, здоровье
+EntityState = tuple[int, int, int, int, int]
+WorldState = dict[int, EntityState]
+
+_record_structs: dict[int, struct.Struct] = {}
+_removed_structs: dict[int, struct.Struct] = {}
+
+
+def _records_struct(count: int) -> struct.Struct:
+    if count not in _record_structs:
+        _record_structs[count] = struct.Struct('<' + RECORD_FORMAT * count)
+    return _record_structs[count]
+
+
+def _removed_struct(count: int) -> struct.Struct:
+    if count not in _removed_structs:
+        _removed_structs[count] = struct.Struct(f'<{count}H')
+    return _removed_structs[count]
+
+
+class NetworkIdAllocator:
+    """
+    Выдаёт сущностям короткие целочисленные сетевые id вместо 16-байтных UUID.
+
+    Освободившиеся id переиспользуются в порядке освобождения, чтобы
+    один и тот же id как можно дольше не доставался другой сущности.
+    """
+    MAX_ID = 0xFFFF
+
+    def __init__(self) -> None:
+        self.ids: dict[EntityId, int] = {}
+        self._free: deque[int] = deque()
+        self._next_id = 1
+
+    def get(self, entity_id: EntityId) -> int:
+        net_id = self.ids.get(entity_id)
+        if net_id is None:
+            if self._free:
+                net_id = self._free.popleft()
+            elif self._next_id <= self.MAX_ID:
+                net_id = self._next_id
+                self._next_id += 1
+            else:
+                raise OverflowError('Закончились сетевые идентификаторы')
+            self.ids[entity_id] = net_id
+        return net_id
+
+    def release_missing(self, alive: Collection[EntityId]) -> None:
+        """Освобождает id сущностей, которых больше нет в мире"""
+        for entity_id in [entity_id for entity_id in self.ids if entity_id not in alive]:
+            self._free.append(self.ids.pop(entity_id))
+
+
+def quantize(world: BaseWorld, entities: Mapping[EntityId, BaseEntity]) -> dict[EntityId, EntityState]:
+    """Квантует состояние переданных сущностей мира"""
+    scale_x = 0xFFFF / world.width
+    scale_y = 0xFFFF / world.height
+    angle_scale = 256 / tau
+    state: dict[EntityId, EntityState] = {}
+
+    for entity_id, entity in entities.items():
+        x = min(max(round(entity.x * scale_x), 0), 0xFFFF)
+        y = min(max(round(entity.y * scale_y), 0), 0xFFFF)
+        angle = round(getattr(entity, 'angle', 0.0) * angle_scale) & 0xFF
+        health = min(max(int(getattr(entity, 'health', 0)), 0), 0xFF)
+        kind = ENTITY_KINDS.get(type(entity).__name__, 0)
+        state[entity_id] = (kind, x, y, angle, health)
+    return state
+
+
+def capture_state(world: BaseWorld, id_allocator: NetworkIdAllocator,
+                  entities: Mapping[EntityId, BaseEntity] | None = None) -> WorldState:
+    """Квантует состояние сущностей (по умолчанию всех) с ключами по сетевым id"""
+    if entities is None:
+        entities = world.entity_manager.entities
+    get_id = id_allocator.get
+    return {get_id(entity_id): values for entity_id, values in quantize(world, entities).items()}
+
+
+def encode_snapshot(tick: int, state: WorldState, baseline_tick: int | None = None,
+                    baseline: WorldState | None = None) -> bytes:
+    """
+    Кодирует снимок мира.
+
+    Без базового снимка кодируется ключевой кадр со всеми сущностями,
+    иначе - только сущности, изменившиеся относительно baseline, и id удалённых.
+    """
+    if baseline is None:
+        updates = state
+        removed = []
+        packet_type = KEYFRAME
+        baseline_tick = 0
+    else:
+        updates = {net_id: values for net_id, values in state.items() if baseline.get(net_id) != values}
+        removed = [net_id for net_id in baseline if net_id not in state]
+        packet_type = DELTA
+
+    parts = [HEADER.pack(packet_type, tick, baseline_tick, len(updates), len(removed))]
+    if updates:
+        parts.append(_records_struct(len(updates)).pack(
+            *chain.from_iterable((net_id, *values) for net_id, values in updates.items())
+        ))
+    if removed:
+        parts.append(_removed_struct(len(removed)).pack(*removed))
+    return b''.join(parts)
+
+
+def decode_snapshot(data: bytes) -> tuple[int, int, int, WorldState, list[int]]:
+    """Декодирует снимок: (тип, тик, базовый тик, обновления, удалённые id)"""
+    packet_type, tick, baseline_tick, update_count, removed_count = HEADER.unpack_from(data)
+    offset = HEADER.size
+
+    values = _records_struct(update_count).unpack_from(data, offset)
+    updates = {values[i]: values[i + 1:i + 6] for i in range(0, len(values), 6)}
+    offset += update_count * RECORD_SIZE
+
+    removed = list(_removed_struct(removed_count).unpack_from(data, offset))
+    return packet_type, tick, baseline_tick, updates, removed
+
+
+def apply_snapshot(state: WorldState, data: bytes) -> tuple[int, WorldState]:
+    """
+    Применяет снимок к состоянию клиента и возвращает (тик, новое состояние).
+
+    Для дельты state должен быть состоянием на базовый тик снимка.
+    """
+    packet_type, tick, _, updates, removed = decode_snapshot(data)
+    new_state = {} if packet_type == KEYFRAME else dict(state)
+    new_state.update(updates)
+    for net_id in removed:
+        new_state.pop(net_id, None)
+    return tick, new_state
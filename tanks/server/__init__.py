@@ -1,11 +1,104 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from tanks.server import socket_manager
+from tanks.server.game_loop import scheduler
 from tanks.server.routers import router
 from tanks.server.socket_manager import app as socketio_app
+from tanks.world.profiler import TickProfiler
+
+
+def create_server(
+    debug: bool = True,
+    tick_rate: float | None = None,
+    workers: int = 0,
+    profile: bool = False,
+    slow_tick_dir: str | None = None,
+    slow_tick_threshold: float = 0.05,
+    map_path: str | None = None,
+    mode: str | None = None,
+    preload: bool = False,
+    stats_path: str | None = None,
+    replay_dir: str | None = None,
+) -> FastAPI:
+    """
+    Создаёт приложение сервера.
+
+    При workers > 0 комнаты хостятся в пуле процессов (ShardedRoomManager),
+    иначе - в планировщике текущего процесса. При profile комнаты замеряют
+    фазы тика (см. /metrics), а при slow_tick_dir тики комнат текущего
+    процесса дольше slow_tick_threshold секунд сохраняются как flame graph.
+    map_path - файл карты препятствий (см. tanks.world.tilemap) для всех комнат,
+    mode - режим игры комнат (см. tanks.game.modes.MODES).
+
+    Игровые модули импортируются при создании первой комнаты, и первый
+    игрок ждёт их загрузки; при preload они импортируются, а карта
+    загружается в память сразу - до fork процессов-воркеров, которые
+    получают их готовыми.
+
+    stats_path - база SQLite, куда пишутся урон, убийства и итоги матчей
+    (см. tanks.server.stats); по ней строятся лидерборды. При replay_dir
+    матчи комнат записываются для воспроизведения (см. ReplayRunner) и
+    сохраняются в этот каталог.
+    """
+    if tick_rate is not None:
+        scheduler.tick_rate = tick_rate
+
+    if profile:
+        socket_manager.rooms.profiler = TickProfiler()
+    socket_manager.rooms.map_path = map_path
+    socket_manager.rooms.mode = mode
+    socket_manager.rooms.replay_dir = replay_dir
+    if preload:
+        socket_manager.rooms.preload()
+
+    recorder = None
+    if stats_path is not None:
+        from tanks.server.stats import StatsRecorder
+
+        recorder = StatsRecorder(stats_path)
+    socket_manager.rooms.recorder = socket_manager.recorder = recorder
+
+    sampler = None
+    if slow_tick_dir is not None:
+        from tanks.game.sampler import SlowTickSampler
+
+        sampler = scheduler.sampler = SlowTickSampler(slow_tick_dir, threshold=slow_tick_threshold)
+
+    sharded = None
+    if workers > 0:
+        from tanks.server.sharding import ShardedRoomManager
+
+        sharded = ShardedRoomManager(
+            workers, socket_manager.send_snapshot, tick_rate=scheduler.tick_rate, profile=profile,
+            map_path=map_path, mode=mode, stats_path=stats_path,
+            replay_dir=replay_dir,
+        )
+        socket_manager.set_room_manager(sharded)
 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if sampler is not None:
+            sampler.start()
+        if recorder is not None:
+            recorder.start()
+        await scheduler.start()
+        if sharded is not None:
+            await sharded.start()
+        await socket_manager.matchmaker.start()
+        yield
+        await socket_manager.matchmaker.stop()
+        if sharded is not None:
+            await sharded.stop()
+        await scheduler.stop()
+        socket_manager.rooms.save_replays()
+        if recorder is not None:
+            recorder.stop()
+        if sampler is not None:
+            sampler.stop()
 
-def create_server(debug: bool = True) -> FastAPI:
-    app = FastAPI(debug=debug)
+    app = FastAPI(debug=debug, lifespan=lifespan)
 
     app.include_router(router)
     app.mount("/", socketio_app)
@@ -0,0 +1,4 @@
+from tanks.consts import MAX_CATCH_UP_TICKS, TICK_RATE
+from tanks.game.scheduler import GameScheduler
+
+scheduler = GameScheduler(tick_rate=TICK_RATE, max_catch_up_ticks=MAX_CATCH_UP_TICKS)
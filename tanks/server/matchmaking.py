@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left, bisect_right
+from typing import Awaitable, Callable
+
+from tanks.consts import (
+    DEFAULT_SKILL, DUEL_BRACKET_SIZE, LATENCY_BUCKETS, MATCH_INTERVAL, MATCH_LATENCY_WIDEN_AFTER, MATCH_SIZE,
+    MATCH_SKILL_WIDEN_AFTER, SKILL_BUCKET,
+)
+
+# Отправка игроку сообщения о переходе в новую комнату (следующая дуэль сетки)
+NotifyCallback = Callable[[str, dict], Awaitable[None]]
+
+# Режим очереди арены дуэлей: матч очереди - турнирная сетка, дуэль - комната classic
+DUEL_MODE = 'duel'
+
+
+class Ticket:
+    """Заявка игрока в очереди подбора"""
+    __slots__ = ('sid', 'mode', 'skill', 'latency', 'enqueued', 'future')
+
+    def __init__(self, sid: str, mode: str, skill: float, latency: float, enqueued: float,
+                 future: asyncio.Future) -> None:
+        self.sid = sid
+        self.mode = mode
+        self.skill = skill
+        self.latency = latency
+        self.enqueued = enqueued
+        self.future = future
+
+
+class MatchStats:
+    """Статистика подбора одного режима: очередь и время ожидания матча"""
+    # Верхние границы корзин гистограммы времени ожидания в секундах
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(self.BUCKETS) + 1)
+        self.queued = 0  # Игроков в очереди сейчас
+        self.matched = 0
+        self.matches = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float) -> None:
+        self.buckets[bisect_left(self.BUCKETS, wait)] += 1
+        self.matched += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+    def as_dict(self) -> dict:
+        bounds = [*map(str, self.BUCKETS), '+Inf']
+        cumulative = 0
+        histogram = {}
+        for bound, bucket in zip(bounds, self.buckets):
+            cumulative += bucket
+            histogram[bound] = cumulative
+
+        return {
+            'queued': self.queued,
+            'matched': self.matched,
+            'matches': self.matches,
+            'cancelled': self.cancelled,
+            'wait_total': self.wait_total,
+            'wait_max': self.wait_max,
+            'histogram': histogram,
+        }
+
+
+class DuelBracket:
+    """
+    Турнирная сетка арены дуэлей на выбывание.
+
+    В первом круге сильнейший по посеву играет со слабейшим, второй - с
+    предпоследним и т. д.; в следующих кругах так же складываются победители
+    в порядке дуэлей. Игрок без пары (нечётное число) проходит дальше без
+    боя, дуэль без победителя (оба покинули игру) не выводит дальше никого.
+
+    Параметры:
+    - players: list[str] - игроки в порядке посева (от сильнейшего)
+    """
+    def __init__(self, players: list[str]) -> None:
+        self.round = 0
+        self.players = list(players)
+        self.duels: list[tuple[str, str]] = []
+        self.results: dict[int, str | None] = {}
+        self.bye: str | None = None
+        self.champion: str | None = None
+        self.finished = False
+
+    def next_round(self) -> list[tuple[str, str]]:
+        """Начинает следующий круг и возвращает его дуэли (пусто, если турнир окончен)"""
+        players = self.players
+        if len(players) <= 1:
+            self.finished = True
+            self.champion = players[0] if players else None
+            self.duels = []
+            return []
+        self.round += 1
+        half = len(players) // 2
+        self.duels = [(players[i], players[-1 - i]) for i in range(half)]
+        self.bye = players[half] if len(players) % 2 else None
+        self.results = {}
+        return self.duels
+
+    def report(self, duel: int, winner: str | None) -> bool:
+        """Записывает итог дуэли; возвращает True, когда сыграны все дуэли круга"""
+        self.results[duel] = winner
+        if len(self.results) < len(self.duels):
+            return False
+        winners = [self.results[index] for index in range(len(self.duels))]
+        if self.bye is not None:
+            winners.append(self.bye)
+        self.players = [player for player in winners if player is not None]
+        return True
+
+
+class Matchmaker:
+    """
+    Подбор игроков в комнаты.
+
+    Заявки попадают в asyncio-очередь своего режима, а фоновая задача раз
+    в interval секунд разбирает очереди пачкой: раскладывает заявки по
+    корзинам (рейтинг, задержка) и собирает матчи по match_sizes[mode]
+    игроков внутри корзины. Игроки, ждущие дольше skill_widen_after,
+    подбираются без учёта рейтинга внутри своей корзины задержки, дольше
+    latency_widen_after - без учёта и задержки, причём тогда матч может
+    быть неполным, но не меньше min_sizes[mode] игроков (по умолчанию -
+    половина полного, но не меньше двух). Комнаты для всех матчей прохода
+    создаются одним пакетом (create_rooms), игроки подключаются к ним
+    параллельно. Комнаты матчей зарезервированы (reserved): менеджер комнат
+    закрывает их, когда игра окончена или все игроки вышли.
+
+    Матч режима duel - турнирная сетка (DuelBracket): её дуэли играются в
+    комнатах classic, а следующий круг начинается, когда менеджер комнат
+    сообщает об окончании всех дуэлей текущего (finish_listeners).
+
+    Параметры:
+    - rooms: RoomRegistry | ShardedRoomManager - менеджер комнат
+    - notify: NotifyCallback | None - сообщает игроку о переходе в комнату следующей дуэли
+    - match_sizes: dict[str, int] | None - игроков в матче по режимам
+    - min_sizes: dict[str, int] | None - наименьший неполный матч по режимам
+    - skill_bucket: float - ширина корзины рейтинга
+    - latency_buckets: tuple[float, ...] - границы корзин задержки в секундах
+    - skill_widen_after: float - через сколько секунд ожидания не учитывать рейтинг
+    - latency_widen_after: float - через сколько секунд ожидания не учитывать и задержку
+    - interval: float - период проходов подбора в секундах
+    - clock: Callable[[], float] - источник монотонного времени
+    """
+    def __init__(self, rooms, notify: NotifyCallback | None = None, match_sizes: dict[str, int] | None = None,
+                 min_sizes: dict[str, int] | None = None, skill_bucket: float = SKILL_BUCKET,
+                 latency_buckets: tuple[float, ...] = LATENCY_BUCKETS,
+                 skill_widen_after: float = MATCH_SKILL_WIDEN_AFTER,
+                 latency_widen_after: float = MATCH_LATENCY_WIDEN_AFTER, interval: float = MATCH_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rooms = None
+        self.notify = notify
+        self.match_sizes = match_sizes if match_sizes is not None else {
+            'classic': MATCH_SIZE, 'territory': MATCH_SIZE, 'apocalypse': MATCH_SIZE, DUEL_MODE: DUEL_BRACKET_SIZE,
+        }
+        self.min_sizes = min_sizes if min_sizes is not None else {
+            mode: max(2, size // 2) for mode, size in self.match_sizes.items()
+        }
+        self.skill_bucket = skill_bucket
+        self.latency_buckets = latency_buckets
+        self.skill_widen_after = skill_widen_after
+        self.latency_widen_after = latency_widen_after
+        self.interval = interval
+        self.clock = clock
+
+        self.queues: dict[str, asyncio.Queue[Ticket]] = {mode: asyncio.Queue() for mode in self.match_sizes}
+        # Разобранные заявки по корзинам (рейтинг, задержка)
+        self.waiting: dict[str, dict[tuple[int, int], list[Ticket]]] = {mode: {} for mode in self.match_sizes}
+        self.tickets: dict[str, Ticket] = {}
+        self.stats_by_mode = {mode: MatchStats() for mode in self.match_sizes}
+        # Дуэли, которые сейчас идут: комната -> сетка и номер дуэли в круге
+        self.duels: dict[int, tuple[DuelBracket, int]] = {}
+        self.brackets_finished = 0
+        self._task: asyncio.Task | None = None
+        self._background: set[asyncio.Task] = set()
+        self.attach(rooms)
+
+    def attach(self, rooms) -> None:
+        """Переключает подбор на менеджер комнат rooms"""
+        if self.rooms is not None and self.on_room_finished in self.rooms.finish_listeners:
+            self.rooms.finish_listeners.remove(self.on_room_finished)
+        self.rooms = rooms
+        rooms.finish_listeners.append(self.on_room_finished)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name='matchmaker')
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def enqueue(self, sid: str, mode: str = 'classic', skill: float = DEFAULT_SKILL,
+                latency: float = 0.0) -> asyncio.Future:
+        """
+        Ставит игрока в очередь режима mode; возвращает future с ответом
+        join_player комнаты матча (и режимом). Повторная заявка заменяет прежнюю.
+        """
+        if mode not in self.match_sizes:
+            raise ValueError(f'Неизвестный режим подбора: {mode}')
+        self.cancel(sid)
+        ticket = Ticket(sid, mode, float(skill), float(latency), self.clock(),
+                        asyncio.get_running_loop().create_future())
+        self.tickets[sid] = ticket
+        self.queues[mode].put_nowait(ticket)
+        self.stats_by_mode[mode].queued += 1
+        return ticket.future
+
+    def cancel(self, sid: str) -> None:
+        """Снимает заявку игрока (например, при отключении); из корзины она уйдёт при подборе"""
+        ticket = self.tickets.pop(sid, None)
+        if ticket is not None and not ticket.future.done():
+            ticket.future.cancel()
+            stats = self.stats_by_mode[ticket.mode]
+            stats.queued -= 1
+            stats.cancelled += 1
+
+    def bucket(self, ticket: Ticket) -> tuple[int, int]:
+        return int(ticket.skill // self.skill_bucket), bisect_right(self.latency_buckets, ticket.latency)
+
+    def collect(self, mode: str) -> None:
+        """Переносит заявки из очереди режима в корзины"""
+        queue = self.queues[mode]
+        buckets = self.waiting[mode]
+        bucket = self.bucket
+        while not queue.empty():
+            ticket = queue.get_nowait()
+            if not ticket.future.done():
+                buckets.setdefault(bucket(ticket), []).append(ticket)
+
+    def match(self, mode: str, now: float) -> list[list[Ticket]]:
+        """Собирает матчи режима из корзин; несобранные заявки остаются в корзинах"""
+        size = self.match_sizes[mode]
+        min_size = self.min_sizes[mode]
+        skill_widen_after = self.skill_widen_after
+        groups: list[list[Ticket]] = []
+        kept: dict[tuple[int, int], list[Ticket]] = {}
+        # Долго ждущие: по корзинам задержки и все вместе
+        by_latency: dict[int, list[Ticket]] = {}
+        for key, tickets in self.waiting[mode].items():
+            tickets = [ticket for ticket in tickets if not ticket.future.done()]
+            full = len(tickets) - len(tickets) % size
+            for start in range(0, full, size):
+                groups.append(tickets[start:start + size])
+            for ticket in tickets[full:]:
+                if now - ticket.enqueued >= skill_widen_after:
+                    by_latency.setdefault(key[1], []).append(ticket)
+                else:
+                    kept.setdefault(key, []).append(ticket)
+
+        stale: list[Ticket] = []
+        for tickets in by_latency.values():
+            # Соседи по рейтингу попадают в один матч
+            tickets.sort(key=lambda ticket: ticket.skill)
+            full = len(tickets) - len(tickets) % size
+            for start in range(0, full, size):
+                groups.append(tickets[start:start + size])
+            stale.extend(tickets[full:])
+
+        if stale:
+            stale.sort(key=lambda ticket: ticket.skill)
+            oldest = min(ticket.enqueued for ticket in stale)
+            if len(stale) >= min_size and now - oldest >= self.latency_widen_after:
+                for start in range(0, len(stale), size):
+                    groups.append(stale[start:start + size])
+                # Хвосту меньше min_size игроков не хватает на матч, он ждёт дальше
+                if len(groups[-1]) < min_size:
+                    stale = groups.pop()
+                else:
+                    stale = []
+            if stale:
+                bucket = self.bucket
+                for ticket in stale:
+                    kept.setdefault(bucket(ticket), []).append(ticket)
+
+        self.waiting[mode] = kept
+        return groups
+
+    async def run_pass(self) -> int:
+        """Один проход подбора по всем режимам; возвращает число собранных матчей"""
+        now = self.clock()
+        started = []
+        matches = 0
+        for mode in self.match_sizes:
+            self.collect(mode)
+            groups = self.match(mode, now)
+            if groups:
+                matches += len(groups)
+                self.stats_by_mode[mode].matches += len(groups)
+                started.append(self.start_matches(mode, groups))
+        if started:
+            await asyncio.gather(*started)
+        return matches
+
+    async def start_matches(self, mode: str, groups: list[list[Ticket]]) -> None:
+        """Создаёт комнаты собранных матчей одним пакетом и подключает к ним игроков"""
+        stats = self.stats_by_mode[mode]
+        for group in groups:
+            for ticket in group:
+                if self.tickets.get(ticket.sid) is ticket:
+                    del self.tickets[ticket.sid]
+                    stats.queued -= 1
+
+        try:
+            if mode == DUEL_MODE:
+                brackets = []
+                for group in groups:
+                    seeded = sorted(group, key=lambda ticket: -ticket.skill)
+                    brackets.append((DuelBracket([ticket.sid for ticket in seeded]), {t.sid: t for t in group}))
+                await self._start_rounds(brackets)
+                return
+
+            room_ids = self.rooms.create_rooms(len(groups), mode, reserved=True)
+            await asyncio.gather(*(
+                self._place(room_id, mode, [(ticket.sid, ticket) for ticket in group])
+                for group, room_id in zip(groups, room_ids)
+            ))
+        except Exception as error:  # noqa: BLE001 - ошибка матча передаётся ждущим его игрокам
+            for group in groups:
+                for ticket in group:
+                    if not ticket.future.done():
+                        ticket.future.set_exception(error)
+
+    async def _start_rounds(self, brackets: list[tuple[DuelBracket, dict[str, Ticket]]]) -> None:
+        """Начинает следующий круг сеток; комнаты всех их дуэлей создаются одним пакетом"""
+        duels = []
+        placements = []
+        for bracket, tickets in brackets:
+            for index, players in enumerate(bracket.next_round()):
+                duels.append((bracket, index, players, tickets))
+            if bracket.finished:
+                self.brackets_finished += 1
+                if bracket.champion is not None:
+                    placements.append(self._announce(bracket.champion, {'mode': DUEL_MODE, 'champion': True}))
+            elif bracket.bye is not None:
+                # Игрок без пары ждёт следующего круга вне комнаты
+                placements.append(self._announce(bracket.bye, {'mode': DUEL_MODE, 'room': None}, tickets))
+
+        room_ids = self.rooms.create_rooms(len(duels), 'classic', reserved=True) if duels else []
+        for (bracket, index, players, tickets), room_id in zip(duels, room_ids):
+            self.duels[room_id] = (bracket, index)
+            placements.append(self._place(room_id, DUEL_MODE, [(sid, tickets.get(sid)) for sid in players]))
+        await asyncio.gather(*placements)
+
+    async def _place(self, room_id: int, mode: str, players: list[tuple[str, Ticket | None]]) -> None:
+        """Подключает игроков матча к его комнате (задача на матч, а не на игрока)"""
+        cancelled = []
+        for sid, ticket in players:
+            # Отдаём управление циклу событий, чтобы большой проход не задерживал тики игр
+            await asyncio.sleep(0)
+            if ticket is not None and ticket.future.done():
+                # Игрок отменил заявку, пока собирался матч
+                continue
+            response = {**await self.rooms.join_player(sid, room_id), 'mode': mode}
+            if ticket is not None and ticket.future.done():
+                cancelled.append(sid)
+                continue
+            await self._announce(sid, response, {sid: ticket} if ticket is not None else None)
+        # Отменивших выводим после всех подключений: опустевшая комната матча закрывается
+        for sid in cancelled:
+            self.rooms.leave(sid)
+
+    async def _announce(self, sid: str, response: dict, tickets: dict[str, Ticket] | None = None) -> None:
+        """Отвечает на заявку игрока или, если на неё уже ответили, шлёт сообщение через notify"""
+        ticket = tickets.get(sid) if tickets else None
+        if ticket is not None and not ticket.future.done():
+            ticket.future.set_result(response)
+            self.stats_by_mode[ticket.mode].observe(self.clock() - ticket.enqueued)
+        elif self.notify is not None:
+            await self.notify(sid, response)
+
+    def on_room_finished(self, room_id: int, winner: str | None) -> None:
+        """Слушатель окончания игры в комнате: продвигает сетку, если это была её дуэль"""
+        entry = self.duels.pop(room_id, None)
+        if entry is None:
+            return
+        bracket, index = entry
+        if bracket.report(index, winner):
+            task = asyncio.ensure_future(self._start_rounds([(bracket, {})]))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_pass()
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            'modes': {mode: stats.as_dict() for mode, stats in self.stats_by_mode.items()},
+            'duels': len(self.duels),
+            'brackets_finished': self.brackets_finished,
+        }
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+# Тип содержимого текстового формата Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def merge_profiles(profiles: Iterable[dict]) -> dict | None:
+    """Складывает отчёты TickProfiler.as_dict() нескольких процессов"""
+    merged: dict | None = None
+    for profile in profiles:
+        if merged is None:
+            merged = {
+                key: dict(value) if isinstance(value, dict) else value
+                for key, value in profile.items()
+            }
+            continue
+        for key, value in profile.items():
+            if isinstance(value, dict):
+                target = merged.setdefault(key, {})
+                for name, amount in value.items():
+                    target[name] = target.get(name, 0) + amount
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def render_metrics(profile: dict | None, games: dict[str, dict], matchmaking: dict[str, dict] | None = None) -> str:
+    """
+    Формирует метрики в текстовом формате Prometheus.
+
+    Параметры:
+    - profile: dict | None - отчёт TickProfiler.as_dict() (None, если профилирование выключено)
+    - games: dict[str, dict] - статистика тиков игр (TickStats.as_dict()) по меткам игр
+    - matchmaking: dict[str, dict] | None - статистика подбора (MatchStats.as_dict()) по режимам
+    """
+    lines: list[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    family('tanks_tick_duration_seconds', 'histogram', 'Длительность тика игры')
+    for game, stats in games.items():
+        for bound, count in stats['histogram'].items():
+            lines.append(f'tanks_tick_duration_seconds_bucket{{game="{game}",le="{bound}"}} {count}')
+        lines.append(f'tanks_tick_duration_seconds_sum{{game="{game}"}} {stats["total_time"]}')
+        lines.append(f'tanks_tick_duration_seconds_count{{game="{game}"}} {stats["ticks"]}')
+
+    family('tanks_tick_overruns_total', 'counter', 'Тики, не уложившиеся в бюджет')
+    for game, stats in games.items():
+        lines.append(f'tanks_tick_overruns_total{{game="{game}"}} {stats["overruns"]}')
+
+    family('tanks_dropped_ticks_total', 'counter', 'Тики, пропущенные из-за ограничения догоняния')
+    for game, stats in games.items():
+        lines.append(f'tanks_dropped_ticks_total{{game="{game}"}} {stats["dropped_ticks"]}')
+
+    family('tanks_tick_errors_total', 'counter', 'Исключения в тиках игры и в слушателях тиков')
+    for game, stats in games.items():
+        lines.append(f'tanks_tick_errors_total{{game="{game}"}} {stats["errors"]}')
+
+    family('tanks_tick_jitter_seconds_total', 'counter', 'Суммарное отклонение промежутков между тиками от шага')
+    for game, stats in games.items():
+        lines.append(f'tanks_tick_jitter_seconds_total{{game="{game}"}} {stats["jitter_total"]}')
+
+    family('tanks_tick_jitter_seconds_max', 'gauge', 'Наибольшее отклонение промежутка между тиками от шага')
+    for game, stats in games.items():
+        lines.append(f'tanks_tick_jitter_seconds_max{{game="{game}"}} {stats["jitter_max"]}')
+
+    if matchmaking is not None:
+        family('tanks_matchmaking_queue_depth', 'gauge', 'Игроки в очереди подбора')
+        for mode, stats in matchmaking.items():
+            lines.append(f'tanks_matchmaking_queue_depth{{mode="{mode}"}} {stats["queued"]}')
+
+        family('tanks_matchmaking_matches_total', 'counter', 'Собранные матчи')
+        for mode, stats in matchmaking.items():
+            lines.append(f'tanks_matchmaking_matches_total{{mode="{mode}"}} {stats["matches"]}')
+
+        family('tanks_matchmaking_wait_seconds', 'histogram', 'Время от заявки до матча')
+        for mode, stats in matchmaking.items():
+            for bound, count in stats['histogram'].items():
+                lines.append(f'tanks_matchmaking_wait_seconds_bucket{{mode="{mode}",le="{bound}"}} {count}')
+            lines.append(f'tanks_matchmaking_wait_seconds_sum{{mode="{mode}"}} {stats["wait_total"]}')
+            lines.append(f'tanks_matchmaking_wait_seconds_count{{mode="{mode}"}} {stats["matched"]}')
+
+        family('tanks_matchmaking_wait_seconds_max', 'gauge', 'Наибольшее время от заявки до матча')
+        for mode, stats in matchmaking.items():
+            lines.append(f'tanks_matchmaking_wait_seconds_max{{mode="{mode}"}} {stats["wait_max"]}')
+
+    if profile is not None:
+        family('tanks_profiled_ticks_total', 'counter', 'Тики, прошедшие через профайлер')
+        lines.append(f'tanks_profiled_ticks_total {profile["ticks"]}')
+
+        family('tanks_tick_phase_seconds_total', 'counter', 'Время фаз тика')
+        for phase, seconds in profile['phases'].items():
+            lines.append(f'tanks_tick_phase_seconds_total{{phase="{phase}"}} {seconds}')
+
+        family('tanks_entity_tick_seconds_total', 'counter', 'Время тиков сущностей по типам')
+        for type_name, seconds in profile['entity_time'].items():
+            lines.append(f'tanks_entity_tick_seconds_total{{type="{type_name}"}} {seconds}')
+
+        family('tanks_entity_ticks_total', 'counter', 'Количество тиков сущностей по типам')
+        for type_name, ticks in profile['entity_ticks'].items():
+            lines.append(f'tanks_entity_ticks_total{{type="{type_name}"}} {ticks}')
+
+        family('tanks_collision_pairs_total', 'counter', 'Пары узкой фазы: проверенные и столкнувшиеся')
+        lines.append(f'tanks_collision_pairs_total{{result="tested"}} {profile["collision_pairs"]}')
+        lines.append(f'tanks_collision_pairs_total{{result="hit"}} {profile["collision_hits"]}')
+
+        family('tanks_swept_checks_total', 'counter', 'Проверки непрерывных коллизий: проверенные и попавшие')
+        lines.append(f'tanks_swept_checks_total{{result="tested"}} {profile["swept_checks"]}')
+        lines.append(f'tanks_swept_checks_total{{result="hit"}} {profile["swept_hits"]}')
+
+    lines.append('')
+    return '\n'.join(lines)
@@ -7,3 +7,22 @@ class Item(BaseModel):
     name: str
     price: float
     is_offer: Union[bool, None] = None
+
+
+class PlayerStats(BaseModel):
+    player: str
+    kills: int
+    deaths: int
+    damage_dealt: int
+    damage_taken: int
+    matches: int
+    wins: int
+
+
+class MatchResult(BaseModel):
+    time: float
+    room: int
+    mode: str
+    winner: Union[str, None]
+    players: int
+    ticks: int
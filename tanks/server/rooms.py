@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from tanks.consts import INTEREST_RADIUS
+from tanks.game.base import BaseGame
+from tanks.game.scheduler import GameScheduler
+from tanks.network.interest import AreaOfInterest, InterestManager
+from tanks.network.network_manager import NetworkManager, SendCallback
+
+if TYPE_CHECKING:
+    from tanks.entity.tank import Tank
+    from tanks.game.game import Game
+    from tanks.server.stats import StatsRecorder
+    from tanks.world.profiler import TickProfiler
+    from tanks.world.state import ReplayRecorder
+    from tanks.world.tilemap import TileMap
+
+# Слушатель окончания игры комнаты: id комнаты и sid победителя (None - ничья)
+FinishListener = Callable[[int, 'str | None'], None]
+
+
+class JoinError(Exception):
+    """Игрока не удалось подключить к комнате (комната закрыта, воркер не ответил)"""
+
+
+class Room:
+    """Игровая комната: игра, её сетевая рассылка и танки подключённых игроков"""
+    def __init__(self, room_id: int, game: Game) -> None:
+        self.room_id = room_id
+        self.game = game
+        self.game_id: int | None = None  # Идентификатор игры в планировщике
+        self.network = NetworkManager(
+            game.world, interest=InterestManager(AreaOfInterest(radius=INTEREST_RADIUS)),
+        )
+        self.players: dict[str, Tank] = {}
+        self.finished = False  # Об окончании игры уже сообщено слушателям
+        self.replay: ReplayRecorder | None = None  # Запись матча, если реестр их сохраняет
+
+    def join(self, sid: str) -> Tank:
+        """Создаёт танк игрока в случайной свободной точке мира"""
+        from tanks.entity.tank import Tank
+
+        world = self.game.world
+        tank = Tank(
+            x=random.uniform(0, world.width),
+            y=random.uniform(0, world.height),
+            world=world,
+        )
+        if world.tilemap is not None:
+            # На карте с препятствиями перебираем точки, пока не найдём свободную
+            for _ in range(100):
+                if world.tilemap.push_out(tank.x, tank.y, tank.size) is None:
+                    break
+                tank.x = random.uniform(0, world.width)
+                tank.y = random.uniform(0, world.height)
+        world.add_entity(tank)
+        if self.replay is not None:
+            # Вход между тиками попадает в журнал как начало следующего тика
+            self.replay.record_spawn(self.game.tick_count + 1, tank)
+        self.players[sid] = tank
+        self.network.add_client(sid, observer=tank)
+        self.game.inputs.bind(sid, tank)
+        return tank
+
+    def leave(self, sid: str) -> None:
+        tank = self.players.pop(sid, None)
+        if tank is not None and not tank._removed:
+            if self.replay is not None:
+                self.replay.record_remove(self.game.tick_count + 1, tank)
+            tank.remove()
+        self.network.remove_client(sid)
+        self.game.inputs.unbind(sid)
+
+
+class RoomRegistry:
+    """
+    Реестр комнат, которые тикаются планировщиком в текущем процессе.
+
+    После каждого тика снимки мира комнаты передаются в send для каждого
+    подключённого к ней клиента. Если задан profiler, он подключается ко
+    всем создаваемым комнатам, map_path - файл карты препятствий комнат,
+    а mode - имя режима игры комнат (см. tanks.game.modes.MODES).
+
+    Когда режим игры комнаты объявляет победителя, вызываются
+    finish_listeners (так матчмейкер продвигает турнирные сетки). Если
+    задан recorder, в него после каждого тика передаются урон и убийства
+    с участием игроков, а по окончании игры - её итог.
+
+    Комнаты, созданные с reserved (комнаты матчей матчмейкера), закрываются
+    сами: когда их игра окончена и слушатели об этом узнали или когда из
+    них вышел последний игрок.
+
+    Если задан replay_dir, матч каждой комнаты записывается с её создания
+    (ввод игроков, их входы и выходы, см. tanks.world.state.ReplayRecorder)
+    и сохраняется в replay_dir, когда режим объявляет победителя или
+    комната закрывается.
+    """
+    def __init__(self, scheduler: GameScheduler, send: SendCallback, profiler: TickProfiler | None = None,
+                 map_path: str | Path | None = None, mode: str | None = None,
+                 recorder: StatsRecorder | None = None, replay_dir: str | Path | None = None) -> None:
+        self.scheduler = scheduler
+        self.send = send
+        self.profiler = profiler
+        self.map_path = map_path
+        self.mode = mode
+        self.recorder = recorder
+        self.replay_dir = replay_dir
+        self.rooms: dict[int, Room] = {}
+        self.by_sid: dict[str, Room] = {}
+        self.reserved: set[int] = set()  # Комнаты матчей матчмейкера
+        self._by_game: dict[int, Room] = {}
+        self._closing: set[asyncio.Task] = set()
+        self.finish_listeners: list[FinishListener] = []
+        scheduler.add_listener(self.on_tick)
+
+    def preload(self) -> None:
+        """
+        Заранее импортирует игровые модули и загружает карту.
+
+        Без этого всё это происходит при создании первой комнаты; вызывается
+        до fork рабочих процессов, чтобы они получили готовое.
+        """
+        import tanks.entity.tank  # noqa: F401
+        import tanks.game.game  # noqa: F401
+        import tanks.game.modes  # noqa: F401
+
+        if self.map_path is not None:
+            from tanks.world.tilemap import map_asset
+
+            map_asset(self.map_path)
+
+    def load_map(self) -> TileMap | None:
+        """Карта препятствий для новой комнаты (None - мир без карты)"""
+        if self.map_path is None:
+            return None
+        from tanks.world.tilemap import map_asset
+
+        return map_asset(self.map_path).instantiate()
+
+    def create_room(self, room_id: int | None = None, mode: str | None = None, reserved: bool = False) -> Room:
+        """Создаёт комнату с режимом mode (по умолчанию - режимом реестра)"""
+        # Игровые модули импортируются при создании первой комнаты (или в preload)
+        from tanks.game.game import Game
+        from tanks.game.modes import MODES
+
+        tilemap = self.load_map()
+        mode = mode or self.mode
+        mode = MODES[mode]() if mode is not None else None
+        game = Game(profiler=self.profiler, tilemap=tilemap, mode=mode)
+        if self.recorder is not None:
+            game.world.entity_manager.damage_log = []
+        scheduled = self.scheduler.add_game(game)
+        room = Room(scheduled.game_id if room_id is None else room_id, game)
+        room.game_id = scheduled.game_id
+        if self.replay_dir is not None:
+            from tanks.world.state import ReplayRecorder
+
+            room.replay = game.inputs.recorder = ReplayRecorder(game.world, game.tick_count)
+        self.rooms[room.room_id] = room
+        self._by_game[id(game)] = room
+        if reserved:
+            self.reserved.add(room.room_id)
+        return room
+
+    def create_rooms(self, count: int, mode: str | None = None, reserved: bool = False) -> list[int]:
+        """Создаёт пакет комнат с режимом mode и возвращает их id"""
+        return [self.create_room(mode=mode, reserved=reserved).room_id for _ in range(count)]
+
+    async def close_room(self, room_id: int) -> None:
+        await self.scheduler.remove_game(self.detach_room(room_id).game_id)
+
+    def detach_room(self, room_id: int) -> Room:
+        """Убирает комнату из реестра сразу; её игру ещё нужно снять с планировщика"""
+        room = self.rooms.pop(room_id)
+        del self._by_game[id(room.game)]
+        self.reserved.discard(room_id)
+        for sid in list(room.players):
+            self.by_sid.pop(sid, None)
+        self.save_replay(room)
+        return room
+
+    def release_room(self, room_id: int) -> None:
+        """Закрывает комнату, не дожидаясь, пока её игру снимут с планировщика"""
+        task = asyncio.ensure_future(self.scheduler.remove_game(self.detach_room(room_id).game_id))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def save_replay(self, room: Room) -> Path | None:
+        """Сохраняет запись матча комнаты и прекращает запись; возвращает путь файла"""
+        replay = room.replay
+        if replay is None:
+            return None
+        room.replay = room.game.inputs.recorder = None
+        path = Path(self.replay_dir) / f'room-{room.room_id}-{replay.replay.last_tick}.replay'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(replay.replay.to_bytes())
+        return path
+
+    def save_replays(self) -> None:
+        """Сохраняет записи всех комнат (при остановке сервера)"""
+        for room in self.rooms.values():
+            self.save_replay(room)
+
+    def default_room(self) -> Room:
+        """Возвращает первую комнату не из матчмейкера, создавая её при необходимости"""
+        reserved = self.reserved
+        room = next((room for room in self.rooms.values() if room.room_id not in reserved), None)
+        return room if room is not None else self.create_room()
+
+    def join(self, sid: str, room: Room | None = None) -> tuple[Room, Tank]:
+        self.leave(sid)
+        room = room or self.default_room()
+        self.by_sid[sid] = room
+        return room, room.join(sid)
+
+    async def join_player(self, sid: str, room_id: int | None = None) -> dict:
+        """Подключает игрока и возвращает ответ клиенту: комнату и сетевой id танка"""
+        room = None
+        if room_id is not None:
+            room = self.rooms.get(room_id)
+            if room is None:
+                raise JoinError(f'Комнаты {room_id} нет')
+        room, tank = self.join(sid, room)
+        return {'room': room.room_id, 'entity': room.network.id_allocator.get(tank.id)}
+
+    def leave(self, sid: str) -> None:
+        room = self.by_sid.pop(sid, None)
+        if room is not None:
+            room.leave(sid)
+            if not room.players and room.room_id in self.reserved:
+                self.release_room(room.room_id)
+
+    def ack(self, sid: str, tick: int) -> None:
+        """Подтверждение снимка; тики вне уже сыгранных (0..tick_count) отбрасываются"""
+        room = self.by_sid.get(sid)
+        if room is not None and 0 <= tick <= room.game.tick_count:
+            room.network.ack(sid, tick)
+
+    def input(self, sid: str, data) -> None:
+        """Ставит ввод игрока в очередь его комнаты до следующего тика"""
+        room = self.by_sid.get(sid)
+        if room is None:
+            return
+        if isinstance(data, dict) and 'view' not in data:
+            # Клиент не сообщил, какой тик видел: оцениваем по последнему подтверждённому снимку
+            client = room.network.clients.get(sid)
+            if client is not None and client.acked_tick is not None:
+                data = {**data, 'view': client.acked_tick}
+        room.game.inputs.submit(sid, data)
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                'room': room.room_id, 'players': len(room.players), 'inputs': room.game.inputs.stats(),
+                'mode': room.game.mode.stats() if room.game.mode is not None else None,
+            }
+            for room in self.rooms.values()
+        ]
+
+    def metrics(self) -> tuple[dict | None, dict[str, dict]]:
+        """Отчёт профайлера и статистика тиков игр для render_metrics"""
+        profile = self.profiler.as_dict() if self.profiler is not None else None
+        return profile, {str(game_id): stats for game_id, stats in self.scheduler.stats().items()}
+
+    async def on_tick(self, game: BaseGame) -> None:
+        room = self._by_game.get(id(game))
+        if room is None:
+            return
+        if room.replay is not None:
+            room.replay.end_tick(game.tick_count)
+        await room.network.broadcast(game.tick_count, self.send)
+        if self.recorder is not None:
+            self.record_damage(room)
+        mode = room.game.mode
+        if mode is not None and mode.finished and not room.finished:
+            room.finished = True
+            self.save_replay(room)
+            winner = next((sid for sid, tank in room.players.items() if tank is mode.winner), None)
+            if self.recorder is not None:
+                self.recorder.match(room.room_id, mode.name, winner, list(room.players), mode.finished_tick)
+            for listener in self.finish_listeners:
+                listener(room.room_id, winner)
+            if room.room_id in self.reserved:
+                self.release_room(room.room_id)
+
+    def record_damage(self, room: Room) -> None:
+        """Передаёт в recorder урон прошедших тиков, в котором участвовал хотя бы один игрок"""
+        manager = room.game.world.entity_manager
+        log = manager.damage_log
+        if not log:
+            return
+        manager.damage_log = []
+        owners = {id(tank): sid for sid, tank in room.players.items()}
+        tick = room.game.tick_count
+        for target, source, amount, killed in log:
+            target_sid = owners.get(id(target))
+            source_sid = owners.get(id(source)) if source is not None else None
+            if target_sid is not None or source_sid is not None:
+                self.recorder.damage(room.room_id, tick, source_sid, target_sid, amount, killed)
@@ -1,8 +1,12 @@
-from typing import Union
+from typing import Literal, Union
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 
-from .models import Item
+from . import socket_manager
+from .game_loop import scheduler
+from .metrics import CONTENT_TYPE, render_metrics
+from .models import Item, MatchResult, PlayerStats
 
 router = APIRouter()
 
@@ -20,3 +24,53 @@ def read_item(item_id: int, q: Union[str, None] = None):
 @router.put("/items/{item_id}")
 def update_item(item_id: int, item: Item):
     return {"item_name": item.name, "item_id": item_id}
+
+
+@router.get("/scheduler/stats")
+def read_scheduler_stats():
+    return scheduler.stats()
+
+
+@router.get("/rooms/stats")
+def read_room_stats():
+    return socket_manager.rooms.stats()
+
+
+@router.get("/matchmaking/stats")
+def read_matchmaking_stats():
+    return socket_manager.matchmaker.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    text = render_metrics(*socket_manager.rooms.metrics(), matchmaking=socket_manager.matchmaker.stats()['modes'])
+    return PlainTextResponse(text, media_type=CONTENT_TYPE)
+
+
+def get_recorder():
+    if socket_manager.recorder is None:
+        raise HTTPException(status_code=404, detail='Статистика матчей не записывается (запустите сервер с --stats-db)')
+    return socket_manager.recorder
+
+
+@router.get("/leaderboard", response_model=list[PlayerStats])
+def read_leaderboard(order: Literal['kills', 'wins', 'damage'] = 'kills', limit: int = Query(10, ge=1, le=100)):
+    return get_recorder().leaderboard(order, limit)
+
+
+@router.get("/players/{player}/stats", response_model=PlayerStats)
+def read_player_stats(player: str):
+    stats = get_recorder().player(player)
+    if stats is None:
+        raise HTTPException(status_code=404, detail='Неизвестный игрок')
+    return stats
+
+
+@router.get("/matches/recent", response_model=list[MatchResult])
+def read_recent_matches(limit: int = Query(10, ge=1, le=100)):
+    return get_recorder().recent_matches(limit)
+
+
+@router.get("/stats/pipeline")
+def read_stats_pipeline():
+    return get_recorder().stats()
@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from itertools import count
+from multiprocessing.connection import Connection
+
+from tanks.game.base import BaseGame
+from tanks.game.scheduler import GameScheduler
+from tanks.network.network_manager import SendCallback
+from tanks.server.metrics import merge_profiles
+from tanks.server.rooms import FinishListener, JoinError, RoomRegistry
+from tanks.world.profiler import TickProfiler
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер сообщает о своей загрузке (секунды)
+LOAD_REPORT_INTERVAL = 1.0
+# Сколько фронтенд ждёт ответа воркера на подключение игрока (секунды)
+JOIN_TIMEOUT = 5.0
+
+
+class RoomWorker:
+    """
+    Процесс-воркер, хостящий несколько комнат.
+
+    Внутри воркера работают собственные планировщик и реестр комнат,
+    а команды и снимки передаются через канал (Pipe) к фронтенду.
+    Снимки одного тика отправляются одним сообщением.
+
+    Сообщения фронтенда: ('create_room', room_id, mode, reserved), ('close_room', room_id),
+    ('join', request_id, room_id, sid), ('leave', sid), ('ack', sid, tick),
+    ('input', sid, data), ('stop',).
+    Сообщения воркера: ('joined', request_id, response), ('out', [(sid, data), ...]),
+    ('load', stats), ('finished', room_id, winner_sid). Если подключить игрока
+    не удалось, в response вместо комнаты приходит {'error': описание}.
+    """
+    def __init__(self, conn: Connection, tick_rate: float, profile: bool = False, map_path: str | None = None,
+                 mode: str | None = None, stats_path: str | None = None, replay_dir: str | None = None) -> None:
+        self.conn = conn
+        self.scheduler = GameScheduler(tick_rate=tick_rate)
+        recorder = None
+        if stats_path is not None:
+            from tanks.server.stats import StatsRecorder
+
+            # Воркеры пишут статистику своих комнат в общую базу сами
+            recorder = StatsRecorder(stats_path)
+        self.rooms = RoomRegistry(
+            self.scheduler, self.send_snapshot, TickProfiler() if profile else None, map_path, mode, recorder,
+            replay_dir,
+        )
+        self.rooms.finish_listeners.append(self.on_room_finished)
+        self.scheduler.add_listener(self.flush)
+        self.outbox: list[tuple[str, bytes]] = []
+        self.stopped = asyncio.Event()
+        self._last_report = 0.0
+
+    async def send_snapshot(self, sid: str, data: bytes) -> None:
+        self.outbox.append((sid, data))
+
+    def on_room_finished(self, room_id: int, winner: str | None) -> None:
+        self.conn.send(('finished', room_id, winner))
+
+    async def flush(self, game: BaseGame) -> None:
+        if self.outbox:
+            self.conn.send(('out', self.outbox))
+            self.outbox = []
+
+        now = time.monotonic()
+        if now - self._last_report >= LOAD_REPORT_INTERVAL:
+            self._last_report = now
+            self.conn.send(('load', self.load()))
+
+    def load(self) -> dict:
+        profile, games = self.rooms.metrics()
+        inputs: dict[str, int] = {}
+        for room in self.rooms.stats():
+            for name, value in room['inputs'].items():
+                inputs[name] = inputs.get(name, 0) + value
+        return {
+            'rooms': len(self.rooms.rooms),
+            'players': len(self.rooms.by_sid),
+            'tick_time': sum(game['total_time'] for game in games.values()),
+            'ticks': sum(game['ticks'] for game in games.values()),
+            'inputs': inputs,
+            'games': games,
+            'profile': profile,
+        }
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.conn.fileno(), self.on_readable)
+        if self.rooms.recorder is not None:
+            self.rooms.recorder.start()
+        await self.scheduler.start()
+        await self.stopped.wait()
+        loop.remove_reader(self.conn.fileno())
+        await self.scheduler.stop()
+        self.rooms.save_replays()
+        if self.rooms.recorder is not None:
+            self.rooms.recorder.stop()
+
+    def on_readable(self) -> None:
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                try:
+                    self.handle(*message)
+                except Exception as error:  # noqa: BLE001 - ошибка одной команды не останавливает воркер
+                    logger.exception('Ошибка команды воркера %s', message[0])
+                    if message[0] == 'join':
+                        self.conn.send(('joined', message[1], {'error': f'{type(error).__name__}: {error}'}))
+        except EOFError:
+            # Фронтенд завершился
+            self.stopped.set()
+
+    def handle(self, command: str, *args) -> None:
+        if command == 'create_room':
+            self.rooms.create_room(*args)
+        elif command == 'close_room':
+            # Комната убирается из реестра до следующих команд (например, join в неё)
+            self.rooms.release_room(*args)
+        elif command == 'join':
+            request_id, room_id, sid = args
+            room, tank = self.rooms.join(sid, self.rooms.rooms[room_id])
+            response = {'room': room.room_id, 'entity': room.network.id_allocator.get(tank.id)}
+            self.conn.send(('joined', request_id, response))
+        elif command == 'leave':
+            self.rooms.leave(*args)
+        elif command == 'ack':
+            self.rooms.ack(*args)
+        elif command == 'input':
+            self.rooms.input(*args)
+        elif command == 'stop':
+            self.stopped.set()
+
+
+def worker_main(conn: Connection, tick_rate: float, profile: bool = False, map_path: str | None = None,
+                mode: str | None = None, stats_path: str | None = None, replay_dir: str | None = None) -> None:
+    """Точка входа процесса-воркера"""
+    asyncio.run(RoomWorker(conn, tick_rate, profile, map_path, mode, stats_path, replay_dir).run())
+
+
+class WorkerHandle:
+    """Фронтендовое представление воркера"""
+    def __init__(self, index: int, process: multiprocessing.Process, conn: Connection) -> None:
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.rooms: set[int] = set()
+        self.players = 0
+        self.load: dict = {}
+        # Подключения игроков, ждущие ответа воркера
+        self.requests: set[int] = set()
+
+
+class ShardedRoomManager:
+    """
+    Распределяет комнаты по пулу процессов-воркеров.
+
+    Каждый воркер тикает до rooms_per_worker комнат в своём процессе, так что
+    игры разных воркеров не конкурируют за GIL. Новая комната размещается на
+    наименее загруженном воркере, ввод игроков и снимки мира ходят через Pipe.
+    Интерфейс совпадает с RoomRegistry в части, нужной socket_manager.
+    Комнаты с reserved воркер закрывает сам (см. RoomRegistry), а фронтенд
+    в тот же момент забывает их: по сообщению об окончании игры или когда
+    из комнаты вышел последний игрок.
+
+    Параметры:
+    - workers: int - количество процессов
+    - send: SendCallback - отправка снимка клиенту во фронтенде
+    - tick_rate: float - частота тиков в воркерах
+    - rooms_per_worker: int - максимум комнат на воркер
+    - players_per_room: int - сколько игроков подключать в комнату, прежде чем создать новую
+    - start_method: str | None - способ запуска процессов multiprocessing
+    - profile: bool - включить профилирование тиков в воркерах
+    - map_path: str | None - файл карты препятствий комнат
+    - mode: str | None - режим игры комнат (см. tanks.game.modes.MODES)
+    - stats_path: str | None - база статистики матчей (см. tanks.server.stats)
+    - replay_dir: str | None - каталог записей матчей комнат
+    """
+    def __init__(
+        self,
+        workers: int,
+        send: SendCallback,
+        tick_rate: float = 60.0,
+        rooms_per_worker: int = 32,
+        players_per_room: int = 16,
+        start_method: str | None = None,
+        profile: bool = False,
+        map_path: str | None = None,
+        mode: str | None = None,
+        stats_path: str | None = None,
+        replay_dir: str | None = None,
+    ) -> None:
+        self.worker_count = workers
+        self.send = send
+        self.tick_rate = tick_rate
+        self.rooms_per_worker = rooms_per_worker
+        self.players_per_room = players_per_room
+        self.profile = profile
+        self.map_path = map_path
+        self.mode = mode
+        self.stats_path = stats_path
+        self.replay_dir = replay_dir
+        self.context = multiprocessing.get_context(start_method)
+        self.workers: list[WorkerHandle] = []
+        self.room_workers: dict[int, WorkerHandle] = {}
+        self.room_players: dict[int, int] = {}
+        self.by_sid: dict[str, int] = {}
+        self.reserved: set[int] = set()
+        self.finish_listeners: list[FinishListener] = []
+        self._room_ids = count(1)
+        self._request_ids = count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._outgoing: asyncio.Queue[list[tuple[str, bytes]]] = asyncio.Queue()
+        self._sender: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        for index in range(self.worker_count):
+            parent_conn, child_conn = self.context.Pipe()
+            process = self.context.Process(
+                target=worker_main,
+                args=(child_conn, self.tick_rate, self.profile, self.map_path, self.mode, self.stats_path,
+                      self.replay_dir),
+                name=f'room-worker-{index}', daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            worker = WorkerHandle(index, process, parent_conn)
+            self.workers.append(worker)
+            loop.add_reader(parent_conn.fileno(), self._on_readable, worker)
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            loop.remove_reader(worker.conn.fileno())
+            try:
+                worker.conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self.workers = []
+
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+
+    def least_loaded_worker(self) -> WorkerHandle:
+        """Воркер с наименьшим числом комнат, при равенстве - игроков и времени тиков"""
+        available = [worker for worker in self.workers if len(worker.rooms) < self.rooms_per_worker]
+        if not available:
+            raise RuntimeError('Все воркеры заполнены')
+        return min(available, key=lambda worker: (
+            len(worker.rooms), worker.players, worker.load.get('tick_time', 0.0),
+        ))
+
+    def create_room(self, mode: str | None = None, reserved: bool = False) -> int:
+        worker = self.least_loaded_worker()
+        room_id = next(self._room_ids)
+        worker.conn.send(('create_room', room_id, mode, reserved))
+        worker.rooms.add(room_id)
+        self.room_workers[room_id] = worker
+        self.room_players[room_id] = 0
+        if reserved:
+            self.reserved.add(room_id)
+        return room_id
+
+    def create_rooms(self, count: int, mode: str | None = None, reserved: bool = False) -> list[int]:
+        """Создаёт пакет комнат, распределяя их по наименее загруженным воркерам"""
+        return [self.create_room(mode, reserved) for _ in range(count)]
+
+    async def close_room(self, room_id: int) -> None:
+        self.forget_room(room_id).conn.send(('close_room', room_id))
+
+    def forget_room(self, room_id: int) -> WorkerHandle:
+        """Убирает комнату из учёта фронтенда и возвращает её воркер"""
+        worker = self.room_workers.pop(room_id)
+        worker.rooms.discard(room_id)
+        worker.players -= self.room_players.pop(room_id)
+        self.reserved.discard(room_id)
+        for sid in [sid for sid, room in self.by_sid.items() if room == room_id]:
+            del self.by_sid[sid]
+        return worker
+
+    def default_room(self) -> int:
+        """Наименее заполненная комната со свободными местами (не из матчмейкера) или новая комната"""
+        open_rooms = [
+            room_id for room_id, players in self.room_players.items()
+            if players < self.players_per_room and room_id not in self.reserved
+        ]
+        if not open_rooms:
+            return self.create_room()
+        return min(open_rooms, key=self.room_players.__getitem__)
+
+    async def join_player(self, sid: str, room_id: int | None = None) -> dict:
+        """
+        Подключает игрока к комнате в её воркере и возвращает ответ воркера.
+
+        Если воркер ответил ошибкой, не ответил за JOIN_TIMEOUT секунд или
+        завершился, бросает JoinError.
+        """
+        self.leave(sid)
+        room_id = self.default_room() if room_id is None else room_id
+        worker = self.room_workers.get(room_id)
+        if worker is None:
+            raise JoinError(f'Комнаты {room_id} нет')
+
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        worker.requests.add(request_id)
+        self.by_sid[sid] = room_id
+        self.room_players[room_id] += 1
+        worker.players += 1
+        try:
+            worker.conn.send(('join', request_id, room_id, sid))
+            response = await asyncio.wait_for(future, JOIN_TIMEOUT)
+        except (asyncio.TimeoutError, OSError) as error:
+            response = {'error': f'Воркер {worker.index} не ответил: {type(error).__name__}'}
+        except JoinError as error:
+            response = {'error': str(error)}
+        finally:
+            self._pending.pop(request_id, None)
+            worker.requests.discard(request_id)
+
+        if 'error' in response:
+            # Откатываем учёт игрока; команду leave не шлём - воркер его не подключил
+            if self.by_sid.get(sid) == room_id:
+                del self.by_sid[sid]
+                worker.players -= 1
+                if room_id in self.room_players:
+                    self.room_players[room_id] -= 1
+            raise JoinError(response['error'])
+        return response
+
+    def leave(self, sid: str) -> None:
+        room_id = self.by_sid.pop(sid, None)
+        if room_id is None:
+            return
+        worker = self.room_workers[room_id]
+        worker.conn.send(('leave', sid))
+        self.room_players[room_id] -= 1
+        worker.players -= 1
+        if not self.room_players[room_id] and room_id in self.reserved:
+            # Воркер закрывает опустевшую комнату матча сам
+            self.forget_room(room_id)
+
+    def ack(self, sid: str, tick: int) -> None:
+        room_id = self.by_sid.get(sid)
+        if room_id is not None:
+            self.room_workers[room_id].conn.send(('ack', sid, tick))
+
+    def input(self, sid: str, data) -> None:
+        room_id = self.by_sid.get(sid)
+        if room_id is not None:
+            self.room_workers[room_id].conn.send(('input', sid, data))
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                'worker': worker.index, 'rooms': len(worker.rooms), 'players': worker.players,
+                **{key: value for key, value in worker.load.items() if key not in ('games', 'profile')},
+            }
+            for worker in self.workers
+        ]
+
+    def metrics(self) -> tuple[dict | None, dict[str, dict]]:
+        """Отчёты воркеров, сведённые для render_metrics (по последним сообщениям о загрузке)"""
+        profile = merge_profiles(
+            worker.load['profile'] for worker in self.workers if worker.load.get('profile') is not None
+        )
+        games = {
+            f'{worker.index}-{game_id}': stats
+            for worker in self.workers
+            for game_id, stats in worker.load.get('games', {}).items()
+        }
+        return profile, games
+
+    def _on_readable(self, worker: WorkerHandle) -> None:
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                kind = message[0]
+                if kind == 'out':
+                    self._outgoing.put_nowait(message[1])
+                elif kind == 'joined':
+                    future = self._pending.pop(message[1], None)
+                    if future is not None and not future.done():
+                        future.set_result(message[2])
+                elif kind == 'load':
+                    worker.load = message[1]
+                elif kind == 'finished':
+                    for listener in self.finish_listeners:
+                        listener(message[1], message[2])
+                    if message[1] in self.reserved:
+                        self.forget_room(message[1])
+        except EOFError:
+            # Воркер завершился: ждущие его ответа подключения не дождутся
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            for request_id in list(worker.requests):
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_exception(JoinError(f'Воркер {worker.index} завершился'))
+            worker.requests.clear()
+
+    async def _send_loop(self) -> None:
+        while True:
+            batch = await self._outgoing.get()
+            for sid, data in batch:
+                await self.send(sid, data)
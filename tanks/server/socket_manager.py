@@ -1,5 +1,17 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import socketio
 
+from tanks.consts import DEFAULT_SKILL
+from tanks.server.game_loop import scheduler
+from tanks.server.matchmaking import Matchmaker
+from tanks.server.rooms import JoinError, RoomRegistry
+
+if TYPE_CHECKING:
+    from tanks.server.stats import StatsRecorder
+
 sio = socketio.AsyncServer(
     async_mode="asgi", cors_allowed_origins="*",
     transports=["websocket"],
@@ -9,6 +21,79 @@ app = socketio.ASGIApp(
 )
 
 
+async def send_snapshot(sid: str, data: bytes) -> None:
+    await sio.emit('snapshot', data, to=sid)
+
+
+async def send_match(sid: str, data: dict) -> None:
+    await sio.emit('match', data, to=sid)
+
+
+# Менеджер комнат: RoomRegistry в текущем процессе или ShardedRoomManager
+rooms = RoomRegistry(scheduler, send_snapshot)
+matchmaker = Matchmaker(rooms, notify=send_match)
+# Статистика матчей и лидерборды (см. create_server); None - не записывается
+recorder: StatsRecorder | None = None
+
+
+def set_room_manager(manager) -> None:
+    global rooms
+    rooms = manager
+    matchmaker.attach(manager)
+
+
 @sio.event
 async def connect(sid, environ):
     print(f"connect {sid}")
+
+
+@sio.event
+async def disconnect(sid, *args):
+    matchmaker.cancel(sid)
+    rooms.leave(sid)
+
+
+@sio.event
+async def join(sid, data=None):
+    try:
+        return await rooms.join_player(sid)
+    except JoinError as error:
+        return {'error': str(error)}
+
+
+@sio.event
+async def queue(sid, data=None):
+    """Очередь подбора: {'mode': 'duel', 'skill': 1200, 'latency': 0.04}; ответ - как у join"""
+    data = data if isinstance(data, dict) else {}
+    try:
+        future = matchmaker.enqueue(
+            sid, mode=str(data.get('mode', 'classic')), skill=float(data.get('skill', DEFAULT_SKILL)),
+            latency=float(data.get('latency', 0.0)),
+        )
+    except (TypeError, ValueError) as error:
+        return {'error': str(error)}
+    try:
+        return await future
+    except JoinError as error:
+        return {'error': str(error)}
+
+
+@sio.event
+async def snapshot_ack(sid, tick):
+    # Тик приходит от клиента: неверный формат просто отбрасываем
+    try:
+        tick = int(tick)
+    except (TypeError, ValueError, OverflowError):
+        return
+    rooms.ack(sid, tick)
+
+
+@sio.on('input')
+async def player_input(sid, data):
+    rooms.input(sid, data)
+
+
+@sio.event
+async def echo(sid, data=None):
+    # Клиент замеряет по подтверждению время приема-передачи
+    return data
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from tanks.consts import (
+    STATS_BATCH_SIZE, STATS_CACHE_SIZE, STATS_CACHE_TTL, STATS_FLUSH_INTERVAL, STATS_MAX_PENDING,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз при остановке повторять запись, которая не удалась
+STOP_RETRIES = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS damage (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    room INTEGER NOT NULL,
+    tick INTEGER NOT NULL,
+    attacker TEXT,
+    target TEXT,
+    amount INTEGER NOT NULL,
+    killed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS damage_attacker ON damage (attacker, time);
+CREATE INDEX IF NOT EXISTS damage_target ON damage (target, time);
+
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    room INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    winner TEXT,
+    players INTEGER NOT NULL,
+    ticks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_time ON matches (time);
+
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    kills INTEGER NOT NULL DEFAULT 0,
+    deaths INTEGER NOT NULL DEFAULT 0,
+    damage_dealt INTEGER NOT NULL DEFAULT 0,
+    damage_taken INTEGER NOT NULL DEFAULT 0,
+    matches INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_kills ON players (kills DESC);
+CREATE INDEX IF NOT EXISTS players_wins ON players (wins DESC);
+CREATE INDEX IF NOT EXISTS players_damage ON players (damage_dealt DESC);
+'''
+
+# Счётчики игрока в порядке столбцов таблицы players
+PLAYER_FIELDS = ('kills', 'deaths', 'damage_dealt', 'damage_taken', 'matches', 'wins')
+KILLS, DEATHS, DAMAGE_DEALT, DAMAGE_TAKEN, MATCHES, WINS = range(len(PLAYER_FIELDS))
+
+# Порядки лидерборда: имя в запросе - индексированный столбец players
+LEADERBOARD_ORDERS = {'kills': 'kills', 'wins': 'wins', 'damage': 'damage_dealt'}
+
+INSERT_DAMAGE = 'INSERT INTO damage (time, room, tick, attacker, target, amount, killed) VALUES (?, ?, ?, ?, ?, ?, ?)'
+INSERT_MATCH = 'INSERT INTO matches (time, room, mode, winner, players, ticks) VALUES (?, ?, ?, ?, ?, ?)'
+UPSERT_PLAYER = (
+    f'INSERT INTO players (player, {", ".join(PLAYER_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT (player) DO UPDATE SET '
+    + ', '.join(f'{field} = {field} + excluded.{field}' for field in PLAYER_FIELDS)
+)
+
+
+def connect(path: str | Path) -> sqlite3.Connection:
+    """
+    Открывает базу статистики, создавая таблицы при необходимости.
+
+    Журнал WAL позволяет читать лидерборды, пока идёт запись, и писать в
+    одну базу из нескольких процессов-воркеров.
+    """
+    db = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+    db.execute('PRAGMA journal_mode = WAL')
+    db.execute('PRAGMA synchronous = NORMAL')
+    db.executescript(SCHEMA)
+    return db
+
+
+class StatsRecorder:
+    """
+    Запись убийств, урона и итогов матчей в SQLite без ожидания диска в тике.
+
+    Тик только добавляет событие в очередь в памяти (deque). Фоновый поток
+    раз в flush_interval забирает накопленное пачками по batch_size
+    событий и пишет каждую пачку одной транзакцией: строки урона и матчей
+    вставляются executemany, а счётчики игроков сначала суммируются в
+    памяти и обновляются одним UPSERT на игрока за пачку. Если запись не
+    успевает и в очереди больше max_pending событий, новые события
+    отбрасываются (и считаются в dropped), а не копятся без предела.
+    Пачка, которую не удалось записать (например, база занята другим
+    процессом дольше таймаута), возвращается в начало очереди и пишется
+    в следующий раз; ошибки считаются в errors, поток записи продолжает работу.
+
+    Лидерборды читаются отдельным соединением по индексам таблицы players,
+    и ответы кэшируются на cache_ttl секунд. В кэше не больше cache_size
+    ответов: при переполнении вытесняется давно не запрошенный (LRU), так
+    что запросы статистики произвольных игроков не копят память.
+
+    Параметры:
+    - path: str | Path - файл базы
+    - flush_interval: float - период записи в секундах
+    - batch_size: int - событий в одной транзакции
+    - max_pending: int - сколько событий может ждать записи
+    - cache_ttl: float - время жизни кэша чтений в секундах
+    - cache_size: int - сколько ответов хранит кэш чтений
+    """
+    def __init__(self, path: str | Path, flush_interval: float = STATS_FLUSH_INTERVAL,
+                 batch_size: int = STATS_BATCH_SIZE, max_pending: int = STATS_MAX_PENDING,
+                 cache_ttl: float = STATS_CACHE_TTL, cache_size: int = STATS_CACHE_SIZE) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._pending: deque[tuple] = deque()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._reader: sqlite3.Connection | None = None
+        self._read_lock = threading.Lock()
+        self._cache: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.flush_time_max = 0.0
+
+    def start(self) -> None:
+        """Создаёт таблицы и запускает поток записи"""
+        connect(self.path).close()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='stats-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Дописывает накопленные события и останавливает поток записи"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _push(self, event: tuple) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(event)
+        self.recorded += 1
+
+    def damage(self, room: int, tick: int, attacker: str | None, target: str | None, amount: int,
+               killed: bool) -> None:
+        """Урон игроку или от игрока (None - бот или окружение)"""
+        self._push(('damage', time.time(), room, tick, attacker, target, amount, killed))
+
+    def match(self, room: int, mode: str, winner: str | None, players: list[str], ticks: int) -> None:
+        """Итог матча: победитель (None - ничья) и игроки, бывшие в комнате к концу"""
+        self._push(('match', time.time(), room, mode, winner, tuple(players), ticks))
+
+    def _run(self) -> None:
+        db = None
+        retries = 0
+        try:
+            while True:
+                stopping = self._stopping.wait(self.flush_interval)
+                try:
+                    if db is None:
+                        db = connect(self.path)
+                    self.flush(db)
+                except Exception as error:  # noqa: BLE001 - поток записи не должен завершаться
+                    self._fail(error)
+                    if stopping and retries < STOP_RETRIES:
+                        retries += 1
+                        continue
+                if stopping:
+                    break
+        finally:
+            if db is not None:
+                db.close()
+
+    def _fail(self, error: Exception) -> None:
+        logger.exception('Не удалось записать статистику матчей в %s', self.path)
+        self.errors += 1
+        self.last_error = f'{type(error).__name__}: {error}'
+
+    def flush(self, db: sqlite3.Connection) -> None:
+        """
+        Пишет все накопленные события пачками по batch_size. Если пачку
+        записать не удалось, она возвращается в начало очереди, а ошибка
+        передаётся дальше.
+        """
+        pending = self._pending
+        while pending:
+            batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+            started = time.perf_counter()
+            try:
+                self._write(db, batch)
+            except Exception:
+                pending.extendleft(reversed(batch))
+                raise
+            elapsed = time.perf_counter() - started
+            self.written += len(batch)
+            self.batches += 1
+            if elapsed > self.flush_time_max:
+                self.flush_time_max = elapsed
+
+    def _write(self, db: sqlite3.Connection, batch: list[tuple]) -> None:
+        damage_rows = []
+        match_rows = []
+        players: dict[str, list[int]] = {}
+
+        def counters(player: str) -> list[int]:
+            values = players.get(player)
+            if values is None:
+                values = players[player] = [0] * len(PLAYER_FIELDS)
+            return values
+
+        for event in batch:
+            if event[0] == 'damage':
+                _, at, room, tick, attacker, target, amount, killed = event
+                damage_rows.append((at, room, tick, attacker, target, amount, killed))
+                if attacker is not None and attacker != target:
+                    values = counters(attacker)
+                    values[DAMAGE_DEALT] += amount
+                    values[KILLS] += killed
+                if target is not None:
+                    values = counters(target)
+                    values[DAMAGE_TAKEN] += amount
+                    values[DEATHS] += killed
+            else:
+                _, at, room, mode, winner, participants, ticks = event
+                match_rows.append((at, room, mode, winner, len(participants), ticks))
+                for player in participants:
+                    counters(player)[MATCHES] += 1
+                if winner is not None:
+                    counters(winner)[WINS] += 1
+
+        with db:
+            db.executemany(INSERT_DAMAGE, damage_rows)
+            db.executemany(INSERT_MATCH, match_rows)
+            db.executemany(UPSERT_PLAYER, [(player, *values) for player, values in players.items()])
+
+    def _read(self, key: tuple, query: str, params: tuple = ()) -> list[dict]:
+        """Строки запроса как словари; ответ кэшируется на cache_ttl секунд"""
+        now = time.monotonic()
+        cache = self._cache
+        with self._read_lock:
+            cached = cache.get(key)
+            if cached is not None and cached[0] > now:
+                cache.move_to_end(key)
+                return cached[1]
+            if self._reader is None:
+                self._reader = connect(self.path)
+                self._reader.row_factory = sqlite3.Row
+            rows = [dict(row) for row in self._reader.execute(query, params)]
+            cache[key] = (now + self.cache_ttl, rows)
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return rows
+
+    def leaderboard(self, order: str = 'kills', limit: int = 10) -> list[dict]:
+        """Лучшие игроки по order (см. LEADERBOARD_ORDERS)"""
+        column = LEADERBOARD_ORDERS.get(order)
+        if column is None:
+            raise ValueError(f'Неизвестный порядок лидерборда: {order}')
+        return self._read(
+            ('leaderboard', column, limit),
+            f'SELECT player, {", ".join(PLAYER_FIELDS)} FROM players ORDER BY {column} DESC LIMIT ?', (limit,),
+        )
+
+    def player(self, player: str) -> dict | None:
+        rows = self._read(
+            ('player', player), f'SELECT player, {", ".join(PLAYER_FIELDS)} FROM players WHERE player = ?', (player,),
+        )
+        return rows[0] if rows else None
+
+    def recent_matches(self, limit: int = 10) -> list[dict]:
+        return self._read(
+            ('matches', limit),
+            'SELECT time, room, mode, winner, players, ticks FROM matches ORDER BY time DESC LIMIT ?', (limit,),
+        )
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._pending),
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'cached': len(self._cache),
+            'flush_time_max': self.flush_time_max,
+        }
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+from tanks.consts import AI_FAR_INTERVAL, AI_NEAR_INTERVAL, AI_THINK_BUDGET, INTEREST_RADIUS
+from tanks.world.physics import FIELD_INDEX
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy является опциональной зависимостью
+    np = None
+
+if TYPE_CHECKING:
+    from tanks.entity.tank_bot import TankBot
+    from tanks.world.physics import VectorizedPhysics
+
+# С какого размера пакета углы и расстояния считаются на NumPy
+VECTOR_BATCH = 32
+
+
+class AIScheduler:
+    """
+    Планировщик решений ботов (TankBot.think).
+
+    Бот решает не каждый тик: рядом с целью - раз в near_interval тиков,
+    дальше near_radius - раз в far_interval, а между решениями только
+    исполняет последнее (поворот к запомненному направлению, газ, выстрел).
+    За тик решают не больше budget ботов, первыми - дольше всех ждущие,
+    поэтому затраты на решения ограничены при любом числе ботов.
+
+    В векторизованном мире углы и расстояния всех решающих в тике ботов
+    считаются одним пакетом прямо по массивам VectorizedPhysics; без него
+    пакет не окупает перенос координат в массивы, и бот решает сам.
+
+    Бюджет задан числом решений, а не временем, чтобы тик оставался
+    детерминированным при повторной симуляции.
+
+    Параметры:
+    - budget: int - решений ботов за тик
+    - near_radius: float - расстояние до цели, ближе которого бот решает часто
+    - near_interval, far_interval: int - период решений в тиках рядом с целью и вдали от неё
+    """
+    def __init__(self, budget: int = AI_THINK_BUDGET, near_radius: float = INTEREST_RADIUS,
+                 near_interval: int = AI_NEAR_INTERVAL, far_interval: int = AI_FAR_INTERVAL) -> None:
+        self.budget = budget
+        self.near_radius = near_radius
+        self.near_interval = near_interval
+        self.far_interval = far_interval
+
+        self.thinks = 0
+        self.deferred = 0  # Решения, перенесённые из-за исчерпания бюджета
+
+    def select(self, seekers: Iterable[TankBot]) -> list[TankBot]:
+        """Отбирает ботов, которые решают в этом тике"""
+        due = []
+        for bot in seekers:
+            if bot._removed:
+                continue
+            bot.think_wait += 1
+            # Ждущие маршрут тоже решают: навигация обслуживает только решающих
+            if bot.think_wait >= bot.think_interval or bot.route_wait:
+                due.append(bot)
+        if len(due) > self.budget:
+            # Сортировка устойчива: при равном опоздании - в порядке сущностей
+            due.sort(key=lambda bot: bot.think_interval - bot.think_wait)
+            self.deferred += len(due) - self.budget
+            due = due[:self.budget]
+        return due
+
+    def think(self, bots: list[TankBot], physics: VectorizedPhysics | None = None) -> None:
+        """Принимает решения за ботов и назначает им период следующего решения"""
+        if physics is not None and len(bots) >= VECTOR_BATCH:
+            self._think_batch(bots, physics)
+        else:
+            for bot in bots:
+                bot.think()
+        self.thinks += len(bots)
+
+        near_sq = self.near_radius * self.near_radius
+        for bot in bots:
+            bot.think_wait = 0
+            distance = bot.target_distance
+            bot.think_interval = self.near_interval if distance * distance <= near_sq else self.far_interval
+
+    def _think_batch(self, bots: list[TankBot], physics: VectorizedPhysics) -> None:
+        deciding = []
+        rows = []
+        target_rows = []
+        # Точки маршрутов: индекс в пакете и координаты
+        steering = []
+        for bot in bots:
+            target = bot.target
+            if target is None:
+                continue
+            if not target.physics_batched:
+                bot.think()
+                continue
+            waypoint = bot.next_waypoint()
+            bot.steering = waypoint is not None
+            if waypoint is not None:
+                steering.append((len(deciding), *waypoint))
+            deciding.append(bot)
+            rows.append(bot._row)
+            target_rows.append(target._row)
+        if not deciding:
+            return
+
+        state = physics.state
+        x = state[FIELD_INDEX['x'], rows]
+        y = state[FIELD_INDEX['y'], rows]
+        dx = state[FIELD_INDEX['x'], target_rows] - x
+        dy = state[FIELD_INDEX['y'], target_rows] - y
+        target_angles = np.arctan2(dy, dx)
+        distances = np.sqrt(dx * dx + dy * dy).tolist()
+        headings = target_angles.copy()
+        if steering:
+            index, aim_x, aim_y = np.array(steering).T
+            index = index.astype(np.intp)
+            headings[index] = np.arctan2(aim_y - y[index], aim_x - x[index])
+        for bot, heading, target_angle, distance in zip(deciding, headings.tolist(), target_angles.tolist(), distances):
+            bot.decide(heading, target_angle, distance)
+
+    def stats(self) -> dict:
+        return {
+            'thinks': self.thinks,
+            'deferred': self.deferred,
+        }
@@ -1,26 +1,159 @@
 from __future__ import annotations
 
-from uuid import UUID
+from contextlib import contextmanager
+from math import inf
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-from tanks.entity.base import BaseEntity
+from tanks.entity.base import BaseEntity, VelocityMixin
+from tanks.entity.typing import EntityId
+from tanks.world.ai import AIScheduler
+from tanks.world.collision import CollisionLayer, Contact, dispatch_contacts, layers_match, narrow_phase, time_of_impact
+from tanks.world.lag import LagCompensator
+from tanks.world.navigation import Navigator
+from tanks.world.physics import VectorizedPhysics
+from tanks.world.pool import ShellPool
+from tanks.world.spatial_hash import SpatialHash
+from tanks.world.targeting import TargetIndex
+
+if TYPE_CHECKING:
+    from tanks.entity.tank import Tank
+    from tanks.world.profiler import TickProfiler
+    from tanks.world.tilemap import TileMap
+    from tanks.entity.tank_shell import TankShell
+
+# Урон по сущности со здоровьем: цель, источник (None - окружение), величина
+# и уничтожена ли им цель
+DamageEvent = tuple[BaseEntity, 'BaseEntity | None', int, bool]
 
 
 class BaseWorld:
-    def __init__(self, width: float = 100.0, height: float = 100.0):
+    """
+    Игровой мир: сущности и, опционально, карта препятствий.
+
+    С картой (tilemap) размеры мира берутся из неё, а width и height игнорируются.
+    """
+    def __init__(self, width: float = 100.0, height: float = 100.0, vectorized: bool = False,
+                 shell_pool_size: int = 256, profiler: TickProfiler | None = None,
+                 tilemap: TileMap | None = None):
+        if tilemap is not None:
+            width, height = tilemap.world_width, tilemap.world_height
         self.width = width
         self.height = height
-        self.entity_manager = EntityManager()
+        self.tilemap = tilemap
+        # Позиции сущностей на начало тика, по ним ловятся проскоки сквозь тонкие стены
+        self._tick_origins: list[tuple[BaseEntity, float, float]] = []
+        self.entity_manager = EntityManager(vectorized=vectorized, shell_pool_size=shell_pool_size)
+        self.entity_manager.profiler = profiler
+        if tilemap is not None:
+            self.entity_manager.navigator = Navigator(tilemap)
+
+    @property
+    def profiler(self) -> TickProfiler | None:
+        return self.entity_manager.profiler
 
     def tick(self) -> None:
-        self.entity_manager.tick()
+        profiler = self.entity_manager.profiler
+        if profiler is not None:
+            profiler.begin()
+
+        if self.tilemap is not None:
+            self._tick_origins = [
+                (entity, entity.x, entity.y) for entity in self.entity_manager.entities.values()
+                if not entity.continuous
+            ]
+
+        # Появления и удаления за тик применяются одним пакетом в конце
+        with self.entity_manager.deferred():
+            self.entity_manager.tick()
+            self.collide()
+            if profiler is not None:
+                profiler.mark('collision')
+
+            # Проверяем и ограничиваем позиции всех сущностей в пределах мира
+            for entity in self.entity_manager.entities.values():
+                if entity._removed:
+                    continue
+                # Проверяем касание краев и вызываем соответствующее событие
+                if entity.x <= entity.size or entity.x >= self.width - entity.size or \
+                   entity.y <= entity.size or entity.y >= self.height - entity.size:
+                    entity.on_world_boundary()
+            if profiler is not None:
+                profiler.mark('boundary')
+
+        # История позиций для компенсации задержки - по состоянию на конец тика
+        self.entity_manager.lag_compensator.record()
+        if profiler is not None:
+            profiler.mark('flush')
+            profiler.end()
+
+    def collide(self) -> None:
+        """Стадия коллизий: каждая пересекающаяся пара обрабатывается один раз за тик"""
+        manager = self.entity_manager
+        dispatch_contacts(manager.find_contacts())
+        tilemap = self.tilemap
+        if tilemap is None:
+            dispatch_contacts(manager.find_swept_contacts())
+            return
 
-        # Проверяем и ограничиваем позиции всех сущностей в пределах мира
-        for entity in list(self.entity_manager.entities.values()):
-            # Проверяем касание краев и вызываем соответствующее событие
-            if entity.x <= entity.size or entity.x >= self.width - entity.size or \
-               entity.y <= entity.size or entity.y >= self.height - entity.size:
-                entity.on_world_boundary()
+        # Путь быстрой сущности обрезается первой стеной, так что за стеной она никого не заденет
+        obstacle_hits = self.clip_paths_to_tiles(tilemap)
+        dispatch_contacts(manager.find_swept_contacts())
+        for entity, tx, ty in obstacle_hits:
+            if not entity._removed:
+                entity.on_obstacle(tx, ty)
+        self.push_out_of_tiles(tilemap)
 
+    def clip_paths_to_tiles(self, tilemap: TileMap) -> list[tuple[BaseEntity, int, int]]:
+        """Переносит быстрые сущности в точку входа в первую стену на пути за тик"""
+        manager = self.entity_manager
+        raycast = tilemap.raycast
+        hits = []
+        for entity in manager.continuous.values():
+            if entity._removed:
+                continue
+            start_x, start_y = entity.prev_x, entity.prev_y
+            end_x, end_y = entity.x, entity.y
+            hit = raycast(start_x, start_y, end_x, end_y)
+            if hit is not None:
+                t, tx, ty = hit
+                entity.x = start_x + (end_x - start_x) * t
+                entity.y = start_y + (end_y - start_y) * t
+                manager.update_entity(entity)
+                hits.append((entity, tx, ty))
+        return hits
+
+    def push_out_of_tiles(self, tilemap: TileMap) -> None:
+        """
+        Выталкивает остальные сущности из стен.
+
+        Сущность, сместившаяся за тик больше чем на полклетки, сначала
+        возвращается к первой стене на своём пути: иначе быстрый танк
+        проскочил бы тонкую стену и был бы вытолкнут с другой стороны.
+        """
+        manager = self.entity_manager
+        push_out = tilemap.push_out
+        raycast = tilemap.raycast
+        half_tile = tilemap.tile_size * 0.5
+        for entity, start_x, start_y in self._tick_origins:
+            if entity._removed:
+                continue
+            x = entity.x
+            y = entity.y
+            hit = None
+            if abs(x - start_x) > half_tile or abs(y - start_y) > half_tile:
+                hit = raycast(start_x, start_y, x, y)
+                if hit is not None:
+                    x = start_x + (x - start_x) * hit[0]
+                    y = start_y + (y - start_y) * hit[0]
+            result = push_out(x, y, entity.size)
+            if result is not None:
+                x, y = result[0], result[1]
+                hit = result
+            if hit is not None:
+                entity.x = x
+                entity.y = y
+                manager.update_entity(entity)
+                entity.on_obstacle(hit[-2], hit[-1])
 
     def add_entity(self, entity: BaseEntity) -> None:
         """Добавляет сущность в мир"""
@@ -32,16 +165,304 @@ class BaseWorld:
 
 
 class EntityManager:
-    def __init__(self) -> None:
-        self.entities: dict[UUID, BaseEntity] = {}
+    """
+    Хранилище сущностей мира.
+
+    Внутри deferred() (весь тик мира) добавления и удаления не меняют
+    entities сразу, а копятся в очередях и применяются одним пакетом при
+    выходе из внешнего deferred(). Удалённая сущность до этого момента
+    остаётся в entities с флагом _removed, новая - ещё не видна.
+
+    Параметры:
+    - cell_size: float - размер ячейки широкой фазы коллизий
+    - vectorized: bool - хранить физику VelocityMixin-сущностей в массивах NumPy
+      и интегрировать её одним пакетом за тик
+    - shell_pool_size: int - размер пула снарядов (0 отключает переиспользование)
+    """
+    def __init__(self, cell_size: float = 4.0, vectorized: bool = False, shell_pool_size: int = 256) -> None:
+        self.entities: dict[EntityId, BaseEntity] = {}
+        self.spatial_hash = SpatialHash(cell_size)
+        self.physics = VectorizedPhysics(cell_size) if vectorized else None
+        self.shell_pool = ShellPool(shell_pool_size)
+        self.target_index = TargetIndex()
+        # Сущности, которые могут быть целями, и сущности, которые ищут цели
+        self.targets: dict[EntityId, BaseEntity] = {}
+        self.seekers: dict[EntityId, BaseEntity] = {}
+        # Быстрые сущности с непрерывной проверкой коллизий
+        self.continuous: dict[EntityId, BaseEntity] = {}
+        # Порядок добавления сущностей, чтобы кандидаты на коллизию
+        # обходились в том же порядке, что и словарь entities
+        self._order: dict[EntityId, int] = {}
+        self._next_order = 0
+        self._next_id = 1
+        # Очереди отложенных изменений (см. deferred)
+        self._defer_depth = 0
+        self._spawn_queue: dict[EntityId, BaseEntity] = {}
+        self._despawn_queue: dict[EntityId, BaseEntity] = {}
+        # Замеры фаз тика (см. tanks.world.profiler); None - без замеров
+        self.profiler: TickProfiler | None = None
+        # Поиск путей в обход препятствий карты; только у миров с картой
+        self.navigator: Navigator | None = None
+        # Распределение решений ботов по тикам
+        self.ai = AIScheduler()
+        # История позиций целей для проверки попаданий с учётом задержки стрелявшего
+        self.lag_compensator = LagCompensator()
+        # Появления и удаления сущностей слоёв event_layers в порядке применения;
+        # их разбирает режим игры (см. tanks.game.modes)
+        self.event_layers = CollisionLayer.NONE
+        self.events: list[tuple[str, BaseEntity]] = []
+        # Урон по сущностям в порядке нанесения (см. HealthMixin.damage);
+        # None - урон не записывается. Разбирает запись статистики матчей
+        self.damage_log: list[DamageEvent] | None = None
+
+    def allocate_id(self) -> EntityId:
+        """Выдаёт новый идентификатор сущности"""
+        entity_id = self._next_id
+        self._next_id += 1
+        return entity_id
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """Откладывает добавления и удаления сущностей до выхода из блока"""
+        self._defer_depth += 1
+        try:
+            yield
+        finally:
+            self._defer_depth -= 1
+            if self._defer_depth == 0:
+                self.flush()
 
     def add_entity(self, entity: BaseEntity) -> None:
-        self.entities[entity.uuid] = entity
+        if self._defer_depth:
+            self._spawn_queue[entity.id] = entity
+        else:
+            self._add_batch((entity,))
+
+    def remove_entity(self, entity: BaseEntity) -> None:
+        if not self._defer_depth:
+            self._remove_batch((entity,))
+        elif self._spawn_queue.pop(entity.id, None) is not None:
+            # Сущность из очереди на появление просто не попадёт в мир
+            if entity.poolable:
+                self.shell_pool.release(entity)
+        else:
+            entity._removed = True
+            self._despawn_queue[entity.id] = entity
+
+    def flush(self) -> None:
+        """Применяет накопленные удаления, затем добавления"""
+        if self._despawn_queue:
+            despawned = self._despawn_queue
+            self._despawn_queue = {}
+            self._remove_batch(despawned.values())
+            # Удалённые за тик снаряды больше нигде не используются
+            self.shell_pool.recycle()
+        if self._spawn_queue:
+            spawned = self._spawn_queue
+            self._spawn_queue = {}
+            self._add_batch(spawned.values())
+
+    def _add_batch(self, entities: Iterable[BaseEntity]) -> None:
+        all_entities = self.entities
+        order = self._order
+        next_order = self._next_order
+        physics = self.physics
+        event_layers = self.event_layers
+        for entity in entities:
+            entity_id = entity.id
+            all_entities[entity_id] = entity
+            order[entity_id] = next_order
+            next_order += 1
+            if physics is not None and isinstance(entity, VelocityMixin):
+                physics.add(entity)
+            if entity.targetable:
+                self.targets[entity_id] = entity
+                self.target_index.dirty = True
+            if entity.seeks_targets:
+                self.seekers[entity_id] = entity
+            if entity.continuous:
+                self.continuous[entity_id] = entity
+            if entity.lag_compensated:
+                self.lag_compensator.track(entity)
+            if entity.collision_layer & event_layers:
+                self.events.append(('spawn', entity))
+        self._next_order = next_order
+        self.spatial_hash.insert_many(entities)
+
+    def _remove_batch(self, entities: Iterable[BaseEntity]) -> None:
+        all_entities = self.entities
+        order = self._order
+        event_layers = self.event_layers
+        for entity in entities:
+            entity_id = entity.id
+            del all_entities[entity_id]
+            del order[entity_id]
+            if entity.physics_batched:
+                self.physics.remove(entity)
+            if entity.targetable:
+                del self.targets[entity_id]
+            if entity.seeks_targets:
+                del self.seekers[entity_id]
+            if entity.continuous:
+                del self.continuous[entity_id]
+            if entity.lag_compensated:
+                self.lag_compensator.untrack(entity)
+            if entity.collision_layer & event_layers:
+                self.events.append(('remove', entity))
+        self.spatial_hash.remove_many(entities)
+        # Пул переинициализирует снаряд при выдаче, поэтому возвращаем последним
+        for entity in entities:
+            if entity.poolable:
+                self.shell_pool.release(entity)
 
     def tick(self) -> None:
+        # Одним пакетом находим цели всем ботам, которым пора их обновить
+        profiler = self.profiler
+        due = [seeker for seeker in self.seekers.values() if seeker.target_update_due()]
+        if due:
+            self.target_index.rebuild(self.targets.values())
+            self.target_index.resolve(due)
+        # Решают в этом тике только отобранные планировщиком боты: им пакетом
+        # выдаются маршруты в обход стен (в пределах бюджета) и считаются решения
+        if self.seekers:
+            thinking = self.ai.select(self.seekers.values())
+            if self.navigator is not None and thinking:
+                self.navigator.resolve(thinking)
+            self.ai.think(thinking, self.physics)
+        if profiler is not None:
+            profiler.mark('ai')
+
+        # Выстрелы и попадания во время тика откладываются, поэтому entities
+        # не меняется и обходится без копирования
+        with self.deferred():
+            if profiler is None:
+                for entity in self.entities.values():
+                    if not entity._removed:
+                        entity.tick()
+            else:
+                self._profiled_entity_tick(profiler)
+                profiler.mark('entities')
+
+            if self.physics is not None:
+                self.physics.step()
+                self.physics.sync_spatial_hash(self.spatial_hash)
+                if profiler is not None:
+                    profiler.mark('physics')
+
+        self.shell_pool.recycle()
+        self.target_index.dirty = True
+
+    def _profiled_entity_tick(self, profiler: TickProfiler) -> None:
+        """Тик сущностей с замером стоимости по типам"""
+        clock = profiler.clock
+        observe = profiler.observe_entity
         for entity in self.entities.values():
-            entity.tick()
+            if not entity._removed:
+                started = clock()
+                entity.tick()
+                observe(type(entity).__name__, clock() - started)
 
-    def remove_entity(self, entity: BaseEntity) -> None:
-        del self.entities[entity.uuid]
+    def spawn_shell(self, x: float, y: float, angle: float, velocity: float, creator: Tank) -> TankShell:
+        """Создаёт снаряд (по возможности из пула) и добавляет его в мир"""
+        shell = self.shell_pool.acquire(creator.world, x=x, y=y, angle=angle, velocity=velocity, creator=creator)
+        self.add_entity(shell)
+        return shell
+
+    def nearest_target(self, seeker: BaseEntity, radius: float = inf) -> BaseEntity | None:
+        """
+        Возвращает ближайшую к seeker цель в пределах radius.
+
+        Индекс строится по позициям на начало тика; если он устарел
+        (вызов вне тика, добавление или удаление целей), он перестраивается.
+        """
+        if self.target_index.dirty:
+            self.target_index.rebuild(self.targets.values())
+        return self.target_index.find(seeker, radius)
+
+    def update_entity(self, entity: BaseEntity) -> None:
+        """Обновляет положение сущности в широкой фазе после перемещения"""
+        self.spatial_hash.update(entity)
+
+    def candidate_pairs(self) -> list[Contact]:
+        """Пары сущностей из общих ячеек широкой фазы, каждая по одному разу"""
+        return self.spatial_hash.candidate_pairs()
+
+    def find_contacts(self) -> list[Contact]:
+        """
+        Возвращает список контактов за тик.
+
+        Пары упорядочены по порядку добавления сущностей (сначала более
+        ранняя), так что результат не зависит от раскладки сетки.
+        """
+        order = self._order
+        contacts = []
+        pairs = self.candidate_pairs()
+        for first, second in narrow_phase(pairs):
+            # Быстрые сущности обрабатываются find_swept_contacts
+            if first._removed or second._removed or first.continuous or second.continuous:
+                continue
+            if order[first.id] > order[second.id]:
+                first, second = second, first
+            contacts.append((first, second))
+        contacts.sort(key=lambda pair: (order[pair[0].id], order[pair[1].id]))
+        if self.profiler is not None:
+            self.profiler.collision_pairs += len(pairs)
+            self.profiler.collision_hits += len(contacts)
+        return contacts
+
+    def find_swept_contacts(self) -> list[Contact]:
+        """
+        Непрерывная проверка коллизий для быстрых сущностей.
+
+        Путь сущности за тик - отрезок от (prev_x, prev_y) до текущей позиции.
+        Широкая фаза выбирает сущности из ячеек вокруг отрезка, а из тех, с кем
+        столкновение возможно, берётся ближайшая по времени касания.
+        Сущность переносится в точку касания. Остальные сущности считаются
+        неподвижными в своих позициях на конец тика.
+
+        Для сущности с задержкой стрелявшего (lag) цели из широкой фазы на
+        время проверки откатываются в позиции, которые видел стрелок
+        (см. LagCompensator); область запроса расширяется на путь, который
+        цели могли пройти с тех пор.
+        """
+        query_rect = self.spatial_hash.query_rect
+        compensator = self.lag_compensator
+        contacts = []
+        checks = 0
+        for entity in self.continuous.values():
+            if entity._removed:
+                continue
+
+            start_x, start_y = entity.prev_x, entity.prev_y
+            end_x, end_y = entity.x, entity.y
+            radius = entity.size
+            lag = entity.lag
+            reach = radius + compensator.reach(lag - 1) if lag else radius
+            candidates = query_rect(
+                min(start_x, end_x) - reach, min(start_y, end_y) - reach,
+                max(start_x, end_x) + reach, max(start_y, end_y) + reach,
+            )
+            rewound = compensator.rewind(candidates.values(), lag - 1) if lag else None
+
+            hit = None
+            hit_time = 2.0
+            checks += len(candidates)
+            for other in candidates.values():
+                if other is entity or other._removed or other.continuous or not layers_match(entity, other):
+                    continue
+                t = time_of_impact(start_x, start_y, end_x, end_y, radius, other)
+                if t is not None and t < hit_time and entity.collides_with(other):
+                    hit = other
+                    hit_time = t
+            if rewound:
+                compensator.restore(rewound)
 
+            if hit is not None:
+                entity.x = start_x + (end_x - start_x) * hit_time
+                entity.y = start_y + (end_y - start_y) * hit_time
+                self.spatial_hash.update(entity)
+                contacts.append((entity, hit))
+        if self.profiler is not None:
+            self.profiler.swept_checks += checks
+            self.profiler.swept_hits += len(contacts)
+        return contacts
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from math import sqrt
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+
+Contact = tuple['BaseEntity', 'BaseEntity']
+
+
+class CollisionLayer:
+    """
+    Битовые слои коллизий.
+
+    Сущность лежит в слое collision_layer и сталкивается только с теми,
+    чей слой входит в её collision_mask. Пара проверяется, если маска
+    каждой из сущностей содержит слой другой. Слои - обычные int, чтобы
+    проверка в узкой фазе стоила одну битовую операцию.
+    """
+    NONE = 0
+    DEFAULT = 1
+    TANK = 2
+    SHELL = 4
+    ALL = DEFAULT | TANK | SHELL
+
+
+def narrow_phase(pairs: Iterable[Contact]) -> list[Contact]:
+    """Оставляет пары кандидатов, чьи слои совместимы, а круги пересекаются"""
+    contacts = []
+    for first, second in pairs:
+        if not (first.collision_mask & second.collision_layer and second.collision_mask & first.collision_layer):
+            continue
+        dx = first.x - second.x
+        dy = first.y - second.y
+        reach = first.size + second.size
+        if dx * dx + dy * dy < reach * reach:
+            contacts.append((first, second))
+    return contacts
+
+
+def layers_match(first: BaseEntity, second: BaseEntity) -> bool:
+    """Проверяет, что слои пары позволяют ей сталкиваться"""
+    return bool(first.collision_mask & second.collision_layer and second.collision_mask & first.collision_layer)
+
+
+def time_of_impact(start_x: float, start_y: float, end_x: float, end_y: float, radius: float,
+                   other: BaseEntity) -> float | None:
+    """
+    Возвращает долю пути [0, 1], на которой круг радиуса radius, движущийся
+    из (start_x, start_y) в (end_x, end_y), впервые касается круга other,
+    или None, если касания нет. other считается неподвижным.
+    """
+    reach = radius + other.size
+    dx = end_x - start_x
+    dy = end_y - start_y
+    fx = start_x - other.x
+    fy = start_y - other.y
+
+    c = fx * fx + fy * fy - reach * reach
+    if c <= 0:
+        # Круги пересекаются уже в начале пути
+        return 0.0
+
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = fx * dx + fy * dy
+    if b >= 0:
+        # Движение от цели
+        return None
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+
+    t = (-b - sqrt(discriminant)) / a
+    return t if t <= 1.0 else None
+
+
+def dispatch_contacts(contacts: Iterable[Contact]) -> None:
+    """
+    Вызывает on_collision у обеих сущностей каждой пары.
+
+    Пара, одна из сущностей которой уже удалена (например, снаряд попал
+    в другую цель раньше в этом же тике), пропускается.
+    """
+    for first, second in contacts:
+        if first._removed or second._removed:
+            continue
+        first.on_collision(second)
+        if first._removed or second._removed:
+            continue
+        second.on_collision(first)
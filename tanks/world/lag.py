@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Iterable
+
+from tanks.consts import LAG_COMPENSATION_TICKS
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.entity.typing import EntityId
+
+# Сохранённая перед откатом позиция: сущность и её координаты
+Rewound = tuple['BaseEntity', float, float]
+
+
+class LagCompensator:
+    """
+    История позиций сущностей со здоровьем для компенсации задержки игроков.
+
+    Клиент видит мир с опозданием на задержку сети и буфер интерполяции,
+    поэтому снаряд, выпущенный по видимому на экране танку, на сервере
+    проверяется против позиций целей в тот тик, который видел стрелок.
+
+    Позиции хранятся в кольцевых массивах array('d') фиксированного размера:
+    за каждой сущностью закреплена строка, за каждым из последних capacity
+    тиков - столбец, запись в конце тика (record) перезаписывает самый
+    старый столбец. Строки удалённых сущностей переиспользуются.
+
+    Откат (rewind) трогает только переданных ему кандидатов из широкой фазы,
+    а не весь мир, и обязательно отменяется через restore.
+
+    Параметры:
+    - capacity: int - сколько последних тиков хранится
+    - rows: int - начальное число строк (растёт по мере надобности)
+    """
+    def __init__(self, capacity: int = LAG_COMPENSATION_TICKS, rows: int = 64) -> None:
+        self.capacity = capacity
+        self.records = 0  # Сколько раз записывалась история
+        # Строка каждой отслеживаемой сущности
+        self.rows: dict[EntityId, int] = {}
+        self.tracked: dict[EntityId, BaseEntity] = {}
+        self._free: list[int] = []
+        self._row_capacity = 0
+        self._born = array('q')  # Номер первой записи строки
+        self._x = array('d')
+        self._y = array('d')
+        # Наибольшая скорость отслеживаемых сущностей: на сколько дальше
+        # текущих позиций за тик отката могли находиться цели
+        self.max_speed = 0.0
+        self._grow(rows)
+
+        self.rewinds = 0
+
+    def _grow(self, row_capacity: int) -> None:
+        old = self._row_capacity
+        x = array('d', bytes(8 * self.capacity * row_capacity))
+        y = array('d', bytes(8 * self.capacity * row_capacity))
+        for slot in range(self.capacity if old else 0):
+            x[slot * row_capacity:slot * row_capacity + old] = self._x[slot * old:(slot + 1) * old]
+            y[slot * row_capacity:slot * row_capacity + old] = self._y[slot * old:(slot + 1) * old]
+        self._x = x
+        self._y = y
+        self._born.extend([0] * (row_capacity - old))
+        self._free.extend(range(row_capacity - 1, old - 1, -1))
+        self._row_capacity = row_capacity
+
+    def track(self, entity: BaseEntity) -> None:
+        """Начинает записывать историю сущности"""
+        if not self._free:
+            self._grow(self._row_capacity * 2)
+        row = self._free.pop()
+        self.rows[entity.id] = row
+        self.tracked[entity.id] = entity
+        self._born[row] = self.records
+        self.max_speed = max(self.max_speed, getattr(entity, 'max_speed', 0.0))
+
+    def untrack(self, entity: BaseEntity) -> None:
+        row = self.rows.pop(entity.id, None)
+        if row is not None:
+            del self.tracked[entity.id]
+            self._free.append(row)
+
+    def clear(self) -> None:
+        """Забывает историю всех сущностей (например, после восстановления снимка)"""
+        born = self._born
+        for row in self.rows.values():
+            born[row] = self.records
+
+    def record(self) -> None:
+        """Записывает позиции отслеживаемых сущностей на конец тика"""
+        rows = self.rows
+        if not rows:
+            self.records += 1
+            return
+        base = (self.records % self.capacity) * self._row_capacity
+        x = self._x
+        y = self._y
+        for entity_id, entity in self.tracked.items():
+            index = base + rows[entity_id]
+            x[index] = entity.x
+            y[index] = entity.y
+        self.records += 1
+
+    def reach(self, back: int) -> float:
+        """Насколько позиции back записей назад могут отстоять от текущих"""
+        return self.max_speed * (back + 1)
+
+    def rewind(self, entities: Iterable[BaseEntity], back: int) -> list[Rewound]:
+        """
+        Переносит отслеживаемые сущности из entities в позиции back записей
+        назад (0 - конец прошлого тика) и возвращает их текущие позиции для
+        restore. Более ранние, чем хранится, тики заменяются самым старым из
+        сохранённых; сущности без истории остаются на месте.
+        """
+        rows = self.rows
+        records = self.records
+        capacity = self.capacity
+        row_capacity = self._row_capacity
+        born = self._born
+        x = self._x
+        y = self._y
+        saved = []
+        for entity in entities:
+            row = rows.get(entity.id)
+            if row is None:
+                continue
+            steps = min(back, records - born[row] - 1, capacity - 1)
+            if steps < 0:
+                continue
+            index = ((records - 1 - steps) % capacity) * row_capacity + row
+            saved.append((entity, entity.x, entity.y))
+            entity.x = x[index]
+            entity.y = y[index]
+        if saved:
+            self.rewinds += 1
+        return saved
+
+    def restore(self, saved: list[Rewound]) -> None:
+        """Возвращает сущности в позиции, сохранённые rewind"""
+        for entity, x, y in saved:
+            entity.x = x
+            entity.y = y
+
+    def stats(self) -> dict:
+        return {
+            'tracked': len(self.rows),
+            'rewinds': self.rewinds,
+        }
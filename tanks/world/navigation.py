@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from heapq import heappop, heappush
+from math import ceil, floor, inf
+from typing import TYPE_CHECKING, Iterable
+
+from tanks.consts import FLOW_FIELD_AGENTS, NAV_BUDGET, NAV_CACHE_SIZE, NAV_SEARCH_LIMIT
+
+if TYPE_CHECKING:
+    from tanks.entity.tank_bot import TankBot
+    from tanks.world.tilemap import TileMap
+
+TilePos = tuple[int, int]
+Route = tuple[TilePos, ...]
+
+# Соседи клетки: смещение и стоимость шага (прямой - 10, диагональный - 14)
+NEIGHBORS = ((1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10), (1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14))
+
+
+def required_clearance(tilemap: TileMap, radius: float) -> int:
+    """Минимальный зазор клетки, в центре которой помещается круг radius"""
+    # От центра клетки с зазором c до ближайшей стены не меньше (c - 0.5) клеток
+    return max(ceil(radius / tilemap.tile_size + 0.5), 1)
+
+
+def _walkable_step(clearance, width: int, index: int, dx: int, dy: int, need: int) -> bool:
+    # Диагональный шаг не срезает угол стены
+    return clearance[index + dx] >= need and clearance[index + dy * width] >= need
+
+
+def _to_route(came_from: dict[int, int], end: int, width: int) -> Route:
+    """Восстанавливает путь и оставляет только точки поворота"""
+    indexes = [end]
+    while indexes[-1] in came_from:
+        indexes.append(came_from[indexes[-1]])
+    indexes.reverse()
+    return _compress([(index % width, index // width) for index in indexes])
+
+
+def _compress(tiles: list[TilePos]) -> Route:
+    # Первая клетка - старт, её в маршруте нет
+    if len(tiles) < 2:
+        return ()
+    route = []
+    for previous, current, following in zip(tiles, tiles[1:], tiles[2:]):
+        if (current[0] - previous[0], current[1] - previous[1]) != (following[0] - current[0], following[1] - current[1]):
+            route.append(current)
+    route.append(tiles[-1])
+    return tuple(route)
+
+
+def find_path(tilemap: TileMap, start: TilePos, goal: TilePos, need: int,
+              limit: int = NAV_SEARCH_LIMIT) -> tuple[Route | None, int]:
+    """
+    A* по клеткам карты с 8 соседями.
+
+    Проходимы клетки с зазором не меньше need; стартовая и целевая клетки
+    проходимы, если в них нет стены. Возвращает маршрут (клетки поворотов
+    до цели включительно, None - пути нет или поиск превысил limit
+    раскрытий) и число раскрытых клеток.
+    """
+    width = tilemap.width
+    height = tilemap.height
+    clearance = tilemap.clearance
+    start_index = start[1] * width + start[0]
+    goal_index = goal[1] * width + goal[0]
+    goal_x, goal_y = goal
+    if tilemap.tiles[goal_index]:
+        return None, 0
+
+    # Смещения соседей в индексах буфера, чтобы не пересчитывать их в цикле
+    neighbors = [(dx, dy, dy * width + dx, cost) for dx, dy, cost in NEIGHBORS]
+    g_score = {start_index: 0}
+    came_from: dict[int, int] = {}
+    closed = set()
+    heap = [(0, 0, start_index)]
+    sequence = 0
+    expansions = 0
+    while heap:
+        index = heappop(heap)[2]
+        if index == goal_index:
+            return _to_route(came_from, index, width), expansions
+        if index in closed:
+            continue
+        closed.add(index)
+        expansions += 1
+        if expansions > limit:
+            return None, expansions
+
+        y, x = divmod(index, width)
+        base = g_score[index]
+        for dx, dy, offset, cost in neighbors:
+            nx = x + dx
+            ny = y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            neighbor = index + offset
+            if clearance[neighbor] < need and (neighbor != goal_index or tilemap.tiles[neighbor]):
+                continue
+            if dx and dy and (clearance[index + dx] < need or clearance[index + dy * width] < need):
+                # Диагональный шаг не срезает угол стены
+                continue
+            score = base + cost
+            if score < g_score.get(neighbor, inf) and neighbor not in closed:
+                g_score[neighbor] = score
+                came_from[neighbor] = index
+                distance_x = abs(goal_x - nx)
+                distance_y = abs(goal_y - ny)
+                # Октильная эвристика в тех же единицах, что и стоимость шагов
+                sequence += 1
+                if distance_x > distance_y:
+                    estimate = 10 * distance_x + 4 * distance_y
+                else:
+                    estimate = 10 * distance_y + 4 * distance_x
+                heappush(heap, (score + estimate, sequence, neighbor))
+    return None, expansions
+
+
+class FlowField:
+    """
+    Поле расстояний до цели для группы ботов, преследующих одну цель.
+
+    Один поиск Дейкстры от цели обслуживает всех ботов группы: он идёт,
+    пока не будут достигнуты клетки всех ботов (или limit раскрытий), а
+    маршрут каждого бота - спуск по полю из его клетки.
+
+    Параметры:
+    - tilemap: TileMap - карта
+    - goal: TilePos - клетка цели
+    - need: int - требуемый зазор клеток
+    - starts: Iterable[TilePos] - клетки ботов группы
+    - limit: int - предел раскрытий клеток
+    """
+    def __init__(self, tilemap: TileMap, goal: TilePos, need: int, starts: Iterable[TilePos],
+                 limit: int = NAV_SEARCH_LIMIT) -> None:
+        self.goal = goal
+        self.need = need
+        self.width = tilemap.width
+        self.clearance = tilemap.clearance
+        self.distance: dict[int, int] = {}
+        self.expansions = 0
+
+        width = tilemap.width
+        height = tilemap.height
+        clearance = tilemap.clearance
+        pending = {start[1] * width + start[0] for start in starts}
+        goal_index = goal[1] * width + goal[0]
+        if tilemap.tiles[goal_index]:
+            return
+
+        distance = self.distance
+        heap = [(0, goal_index)]
+        best = {goal_index: 0}
+        while heap and pending:
+            score, index = heappop(heap)
+            if index in distance:
+                continue
+            distance[index] = score
+            pending.discard(index)
+            self.expansions += 1
+            if self.expansions > limit:
+                break
+            if clearance[index] < need and index != goal_index:
+                # Клетка бота у стены: в неё можно прийти, но не пройти через неё
+                continue
+
+            x = index % width
+            y = index // width
+            for dx, dy, cost in NEIGHBORS:
+                nx = x + dx
+                ny = y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbor = ny * width + nx
+                if neighbor in distance:
+                    continue
+                # Клетки ботов достижимы, даже если бот прижат к стене
+                if clearance[neighbor] < need and neighbor not in pending:
+                    continue
+                if dx and dy and not _walkable_step(clearance, width, index, dx, dy, need):
+                    continue
+                neighbor_score = score + cost
+                if neighbor_score < best.get(neighbor, inf):
+                    best[neighbor] = neighbor_score
+                    heappush(heap, (neighbor_score, neighbor))
+
+    def route(self, start: TilePos) -> Route | None:
+        """Маршрут из клетки start по убыванию расстояния или None, если клетка не достигнута"""
+        width = self.width
+        need = self.need
+        clearance = self.clearance
+        distance = self.distance
+        index = start[1] * width + start[0]
+        if index not in distance:
+            return None
+        tiles = [start]
+        while distance[index]:
+            x = index % width
+            y = index // width
+            best_index = index
+            best_score = distance[index]
+            for dx, dy, cost in NEIGHBORS:
+                if not 0 <= x + dx < width:
+                    continue
+                neighbor = (y + dy) * width + x + dx
+                score = distance.get(neighbor)
+                if score is None or score + cost != distance[index] or score >= best_score:
+                    continue
+                if score and clearance[neighbor] < need:
+                    continue
+                if dx and dy and not _walkable_step(clearance, width, index, dx, dy, need):
+                    continue
+                best_index = neighbor
+                best_score = score
+            if best_index == index:
+                return None
+            index = best_index
+            tiles.append((index % width, index // width))
+        return _compress(tiles)
+
+
+class Navigator:
+    """
+    Служба поиска путей для ботов мира с картой препятствий.
+
+    Боты, которым нужен маршрут (TankBot.route_request), обслуживаются
+    пакетом до тика сущностей. Если одну цель преследуют не меньше
+    flow_field_agents ботов, им строится общее поле расстояний, иначе -
+    A* для каждого. Маршруты и поля кэшируются до изменения клеток
+    карты (TileMap.revision). Работа за тик ограничена budget раскрытиями
+    клеток: не поместившиеся запросы переносятся на следующие тики,
+    первыми обслуживаются дольше всех ждущие.
+
+    Бюджет считается в раскрытых клетках, а не во времени, чтобы
+    результат тика не зависел от скорости машины.
+
+    Параметры:
+    - tilemap: TileMap - карта мира
+    - budget: int - раскрытий клеток за тик
+    - cache_size: int - сколько маршрутов и полей хранить
+    - flow_field_agents: int - с какого числа ботов на одну цель строить поле
+    """
+    def __init__(self, tilemap: TileMap, budget: int = NAV_BUDGET, cache_size: int = NAV_CACHE_SIZE,
+                 flow_field_agents: int = FLOW_FIELD_AGENTS) -> None:
+        self.tilemap = tilemap
+        self.budget = budget
+        self.cache_size = cache_size
+        self.flow_field_agents = flow_field_agents
+        self.paths: OrderedDict[tuple[TilePos, TilePos, int], Route | None] = OrderedDict()
+        self.fields: OrderedDict[tuple[TilePos, int], FlowField] = OrderedDict()
+        self.revision = tilemap.revision
+
+        self.requests = 0
+        self.deferred = 0  # Запросы, перенесённые из-за исчерпания бюджета
+        self.cache_hits = 0
+        self.searches = 0
+        self.flow_fields = 0
+        self.expansions = 0
+
+    def tile_of(self, x: float, y: float) -> TilePos:
+        tile_size = self.tilemap.tile_size
+        return (
+            min(max(floor(x / tile_size), 0), self.tilemap.width - 1),
+            min(max(floor(y / tile_size), 0), self.tilemap.height - 1),
+        )
+
+    def resolve(self, seekers: Iterable[TankBot]) -> None:
+        """Выдаёт маршруты ботам, которым они нужны, в пределах бюджета тика"""
+        requests = []
+        for bot in seekers:
+            if not bot._removed:
+                goal = bot.route_request()
+                if goal is not None:
+                    requests.append((bot, goal))
+        if not requests:
+            return
+        self.requests += len(requests)
+
+        if self.tilemap.revision != self.revision:
+            # Карта изменилась: кэш мог устареть
+            self.paths.clear()
+            self.fields.clear()
+            self.revision = self.tilemap.revision
+
+        # Первыми обслуживаются дольше всех ждущие, при равенстве - в порядке сущностей
+        requests.sort(key=lambda request: -request[0].route_wait)
+        groups: dict[tuple[TilePos, int], list[tuple[TankBot, TilePos]]] = {}
+        tilemap = self.tilemap
+        for bot, goal in requests:
+            need = required_clearance(tilemap, bot.size)
+            groups.setdefault((goal, need), []).append((bot, self.tile_of(bot.x, bot.y)))
+
+        spent = 0
+        for (goal, need), members in groups.items():
+            if spent >= self.budget:
+                for bot, _ in members:
+                    bot.route_wait += 1
+                self.deferred += len(members)
+                continue
+            if len(members) >= self.flow_field_agents:
+                spent += self._serve_group(goal, need, members)
+            else:
+                for bot, start in members:
+                    if spent >= self.budget:
+                        bot.route_wait += 1
+                        self.deferred += 1
+                        continue
+                    route, cost = self._path(start, goal, need)
+                    spent += cost
+                    bot.set_route(route, goal)
+        self.expansions += spent
+
+    def _path(self, start: TilePos, goal: TilePos, need: int) -> tuple[Route | None, int]:
+        key = (start, goal, need)
+        paths = self.paths
+        if key in paths:
+            self.cache_hits += 1
+            paths.move_to_end(key)
+            return paths[key], 0
+
+        field = self.fields.get((goal, need))
+        if field is not None:
+            route = field.route(start)
+            if route is not None:
+                self.cache_hits += 1
+                return route, 0
+
+        route, cost = find_path(self.tilemap, start, goal, need)
+        self.searches += 1
+        paths[key] = route
+        if len(paths) > self.cache_size:
+            paths.popitem(last=False)
+        return route, cost
+
+    def _serve_group(self, goal: TilePos, need: int, members: list[tuple[TankBot, TilePos]]) -> int:
+        key = (goal, need)
+        field = self.fields.get(key)
+        cost = 0
+        if field is None or any(field.route(start) is None for _, start in members):
+            field = FlowField(self.tilemap, goal, need, [start for _, start in members])
+            cost = field.expansions
+            self.flow_fields += 1
+            self.fields[key] = field
+            if len(self.fields) > self.cache_size:
+                self.fields.popitem(last=False)
+        else:
+            self.cache_hits += len(members)
+            self.fields.move_to_end(key)
+        for bot, start in members:
+            bot.set_route(field.route(start), goal)
+        return cost
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'deferred': self.deferred,
+            'cache_hits': self.cache_hits,
+            'searches': self.searches,
+            'flow_fields': self.flow_fields,
+            'expansions': self.expansions,
+        }
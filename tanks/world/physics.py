@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from math import pi
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy является опциональной зависимостью
+    np = None
+
+if TYPE_CHECKING:
+    from tanks.entity.base import VelocityMixin
+    from tanks.world.spatial_hash import SpatialHash
+
+# Поля сущностей, которые хранятся в массивах (по одной строке на поле)
+BODY_FIELDS = (
+    'x', 'y',
+    'velocity_x', 'velocity_y',
+    'angle', 'left_track', 'right_track', 'rotation_speed',
+    'acceleration', 'friction', 'max_speed',
+)
+FIELD_INDEX = {name: index for index, name in enumerate(BODY_FIELDS)}
+
+# Виды тел, определяющие, какие шаги интегрирования к ним применяются
+BODY_KINDS = {
+    'free': 0,  # только скорость и трение
+    'tracked': 1,  # управление гусеницами (Tank)
+    'ballistic': 2,  # дополнительное прямолинейное смещение (TankShell)
+}
+
+
+class BodyField:
+    """Дескриптор, отображающий атрибут сущности на ячейку массива состояния"""
+    __slots__ = ('index',)
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        return float(entity._physics.state[self.index, entity._row])
+
+    def __set__(self, entity, value: float) -> None:
+        entity._physics.state[self.index, entity._row] = value
+
+
+_body_classes: dict[tuple[type, tuple[str, ...]], type] = {}
+
+
+def body_class(cls: type, fields: tuple[str, ...]) -> type:
+    """
+    Возвращает подкласс cls, у которого поля fields читаются из массивов.
+
+    Подкласс не добавляет слотов, поэтому экземпляр можно переключить
+    на него присваиванием __class__ и вернуть обратно.
+    """
+    key = (cls, fields)
+    if key not in _body_classes:
+        namespace = {name: BodyField(FIELD_INDEX[name]) for name in fields}
+        namespace.update(
+            __slots__=(), __qualname__=cls.__qualname__,
+            physics_batched=True, plain_class=cls, body_fields=fields,
+        )
+        _body_classes[key] = type(cls.__name__, (cls,), namespace)
+    return _body_classes[key]
+
+
+class VectorizedPhysics:
+    """
+    Физика в виде структуры массивов (struct of arrays) на NumPy.
+
+    Позиции, скорости, углы, скорости гусениц, трение и ограничения скорости
+    всех VelocityMixin-сущностей хранятся в непрерывных массивах, а сами
+    сущности становятся тонкими представлениями над строкой массива.
+    Весь шаг интегрирования выполняется одним пакетом за тик.
+
+    Параметры:
+    - cell_size: float - размер ячейки широкой фазы, с которой синхронизируются тела
+    - capacity: int - начальная вместимость массивов
+    """
+    def __init__(self, cell_size: float, capacity: int = 256) -> None:
+        if np is None:
+            raise ImportError('Для векторизованного режима мира требуется numpy')
+
+        self.cell_size = cell_size
+        self.capacity = capacity
+        self.count = 0
+        self.state = np.zeros((len(BODY_FIELDS), capacity))
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.radius = np.zeros(capacity)
+        self.cells = np.zeros((4, capacity), dtype=np.int64)
+        self.entities: list[VelocityMixin] = []
+
+    def add(self, entity: VelocityMixin) -> None:
+        """Переносит состояние сущности в массивы и привязывает её к строке"""
+        if self.count == self.capacity:
+            self._grow()
+
+        row = self.count
+        fields = tuple(name for name in BODY_FIELDS if hasattr(entity, name))
+        for name in fields:
+            self.state[FIELD_INDEX[name], row] = getattr(entity, name)
+        self.kind[row] = BODY_KINDS[entity.body_kind]
+        self.radius[row] = entity.size
+
+        entity._physics = self
+        entity._row = row
+        entity.__class__ = body_class(type(entity), fields)
+
+        self.entities.append(entity)
+        self.count += 1
+        self._store_cells(row, row + 1)
+
+    def remove(self, entity: VelocityMixin) -> None:
+        """Возвращает состояние в сущность и освобождает её строку"""
+        row = entity._row
+        fields = entity.body_fields
+
+        entity.__class__ = entity.plain_class
+        for name in fields:
+            setattr(entity, name, float(self.state[FIELD_INDEX[name], row]))
+        entity._physics = None
+
+        # Переносим последнюю строку на место удалённой
+        last = self.count - 1
+        if row != last:
+            moved = self.entities[last]
+            self.state[:, row] = self.state[:, last]
+            self.kind[row] = self.kind[last]
+            self.radius[row] = self.radius[last]
+            self.cells[:, row] = self.cells[:, last]
+            self.entities[row] = moved
+            moved._row = row
+
+        self.entities.pop()
+        self.count -= 1
+
+    def step(self) -> None:
+        """Выполняет пакетный шаг интегрирования для всех тел"""
+        n = self.count
+        if n == 0:
+            return
+
+        (x, y, velocity_x, velocity_y, angle, left_track, right_track,
+         rotation_speed, acceleration, friction, max_speed) = self.state[:, :n]
+        kind = self.kind[:n]
+
+        # Гусеницы: поворот и ускорение в направлении корпуса (Tank.apply_tracks)
+        tracked = np.flatnonzero(kind == BODY_KINDS['tracked'])
+        if tracked.size:
+            new_angle = (angle[tracked] + (right_track[tracked] - left_track[tracked])
+                         * rotation_speed[tracked]) % (2 * pi)
+            angle[tracked] = new_angle
+
+            forward = (left_track[tracked] + right_track[tracked]) / 2.0
+            vx = velocity_x[tracked] + np.cos(new_angle) * forward * acceleration[tracked]
+            vy = velocity_y[tracked] + np.sin(new_angle) * forward * acceleration[tracked]
+
+            # Ограничиваем скорость (VelocityMixin.accelerate)
+            speed = np.hypot(vx, vy)
+            limit = max_speed[tracked]
+            over = speed > limit
+            scale = np.divide(limit, speed, out=np.ones_like(speed), where=over)
+            velocity_x[tracked] = vx * scale
+            velocity_y[tracked] = vy * scale
+
+        # Снаряды дополнительно смещаются прямолинейно (TankShell.tick)
+        ballistic = kind == BODY_KINDS['ballistic']
+        if ballistic.any():
+            x[ballistic] += velocity_x[ballistic]
+            y[ballistic] += velocity_y[ballistic]
+
+        # Применяем скорость и трение (VelocityMixin.apply_velocity)
+        x += velocity_x
+        y += velocity_y
+        velocity_x *= 1 - friction
+        velocity_y *= 1 - friction
+
+    def sync_spatial_hash(self, spatial_hash: SpatialHash) -> None:
+        """Обновляет широкую фазу только для тел, сменивших ячейки"""
+        n = self.count
+        if n == 0:
+            return
+
+        previous = self.cells[:, :n].copy()
+        self._store_cells(0, n)
+        changed = np.flatnonzero((previous != self.cells[:, :n]).any(axis=0))
+
+        entities = self.entities
+        for row in changed.tolist():
+            spatial_hash.update(entities[row])
+
+    def refresh_cells(self) -> None:
+        """Пересчитывает ячейки всех тел после внешнего изменения позиций"""
+        self._store_cells(0, self.count)
+
+    def _store_cells(self, start: int, stop: int) -> None:
+        cell_size = self.cell_size
+        x = self.state[FIELD_INDEX['x'], start:stop]
+        y = self.state[FIELD_INDEX['y'], start:stop]
+        radius = self.radius[start:stop]
+        cells = self.cells[:, start:stop]
+        np.floor((x - radius) / cell_size, out=cells[0], casting='unsafe')
+        np.floor((y - radius) / cell_size, out=cells[1], casting='unsafe')
+        np.floor((x + radius) / cell_size, out=cells[2], casting='unsafe')
+        np.floor((y + radius) / cell_size, out=cells[3], casting='unsafe')
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        state = np.zeros((len(BODY_FIELDS), self.capacity))
+        state[:, :self.count] = self.state[:, :self.count]
+        self.state = state
+        self.kind = np.resize(self.kind, self.capacity)
+        self.radius = np.resize(self.radius, self.capacity)
+        cells = np.zeros((4, self.capacity), dtype=np.int64)
+        cells[:, :self.count] = self.cells[:, :self.count]
+        self.cells = cells
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from tanks.entity.tank_shell import TankShell
+
+if TYPE_CHECKING:
+    from tanks.entity.tank import Tank
+    from tanks.world.base import BaseWorld
+
+
+class ShellPool:
+    """
+    Пул переиспользуемых снарядов.
+
+    Удалённые из мира снаряды не выбрасываются, а возвращаются в пул и
+    переинициализируются при следующем выстреле. Снаряд, удалённый во время
+    тика, становится доступен только после recycle() в конце тика, чтобы его
+    не подхватил выстрел того же тика, пока на него ещё ссылается обход сущностей.
+
+    Параметры:
+    - max_size: int - сколько свободных снарядов хранить (0 отключает пул)
+    """
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self.free: list[TankShell] = []
+        self._pending: list[TankShell] = []
+        self.hits = 0  # Выстрелы, обслуженные снарядом из пула
+        self.misses = 0  # Выстрелы, для которых пришлось создать снаряд
+        self.discarded = 0  # Снаряды, не поместившиеся в пул
+
+    def acquire(self, world: BaseWorld, x: float, y: float, angle: float, velocity: float,
+                creator: Tank) -> TankShell:
+        if self.free:
+            self.hits += 1
+            shell = self.free.pop()
+            shell.reset(x=x, y=y, angle=angle, velocity=velocity, creator=creator)
+            return shell
+
+        self.misses += 1
+        return TankShell(x=x, y=y, angle=angle, velocity=velocity, world=world, creator=creator)
+
+    def release(self, shell: TankShell) -> None:
+        if type(shell) is not TankShell or len(self.free) + len(self._pending) >= self.max_size:
+            self.discarded += 1
+            return
+        self._pending.append(shell)
+
+    def recycle(self) -> None:
+        """Делает снаряды, освобождённые за тик, доступными для выстрелов"""
+        if self._pending:
+            self.free.extend(self._pending)
+            self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.free),
+            'hits': self.hits,
+            'misses': self.misses,
+            'discarded': self.discarded,
+        }
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+# Фазы тика в порядке выполнения
+PHASES = ('input', 'ai', 'entities', 'physics', 'collision', 'boundary', 'flush')
+
+
+class TickProfiler:
+    """
+    Замеры фаз тика, стоимости тиков сущностей по типам и счётчики коллизий.
+
+    Профайлер подключается к миру (BaseWorld(profiler=...)); без него код
+    тика делает только проверки на None. Один профайлер может собирать
+    данные нескольких миров процесса.
+
+    Параметры:
+    - clock: Callable[[], float] - источник времени
+    """
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.ticks = 0
+        self.phases: dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.entity_time: dict[str, float] = {}
+        self.entity_ticks: dict[str, int] = {}
+        # Пары широкой фазы, проверенные узкой фазой, и найденные контакты
+        self.collision_pairs = 0
+        self.collision_hits = 0
+        self.swept_checks = 0
+        self.swept_hits = 0
+        self._mark = 0.0
+
+    def begin(self) -> None:
+        """Начинает отсчёт очередной фазы"""
+        self._mark = self.clock()
+
+    def mark(self, phase: str) -> None:
+        """Относит время с предыдущей отметки к фазе phase"""
+        now = self.clock()
+        self.phases[phase] += now - self._mark
+        self._mark = now
+
+    def end(self) -> None:
+        self.ticks += 1
+
+    def observe_entity(self, type_name: str, duration: float) -> None:
+        self.entity_time[type_name] = self.entity_time.get(type_name, 0.0) + duration
+        self.entity_ticks[type_name] = self.entity_ticks.get(type_name, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            'ticks': self.ticks,
+            'phases': dict(self.phases),
+            'entity_time': dict(self.entity_time),
+            'entity_ticks': dict(self.entity_ticks),
+            'collision_pairs': self.collision_pairs,
+            'collision_hits': self.collision_hits,
+            'swept_checks': self.swept_checks,
+            'swept_hits': self.swept_hits,
+        }
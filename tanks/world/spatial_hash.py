@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from math import floor
+from typing import TYPE_CHECKING, Iterable
+
+from tanks.entity.typing import EntityId
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+
+CellKey = tuple[int, int]
+CellRange = tuple[int, int, int, int]
+
+
+class SpatialHash:
+    """
+    Равномерная сетка (spatial hash) для широкой фазы коллизий.
+
+    Сущность регистрируется во всех ячейках, которые покрывает ограничивающий
+    квадрат её круга коллизии, поэтому две пересекающиеся сущности всегда
+    делят хотя бы одну ячейку.
+
+    Параметры:
+    - cell_size: float - размер стороны ячейки
+    """
+    def __init__(self, cell_size: float = 4.0) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[CellKey, dict[EntityId, BaseEntity]] = {}
+        self._ranges: dict[EntityId, CellRange] = {}
+
+    def __contains__(self, entity: BaseEntity) -> bool:
+        return entity.id in self._ranges
+
+    def cell_range(self, x: float, y: float, radius: float) -> CellRange:
+        """Возвращает диапазон ячеек (min_x, min_y, max_x, max_y), покрываемых кругом"""
+        cell_size = self.cell_size
+        return (
+            floor((x - radius) / cell_size),
+            floor((y - radius) / cell_size),
+            floor((x + radius) / cell_size),
+            floor((y + radius) / cell_size),
+        )
+
+    def insert(self, entity: BaseEntity) -> None:
+        """Добавляет сущность в сетку"""
+        cell_range = self.cell_range(entity.x, entity.y, entity.size)
+        self._ranges[entity.id] = cell_range
+        self._link(entity, cell_range)
+
+    def remove(self, entity: BaseEntity) -> None:
+        """Удаляет сущность из сетки"""
+        cell_range = self._ranges.pop(entity.id, None)
+        if cell_range is not None:
+            self._unlink(entity, cell_range)
+
+    def insert_many(self, entities: Iterable[BaseEntity]) -> None:
+        """Добавляет пачку сущностей в сетку"""
+        ranges = self._ranges
+        cell_range = self.cell_range
+        link = self._link
+        for entity in entities:
+            entity_range = ranges[entity.id] = cell_range(entity.x, entity.y, entity.size)
+            link(entity, entity_range)
+
+    def remove_many(self, entities: Iterable[BaseEntity]) -> None:
+        """Удаляет пачку сущностей из сетки"""
+        pop_range = self._ranges.pop
+        unlink = self._unlink
+        for entity in entities:
+            cell_range = pop_range(entity.id, None)
+            if cell_range is not None:
+                unlink(entity, cell_range)
+
+    def update(self, entity: BaseEntity) -> None:
+        """
+        Обновляет положение сущности в сетке после перемещения.
+
+        Если сущность осталась в тех же ячейках, ничего не делает.
+        """
+        old_range = self._ranges.get(entity.id)
+        if old_range is None:
+            return
+
+        new_range = self.cell_range(entity.x, entity.y, entity.size)
+        if new_range == old_range:
+            return
+
+        self._unlink(entity, old_range)
+        self._ranges[entity.id] = new_range
+        self._link(entity, new_range)
+
+    def relink(self, entity: BaseEntity, cell_range: CellRange) -> None:
+        """Переносит сущность в заранее известный диапазон ячеек (восстановление снимка)"""
+        self._unlink(entity, self._ranges[entity.id])
+        self._ranges[entity.id] = cell_range
+        self._link(entity, cell_range)
+
+    def query(self, entity: BaseEntity) -> dict[EntityId, BaseEntity]:
+        """Возвращает сущности, делящие с данной хотя бы одну ячейку (включая её саму)"""
+        cell_range = self._ranges.get(entity.id)
+        if cell_range is None:
+            cell_range = self.cell_range(entity.x, entity.y, entity.size)
+        return self._collect(cell_range)
+
+    def query_rect(self, min_x: float, min_y: float, max_x: float, max_y: float) -> dict[EntityId, BaseEntity]:
+        """Возвращает сущности из ячеек, пересекающих прямоугольник (без точной проверки)"""
+        cell_size = self.cell_size
+        return self._collect((
+            floor(min_x / cell_size),
+            floor(min_y / cell_size),
+            floor(max_x / cell_size),
+            floor(max_y / cell_size),
+        ))
+
+    def candidate_pairs(self) -> list[tuple[BaseEntity, BaseEntity]]:
+        """
+        Возвращает все пары сущностей, делящих хотя бы одну ячейку, по одному разу.
+
+        Пара может лежать в нескольких общих ячейках; она выдаётся только из
+        первой из них - левого нижнего угла пересечения диапазонов ячеек.
+        """
+        ranges = self._ranges
+        pairs = []
+        for (cx, cy), cell in self.cells.items():
+            if len(cell) < 2:
+                continue
+            members = list(cell.values())
+            for i, first in enumerate(members):
+                first_range = ranges[first.id]
+                for second in members[i + 1:]:
+                    second_range = ranges[second.id]
+                    if max(first_range[0], second_range[0]) == cx and max(first_range[1], second_range[1]) == cy:
+                        pairs.append((first, second))
+        return pairs
+
+    def _collect(self, cell_range: CellRange) -> dict[EntityId, BaseEntity]:
+        min_x, min_y, max_x, max_y = cell_range
+        cells = self.cells
+
+        if min_x == max_x and min_y == max_y:
+            cell = cells.get((min_x, min_y))
+            return dict(cell) if cell else {}
+
+        result: dict[EntityId, BaseEntity] = {}
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    result.update(cell)
+        return result
+
+    def _link(self, entity: BaseEntity, cell_range: CellRange) -> None:
+        min_x, min_y, max_x, max_y = cell_range
+        cells = self.cells
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cell = cells[(cx, cy)] = {}
+                cell[entity.id] = entity
+
+    def _unlink(self, entity: BaseEntity, cell_range: CellRange) -> None:
+        min_x, min_y, max_x, max_y = cell_range
+        cells = self.cells
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                cell = cells[(cx, cy)]
+                del cell[entity.id]
+                if not cell:
+                    del cells[(cx, cy)]
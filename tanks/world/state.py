@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import marshal
+import zlib
+from typing import TYPE_CHECKING, Any
+
+from tanks.entity.base import BaseEntity
+from tanks.entity.typing import EntityId
+
+if TYPE_CHECKING:
+    from tanks.game.base import BaseGame
+    from tanks.world.base import BaseWorld
+
+# Служебные поля сущностей, которые не входят в снимок состояния
+TRANSIENT_FIELDS = frozenset(('id', 'world', '_uuid', '_removed', '_physics', '_row'))
+
+# Версия marshal без ссылок на общие объекты: одинаковое состояние всегда
+# даёт одинаковые байты, что нужно для контрольных сумм
+MARSHAL_VERSION = 2
+
+# Команды сущностей, которые можно записать в журнал ввода
+INPUT_COMMANDS = frozenset(('set_tracks', 'shoot', 'set_view_lag'))
+
+# Запись сущности в снимке: раскладка класса, id, порядок добавления,
+# значения полей, id сущностей в полях-ссылках, ячейки широкой фазы и сама
+# сущность (None для снимков, загруженных из байтов)
+EntityRecord = tuple['StateLayout', EntityId, int, tuple, tuple, tuple, 'BaseEntity | None']
+InputEntry = tuple[EntityId, str, tuple]
+
+
+class StateLayout:
+    """
+    Раскладка состояния класса сущности: какие поля и в каком порядке
+    сохраняются в снимок. Поля берутся из __slots__ всей иерархии,
+    поля-ссылки (state_refs) сохраняются отдельно как id сущностей.
+
+    Чтение и запись полей выполняются сгенерированными функциями с прямым
+    доступом к атрибутам, без циклов по getattr/setattr: снимок мира
+    должен сниматься и восстанавливаться за доли миллисекунды.
+    """
+    def __init__(self, cls: type) -> None:
+        fields = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('__slots__', ()):
+                if name not in TRANSIENT_FIELDS and name not in fields:
+                    fields.append(name)
+        self.cls = cls
+        self.refs = tuple(name for name in fields if name in cls.state_refs)
+        self.fields = tuple(name for name in fields if name not in self.refs)
+
+        # Функции чтения и записи полей генерируются под раскладку класса
+        values = ''.join(f'entity.{name}, ' for name in self.fields)
+        refs = ''.join(f'entity.{name} and entity.{name}.id, ' for name in self.refs)
+        links = ''.join(
+            f'    entity.{name} = get(ref_ids[{index}])\n' for index, name in enumerate(self.refs)
+        ) or '    pass\n'
+        namespace: dict[str, Any] = {}
+        exec(
+            f'def read(entity):\n    return ({values}), ({refs})\n'
+            f'def assign(entity, values):\n    {values}= values\n'
+            f'def link(entity, ref_ids, get):\n{links}',
+            namespace,
+        )
+        self.read = namespace['read']
+        self.assign = namespace['assign']
+        # Ссылка на сущность, которой нет в снимке, восстанавливается как None
+        self.link = namespace['link']
+
+
+_layouts: dict[type, StateLayout] = {}
+
+
+def state_layout(cls: type) -> StateLayout:
+    layout = _layouts.get(cls)
+    if layout is None:
+        # Векторизованные сущности сохраняются по раскладке исходного класса
+        plain = cls.__dict__.get('plain_class', cls)
+        layout = _layouts.get(plain) or StateLayout(plain)
+        _layouts[plain] = _layouts[cls] = layout
+    return layout
+
+
+def entity_classes() -> dict[str, type]:
+    """Классы сущностей по имени для загрузки снимков из байтов"""
+    classes = {}
+    pending = [BaseEntity]
+    while pending:
+        cls = pending.pop()
+        if 'plain_class' not in cls.__dict__:
+            classes.setdefault(cls.__name__, cls)
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+class WorldSnapshot:
+    """
+    Полное состояние мира на конец тика.
+
+    Параметры:
+    - tick: int - номер тика
+    - next_id: int - следующий id сущности менеджера
+    - next_order: int - следующий порядковый номер добавления
+    - records: list[EntityRecord] - сущности в порядке обхода менеджера
+    - tiles: bytes | None - клетки карты мира (TileMap.snapshot()), если карта есть
+    """
+    __slots__ = ('tick', 'next_id', 'next_order', 'records', 'tiles')
+
+    def __init__(self, tick: int, next_id: int, next_order: int, records: list[EntityRecord],
+                 tiles: bytes | None = None) -> None:
+        self.tick = tick
+        self.next_id = next_id
+        self.next_order = next_order
+        self.records = records
+        self.tiles = tiles
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(marshal.dumps(self._plain(), MARSHAL_VERSION), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> WorldSnapshot:
+        tick, next_id, next_order, class_names, records, tiles = marshal.loads(zlib.decompress(data))
+        known = entity_classes()
+        layouts = [state_layout(known[name]) for name in class_names]
+        return cls(tick, next_id, next_order, [
+            (layouts[index], entity_id, order, values, ref_ids, cell_range, None)
+            for index, entity_id, order, values, ref_ids, cell_range in records
+        ], tiles)
+
+    def checksum(self) -> int:
+        """Контрольная сумма состояния для сверки при воспроизведении"""
+        return zlib.crc32(marshal.dumps(self._plain(), MARSHAL_VERSION))
+
+    def _plain(self) -> tuple:
+        # Классы заменяются индексами в списке имён, чтобы снимок сериализовался marshal
+        indexes: dict[StateLayout, int] = {}
+        records = []
+        for layout, entity_id, order, values, ref_ids, cell_range, _ in self.records:
+            index = indexes.setdefault(layout, len(indexes))
+            records.append((index, entity_id, order, values, ref_ids, cell_range))
+        class_names = [layout.cls.__name__ for layout in indexes]
+        return self.tick, self.next_id, self.next_order, class_names, records, self.tiles
+
+
+def capture_world(world: BaseWorld, tick: int) -> WorldSnapshot:
+    """Снимает состояние всех сущностей мира (вызывать между тиками)"""
+    manager = world.entity_manager
+    order = manager._order
+    cell_ranges = manager.spatial_hash._ranges
+    layouts = _layouts
+    records = []
+    append = records.append
+    for entity_id, entity in manager.entities.items():
+        layout = layouts.get(type(entity)) or state_layout(type(entity))
+        values, refs = layout.read(entity)
+        append((layout, entity_id, order[entity_id], values, refs, cell_ranges[entity_id], entity))
+    tiles = world.tilemap.snapshot() if world.tilemap is not None else None
+    return WorldSnapshot(tick, manager._next_id, manager._next_order, records, tiles)
+
+
+def restore_world(world: BaseWorld, snapshot: WorldSnapshot) -> None:
+    """
+    Возвращает мир в состояние снимка.
+
+    Сущности, которые есть и в мире, и в снимке, переписываются на месте,
+    лишние удаляются, недостающие создаются заново. Порядок обхода и
+    счётчики менеджера восстанавливаются, так что дальнейшая симуляция
+    совпадает с исходной.
+    """
+    manager = world.entity_manager
+    current = manager.entities
+    layouts = _layouts
+    spatial_hash = manager.spatial_hash
+    cell_ranges = spatial_hash._ranges
+
+    entities: dict[EntityId, BaseEntity] = {}
+    created = []
+    linked = []
+    for layout, entity_id, _, values, ref_ids, cell_range, entity in snapshot.records:
+        # Та же сущность всё ещё в мире: пул снарядов мог выдать объект
+        # под другим id, а векторизованный мир - сменить его класс
+        if entity is None or entity.id != entity_id or entity._removed or entity.world is not world:
+            entity = current.get(entity_id)
+            if entity is not None and layouts.get(type(entity)) is not layout:
+                entity = None
+        if entity is not None:
+            layout.assign(entity, values)
+            if cell_ranges[entity_id] != cell_range:
+                spatial_hash.relink(entity, cell_range)
+        else:
+            entity = layout.cls.__new__(layout.cls)
+            entity.id = entity_id
+            entity.world = world
+            entity._uuid = None
+            entity._removed = False
+            layout.assign(entity, values)
+            created.append(entity)
+        entities[entity_id] = entity
+        if ref_ids:
+            linked.append((layout.link, entity, ref_ids))
+
+    removed = []
+    if created or len(entities) != len(current):
+        removed = [entity for entity_id, entity in current.items() if entities.get(entity_id) is not entity]
+    for entity in removed:
+        manager.remove_entity(entity)
+        entity._removed = True
+    get = entities.get
+    for link, entity, ref_ids in linked:
+        link(entity, ref_ids, get)
+    for entity in created:
+        manager.add_entity(entity)
+
+    if created or removed:
+        # Порядок обхода влияет на результат симуляции, поэтому берём его из снимка
+        manager.entities = entities
+        manager.targets = {entity_id: entity for entity_id, entity in entities.items() if entity.targetable}
+        manager.seekers = {entity_id: entity for entity_id, entity in entities.items() if entity.seeks_targets}
+        manager.continuous = {entity_id: entity for entity_id, entity in entities.items() if entity.continuous}
+        manager._order = {record[1]: record[2] for record in snapshot.records}
+    manager._next_id = snapshot.next_id
+    manager._next_order = snapshot.next_order
+    if snapshot.tiles is not None and world.tilemap is not None:
+        world.tilemap.restore(snapshot.tiles)
+    manager.target_index.dirty = True
+    # История позиций относится к отменённому будущему
+    manager.lag_compensator.clear()
+    if manager.physics is not None:
+        manager.physics.refresh_cells()
+
+
+class SnapshotRing:
+    """
+    Кольцевой буфер снимков последних capacity тиков.
+
+    Параметры:
+    - capacity: int - сколько последних тиков хранить
+    """
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self._slots: list[WorldSnapshot | None] = [None] * capacity
+        self.latest_tick: int | None = None
+
+    def push(self, snapshot: WorldSnapshot) -> None:
+        self._slots[snapshot.tick % self.capacity] = snapshot
+        self.latest_tick = snapshot.tick
+
+    def get(self, tick: int) -> WorldSnapshot | None:
+        snapshot = self._slots[tick % self.capacity]
+        if snapshot is None or snapshot.tick != tick:
+            return None
+        return snapshot
+
+    def rewind(self, world: BaseWorld, tick: int) -> WorldSnapshot:
+        """Восстанавливает мир на конец тика tick"""
+        snapshot = self.get(tick)
+        if snapshot is None:
+            raise KeyError(f'Снимка тика {tick} нет в буфере')
+        restore_world(world, snapshot)
+        return snapshot
+
+
+class InputLog:
+    """
+    Журнал ввода по тикам: команды сущностей, применяемые в начале тика.
+
+    Кроме команд игроков (INPUT_COMMANDS) в журнал попадают изменения
+    состава мира извне тика - вход игрока (команда 'spawn': класс и позиция
+    новой сущности) и выход ('remove'), - чтобы матч сервера воспроизводился
+    целиком.
+    """
+    def __init__(self) -> None:
+        self.entries: dict[int, list[InputEntry]] = {}
+
+    def record(self, tick: int, entity_id: EntityId, command: str, *args: Any) -> None:
+        if command not in INPUT_COMMANDS and command != 'remove':
+            raise ValueError(f'Неизвестная команда ввода: {command}')
+        self.entries.setdefault(tick, []).append((entity_id, command, args))
+
+    def record_spawn(self, tick: int, entity: BaseEntity) -> None:
+        """Сущность добавлена в мир перед тиком tick"""
+        self.entries.setdefault(tick, []).append((entity.id, 'spawn', (type(entity).__name__, entity.x, entity.y)))
+
+    def apply(self, world: BaseWorld, tick: int) -> None:
+        """Применяет к миру команды тика tick"""
+        entities = world.entity_manager.entities
+        for entity_id, command, args in self.entries.get(tick, ()):
+            if command == 'spawn':
+                name, x, y = args
+                entity = entity_classes()[name](x=x, y=y, world=world)
+                if entity.id != entity_id:
+                    raise ValueError(f'Тик {tick}: сущность {name} получила id {entity.id} вместо {entity_id}')
+                world.add_entity(entity)
+                continue
+            entity = entities.get(entity_id)
+            if entity is not None and not entity._removed:
+                getattr(entity, command)(*args)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(marshal.dumps(self.entries, MARSHAL_VERSION), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> InputLog:
+        log = cls()
+        log.entries = marshal.loads(zlib.decompress(data))
+        return log
+
+
+class Replay:
+    """
+    Запись матча: начальный снимок, журнал ввода и контрольные суммы тиков.
+
+    Параметры:
+    - initial: WorldSnapshot - состояние мира в начале записи
+    - inputs: InputLog - ввод по тикам
+    - checksums: dict[int, int] - контрольные суммы состояния по тикам
+    - last_tick: int | None - последний записанный тик
+    """
+    def __init__(self, initial: WorldSnapshot, inputs: InputLog | None = None,
+                 checksums: dict[int, int] | None = None, last_tick: int | None = None) -> None:
+        self.initial = initial
+        self.inputs = inputs or InputLog()
+        self.checksums = checksums or {}
+        self.last_tick = initial.tick if last_tick is None else last_tick
+
+    def to_bytes(self) -> bytes:
+        return marshal.dumps((self.initial.to_bytes(), self.inputs.to_bytes(), self.checksums, self.last_tick), MARSHAL_VERSION)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Replay:
+        initial, inputs, checksums, last_tick = marshal.loads(data)
+        return cls(WorldSnapshot.from_bytes(initial), InputLog.from_bytes(inputs), checksums, last_tick)
+
+
+class ReplayRecorder:
+    """
+    Записывает матч: ввод игроков и контрольные суммы состояния.
+
+    Параметры:
+    - world: BaseWorld - записываемый мир
+    - tick: int - номер последнего выполненного тика на момент начала записи
+    - checksum_interval: int - как часто (в тиках) сохранять контрольную сумму
+    """
+    def __init__(self, world: BaseWorld, tick: int = 0, checksum_interval: int = 30) -> None:
+        self.world = world
+        self.checksum_interval = checksum_interval
+        self.replay = Replay(capture_world(world, tick))
+
+    def record_input(self, tick: int, entity_id: EntityId, command: str, *args: Any) -> None:
+        self.replay.inputs.record(tick, entity_id, command, *args)
+
+    def record_spawn(self, tick: int, entity: BaseEntity) -> None:
+        self.replay.inputs.record_spawn(tick, entity)
+
+    def record_remove(self, tick: int, entity: BaseEntity) -> None:
+        self.replay.inputs.record(tick, entity.id, 'remove')
+
+    def end_tick(self, tick: int) -> None:
+        """Вызывается после каждого тика записываемого мира"""
+        self.replay.last_tick = tick
+        if tick % self.checksum_interval == 0:
+            self.replay.checksums[tick] = capture_world(self.world, tick).checksum()
+
+
+class ReplayRunner:
+    """
+    Детерминированно воспроизводит запись матча в новом мире.
+
+    Матч комнаты с режимом игры воспроизводится в новой игре game с тем же
+    режимом: тогда тик выполняет game.tick, и правила режима (например,
+    урон от огня апокалипсиса) применяются так же, как при записи.
+
+    Параметры:
+    - replay: Replay - запись
+    - world: BaseWorld - мир для воспроизведения (состояние заменяется начальным снимком)
+    - game: BaseGame | None - игра, которой принадлежит world
+    """
+    def __init__(self, replay: Replay, world: BaseWorld, game: BaseGame | None = None) -> None:
+        self.replay = replay
+        self.world = world
+        self.game = game
+        self.tick = replay.initial.tick
+        restore_world(world, replay.initial)
+        if game is not None:
+            game.tick_count = self.tick
+
+    def step(self) -> bool:
+        """Выполняет следующий тик; возвращает False при расхождении с записью"""
+        self.tick += 1
+        self.replay.inputs.apply(self.world, self.tick)
+        if self.game is not None:
+            self.game.tick()
+        else:
+            self.world.tick()
+        expected = self.replay.checksums.get(self.tick)
+        return expected is None or capture_world(self.world, self.tick).checksum() == expected
+
+    def run(self, until: int | None = None) -> list[int]:
+        """
+        Воспроизводит тики до until (по умолчанию до конца записи).
+
+        Возвращает номера тиков, состояние которых разошлось с записью.
+        """
+        until = self.replay.last_tick if until is None else until
+        desynced = []
+        while self.tick < until:
+            if not self.step():
+                desynced.append(self.tick)
+        return desynced
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from math import floor, inf
+from typing import TYPE_CHECKING, Iterable
+
+from tanks.entity.typing import EntityId
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+
+CellKey = tuple[int, int]
+
+
+class TargetIndex:
+    """
+    Индекс целей (танков) для поиска ближайшей цели ботами.
+
+    Равномерная сетка, перестраиваемая не чаще раза в тик по позициям на его
+    начало. Поиск обходит кольца ячеек вокруг точки запроса и останавливается,
+    как только следующее кольцо заведомо дальше уже найденной цели.
+    Запросы всех ботов, которым пора сменить цель, решаются одним пакетом
+    (resolve) до тика сущностей.
+
+    Параметры:
+    - cell_size: float - размер ячейки сетки
+    """
+    def __init__(self, cell_size: float = 16.0) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[CellKey, list[BaseEntity]] = {}
+        self.dirty = True
+        self.resolved: dict[EntityId, BaseEntity | None] = {}
+        self._max_ring = 0
+        self._origin: CellKey = (0, 0)
+
+    def rebuild(self, targets: Iterable[BaseEntity]) -> None:
+        """Перестраивает сетку по текущим позициям целей"""
+        cell_size = self.cell_size
+        cells: dict[CellKey, list[BaseEntity]] = {}
+        for target in targets:
+            key = (floor(target.x / cell_size), floor(target.y / cell_size))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [target]
+            else:
+                cell.append(target)
+
+        self.cells = cells
+        self.resolved.clear()
+        self.dirty = False
+        if cells:
+            xs = [key[0] for key in cells]
+            ys = [key[1] for key in cells]
+            self._origin = (min(xs), min(ys))
+            self._max_ring = max(max(xs) - min(xs), max(ys) - min(ys))
+
+    def nearest(self, x: float, y: float, radius: float = inf,
+                exclude: BaseEntity | None = None) -> BaseEntity | None:
+        """Возвращает ближайшую к (x, y) цель в пределах radius, кроме exclude"""
+        if not self.cells:
+            return None
+
+        cell_size = self.cell_size
+        cells = self.cells
+        cx = floor(x / cell_size)
+        cy = floor(y / cell_size)
+
+        # Кольца дальше этого номера заведомо не содержат занятых ячеек
+        origin_x, origin_y = self._origin
+        max_ring = self._max_ring + max(abs(cx - origin_x), abs(cy - origin_y))
+
+        best = None
+        best_distance_sq = radius * radius if radius != inf else inf
+        ring = 0
+        while ring <= max_ring:
+            # Любая точка кольца ring удалена от запроса не меньше чем на (ring - 1) * cell_size
+            ring_distance = (ring - 1) * cell_size
+            if ring_distance > 0 and ring_distance * ring_distance >= best_distance_sq:
+                break
+
+            for key in self._ring_cells(cx, cy, ring):
+                cell = cells.get(key)
+                if not cell:
+                    continue
+                for target in cell:
+                    if target is exclude or target._removed:
+                        continue
+                    dx = target.x - x
+                    dy = target.y - y
+                    distance_sq = dx * dx + dy * dy
+                    if distance_sq < best_distance_sq:
+                        best_distance_sq = distance_sq
+                        best = target
+            ring += 1
+
+        return best
+
+    def resolve(self, seekers: Iterable[BaseEntity], radius: float = inf) -> None:
+        """Пакетно находит ближайшие цели для seekers и запоминает их до конца тика"""
+        resolved = self.resolved
+        nearest = self.nearest
+        for seeker in seekers:
+            resolved[seeker.id] = nearest(seeker.x, seeker.y, radius, seeker)
+
+    def find(self, seeker: BaseEntity, radius: float = inf) -> BaseEntity | None:
+        """Возвращает цель, найденную пакетом, или ищет её сразу"""
+        if seeker.id in self.resolved:
+            return self.resolved.pop(seeker.id)
+        return self.nearest(seeker.x, seeker.y, radius, seeker)
+
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int) -> Iterable[CellKey]:
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in range(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in range(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from math import floor, inf, sqrt
+from pathlib import Path
+from typing import Iterable
+
+# Заголовок файла карты: сигнатура, версия, предел зазора, ширина и высота в клетках, размер клетки
+HEADER = struct.Struct('<4sBBHHf')
+MAGIC = b'TMAP'
+VERSION = 1
+# Зазор до ближайшей стены хранится в клетках, не больше этого значения
+CLEARANCE_LIMIT = 8
+
+
+class Tile:
+    """Виды клеток карты; всё, кроме EMPTY, непроходимо"""
+    EMPTY = 0
+    WALL = 1  # Неразрушимая стена
+    BRICK = 2  # Разрушается попаданием снаряда
+
+    # Символы текстового представления карты (TileMap.from_rows)
+    SYMBOLS = {'.': EMPTY, '#': WALL, '+': BRICK}
+
+
+def read_header(buffer: bytes | mmap.mmap, path: str | Path) -> tuple[int, int, float]:
+    """Проверяет заголовок и размер файла карты; возвращает ширину, высоту и размер клетки"""
+    if len(buffer) < HEADER.size:
+        raise ValueError(f'{path}: файл карты обрезан')
+    magic, version, limit, width, height, tile_size = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION or limit != CLEARANCE_LIMIT:
+        raise ValueError(f'{path}: неподдерживаемый формат карты')
+    if len(buffer) - HEADER.size < 2 * width * height:
+        raise ValueError(f'{path}: файл карты обрезан')
+    return width, height, tile_size
+
+
+class TileMap:
+    """
+    Статические препятствия мира на равномерной сетке клеток.
+
+    Клетки хранятся по строкам в одном байтовом буфере (один байт - вид
+    клетки), за ними идёт поле зазоров того же размера: для каждой клетки -
+    расстояние Чебышёва в клетках до ближайшей стены (не больше
+    CLEARANCE_LIMIT). Проверка круга вдали от стен - одно чтение зазора
+    клетки центра, а отрезок пути снаряда проходится по клеткам
+    алгоритмом DDA. Изменение клетки пересчитывает зазоры только в её
+    окрестности: новая стена уменьшает их, а вокруг разрушенной поле
+    пересчитывается заново (по зазорам решает проходимость и поиск путей
+    ботов, так что заниженные значения закрыли бы проход).
+
+    Файл карты - заголовок HEADER и тот же буфер, поэтому карта
+    загружается через mmap без разбора: комнаты с одной картой делят
+    страницы файла, пока клетки не начали разрушаться (копирование при
+    записи).
+
+    Параметры:
+    - width, height: int - размеры карты в клетках
+    - tile_size: float - сторона клетки в единицах мира
+    - buffer: bytearray | mmap.mmap | None - буфер клеток и зазоров (по умолчанию пустая карта)
+    - offset: int - смещение клеток в буфере
+    """
+    def __init__(self, width: int, height: int, tile_size: float = 1.0,
+                 buffer: bytearray | mmap.mmap | None = None, offset: int = 0) -> None:
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        size = width * height
+        if buffer is None:
+            buffer = bytearray(size) + bytes([CLEARANCE_LIMIT]) * size
+        self._buffer = buffer
+        self._state = memoryview(buffer)[offset:offset + 2 * size]
+        self.tiles = self._state[:size]
+        self.clearance = self._state[size:]
+        # Растёт при каждом изменении клеток
+        self.revision = 0
+        self._snapshot: tuple[int, bytes] | None = None
+
+    @property
+    def world_width(self) -> float:
+        return self.width * self.tile_size
+
+    @property
+    def world_height(self) -> float:
+        return self.height * self.tile_size
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[str], tile_size: float = 1.0) -> TileMap:
+        """Создаёт карту из строк символов Tile.SYMBOLS; первая строка - клетки с y = 0"""
+        rows = list(rows)
+        tilemap = cls(len(rows[0]), len(rows), tile_size)
+        symbols = Tile.SYMBOLS
+        tilemap.tiles[:] = bytes(symbols[symbol] for row in rows for symbol in row)
+        tilemap.compute_clearance()
+        return tilemap
+
+    @classmethod
+    def load(cls, path: str | Path) -> TileMap:
+        """Отображает файл карты в память; изменения клеток в файл не попадают"""
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        width, height, tile_size = read_header(buffer, path)
+        return cls(width, height, tile_size, buffer, HEADER.size)
+
+    def save(self, path: str | Path) -> None:
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, CLEARANCE_LIMIT, self.width, self.height, self.tile_size))
+            file.write(self._state)
+
+    def compute_clearance(self) -> None:
+        """Пересчитывает поле зазоров целиком"""
+        self.clearance[:] = self._transform(0, 0, self.width, self.height)
+        self.revision += 1
+
+    def _transform(self, min_tx: int, min_ty: int, max_tx: int, max_ty: int) -> bytearray:
+        """
+        Зазоры клеток прямоугольника [min_tx, max_tx) x [min_ty, max_ty) по
+        стенам внутри него (два прохода преобразования расстояния).
+        """
+        width = max_tx - min_tx
+        height = max_ty - min_ty
+        tiles = self.tiles
+        map_width = self.width
+        clearance = bytearray(
+            CLEARANCE_LIMIT if not tiles[ty * map_width + tx] else 0
+            for ty in range(min_ty, max_ty) for tx in range(min_tx, max_tx)
+        )
+        for ty in range(height):
+            for tx in range(width):
+                index = ty * width + tx
+                value = clearance[index]
+                if not value:
+                    continue
+                if tx > 0:
+                    value = min(value, clearance[index - 1] + 1)
+                if ty > 0:
+                    above = index - width
+                    value = min(value, clearance[above] + 1)
+                    if tx > 0:
+                        value = min(value, clearance[above - 1] + 1)
+                    if tx < width - 1:
+                        value = min(value, clearance[above + 1] + 1)
+                clearance[index] = value
+        for ty in range(height - 1, -1, -1):
+            for tx in range(width - 1, -1, -1):
+                index = ty * width + tx
+                value = clearance[index]
+                if not value:
+                    continue
+                if tx < width - 1:
+                    value = min(value, clearance[index + 1] + 1)
+                if ty < height - 1:
+                    below = index + width
+                    value = min(value, clearance[below] + 1)
+                    if tx > 0:
+                        value = min(value, clearance[below - 1] + 1)
+                    if tx < width - 1:
+                        value = min(value, clearance[below + 1] + 1)
+                clearance[index] = value
+        return clearance
+
+    def get(self, tx: int, ty: int) -> int:
+        """Вид клетки; за пределами карты - Tile.EMPTY"""
+        if 0 <= tx < self.width and 0 <= ty < self.height:
+            return self.tiles[ty * self.width + tx]
+        return Tile.EMPTY
+
+    def set(self, tx: int, ty: int, kind: int) -> None:
+        """Меняет вид клетки и пересчитывает зазоры клеток в её окрестности"""
+        width = self.width
+        index = ty * width + tx
+        old = self.tiles[index]
+        if old == kind:
+            return
+        self.tiles[index] = kind
+        self.revision += 1
+        clearance = self.clearance
+        limit = CLEARANCE_LIMIT
+        if kind == Tile.EMPTY:
+            # Стена разрушена: зазоры могли вырасти у клеток ближе limit к ней. Их
+            # ближайшие стены не дальше limit - 1, поэтому хватает преобразования
+            # расстояния в окрестности радиуса 2 * limit - 1
+            reach = 2 * limit - 1
+            min_tx = max(tx - reach, 0)
+            min_ty = max(ty - reach, 0)
+            max_tx = min(tx + reach + 1, width)
+            max_ty = min(ty + reach + 1, self.height)
+            local = self._transform(min_tx, min_ty, max_tx, max_ty)
+            local_width = max_tx - min_tx
+            left = max(tx - limit + 1, 0)
+            right = min(tx + limit, width)
+            for ny in range(max(ty - limit + 1, 0), min(ty + limit, self.height)):
+                start = (ny - min_ty) * local_width + left - min_tx
+                clearance[ny * width + left:ny * width + right] = local[start:start + right - left]
+            return
+        if old != Tile.EMPTY:
+            # Стена сменила вид: проходимость и зазоры не изменились
+            return
+
+        for ny in range(max(ty - limit, 0), min(ty + limit + 1, self.height)):
+            row = ny * width
+            dy = abs(ny - ty)
+            for nx in range(max(tx - limit, 0), min(tx + limit + 1, width)):
+                distance = max(dy, abs(nx - tx))
+                if clearance[row + nx] > distance:
+                    clearance[row + nx] = distance
+
+    def damage(self, tx: int, ty: int) -> bool:
+        """Разрушает клетку, если она разрушаема; возвращает True, если клетка разрушена"""
+        if self.get(tx, ty) != Tile.BRICK:
+            return False
+        self.set(tx, ty, Tile.EMPTY)
+        return True
+
+    def is_solid(self, x: float, y: float) -> bool:
+        """Непроходима ли точка мира"""
+        return self.get(floor(x / self.tile_size), floor(y / self.tile_size)) != Tile.EMPTY
+
+    def push_out(self, x: float, y: float, radius: float) -> tuple[float, float, int, int] | None:
+        """
+        Выталкивает круг из непроходимых клеток.
+
+        Возвращает новую позицию центра и последнюю задетую клетку
+        или None, если круг ни с чем не пересекается.
+        """
+        tile_size = self.tile_size
+        width = self.width
+        tx = floor(x / tile_size)
+        ty = floor(y / tile_size)
+        # Вдали от стен хватает зазора клетки центра: круг целиком
+        # внутри квадрата свободных клеток вокруг неё
+        if 0 <= tx < width and 0 <= ty < self.height:
+            reach = (self.clearance[ty * width + tx] - 1) * tile_size
+            offset_x = x - tx * tile_size
+            offset_y = y - ty * tile_size
+            if radius - reach <= min(offset_x, offset_y) and radius + max(offset_x, offset_y) < reach + tile_size:
+                return None
+
+        min_tx = max(floor((x - radius) / tile_size), 0)
+        min_ty = max(floor((y - radius) / tile_size), 0)
+        max_tx = min(floor((x + radius) / tile_size), width - 1)
+        max_ty = min(floor((y + radius) / tile_size), self.height - 1)
+
+        tiles = self.tiles
+        hit = None
+        for ty in range(min_ty, max_ty + 1):
+            row = ty * width
+            for tx in range(min_tx, max_tx + 1):
+                if not tiles[row + tx]:
+                    continue
+                left = tx * tile_size
+                top = ty * tile_size
+                dx = x - min(max(x, left), left + tile_size)
+                dy = y - min(max(y, top), top + tile_size)
+                distance_sq = dx * dx + dy * dy
+                if distance_sq >= radius * radius:
+                    continue
+                if distance_sq > 0.0:
+                    distance = sqrt(distance_sq)
+                    push = (radius - distance) / distance
+                    x += dx * push
+                    y += dy * push
+                else:
+                    # Центр внутри клетки: выталкиваем через ближайшую сторону, за которой
+                    # нет стены, а из толщи стены - просто через ближайшую
+                    sides = (
+                        (x - left + radius, -1, 0),
+                        (left + tile_size - x + radius, 1, 0),
+                        (y - top + radius, 0, -1),
+                        (top + tile_size - y + radius, 0, 1),
+                    )
+                    get = self.get
+                    exits = [side for side in sides if get(tx + side[1], ty + side[2]) == Tile.EMPTY]
+                    depth, nx, ny = min(exits or sides)
+                    x += nx * depth
+                    y += ny * depth
+                hit = (tx, ty)
+        if hit is None:
+            return None
+        return x, y, hit[0], hit[1]
+
+    def raycast(self, start_x: float, start_y: float, end_x: float, end_y: float) -> tuple[float, int, int] | None:
+        """
+        Ищет первую непроходимую клетку на отрезке (DDA по клеткам).
+
+        Возвращает долю пути t (0..1) до входа в клетку и саму клетку
+        или None, если путь свободен.
+        """
+        tile_size = self.tile_size
+        x0 = start_x / tile_size
+        y0 = start_y / tile_size
+        tx = floor(x0)
+        ty = floor(y0)
+        if self.get(tx, ty) != Tile.EMPTY:
+            return 0.0, tx, ty
+
+        end_tx = floor(end_x / tile_size)
+        end_ty = floor(end_y / tile_size)
+        width = self.width
+        height = self.height
+        # Отрезок проходит только по клеткам рамки между клетками концов: если
+        # она целиком в пределах зазора стартовой клетки, стен на пути нет
+        if 0 <= tx < width and 0 <= ty < height and \
+           max(abs(end_tx - tx), abs(end_ty - ty)) < self.clearance[ty * width + tx]:
+            return None
+
+        dx = end_x / tile_size - x0
+        dy = end_y / tile_size - y0
+        steps = abs(end_tx - tx) + abs(end_ty - ty)
+        if dx > 0.0:
+            step_x, delta_x = 1, 1.0 / dx
+            next_x = (tx + 1 - x0) * delta_x
+        elif dx < 0.0:
+            step_x, delta_x = -1, -1.0 / dx
+            next_x = (x0 - tx) * delta_x
+        else:
+            step_x, delta_x, next_x = 0, inf, inf
+        if dy > 0.0:
+            step_y, delta_y = 1, 1.0 / dy
+            next_y = (ty + 1 - y0) * delta_y
+        elif dy < 0.0:
+            step_y, delta_y = -1, -1.0 / dy
+            next_y = (y0 - ty) * delta_y
+        else:
+            step_y, delta_y, next_y = 0, inf, inf
+
+        tiles = self.tiles
+        for _ in range(steps):
+            if next_x < next_y:
+                t = next_x
+                tx += step_x
+                next_x += delta_x
+            else:
+                t = next_y
+                ty += step_y
+                next_y += delta_y
+            if 0 <= tx < width and 0 <= ty < height and tiles[ty * width + tx]:
+                return t, tx, ty
+        return None
+
+    def snapshot(self) -> bytes:
+        """Копия клеток и блоков для снимка мира (кэшируется до следующего изменения)"""
+        if self._snapshot is None or self._snapshot[0] != self.revision:
+            self._snapshot = (self.revision, bytes(self._state))
+        return self._snapshot[1]
+
+    def restore(self, data: bytes) -> None:
+        """Возвращает клетки к состоянию из snapshot()"""
+        cached = self._snapshot
+        if cached is not None and cached[0] == self.revision and cached[1] is data:
+            return
+        self._state[:] = data
+        self.revision += 1
+        self._snapshot = (self.revision, data)
+
+
+class MapAsset:
+    """
+    Файл карты, заранее отображённый в память процесса.
+
+    Заголовок проверяется один раз, страницы файла подгружаются в кэш
+    страниц ОС заранее (madvise(MADV_WILLNEED), где он есть), а каждая
+    комната получает свою TileMap поверх того же файла с копированием при
+    записи (instantiate). Ассет, загруженный до fork, наследуют все
+    рабочие процессы: им не нужно ни читать, ни проверять файл заново.
+
+    Параметры:
+    - path: str | Path - путь к файлу карты
+    """
+    def __init__(self, path: str | Path) -> None:
+        self.path = path
+        # Файл остаётся открытым: по нему отображаются карты комнат
+        self._file = open(path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.width, self.height, self.tile_size = read_header(self.buffer, path)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            self.buffer.madvise(mmap.MADV_WILLNEED)
+
+    def instantiate(self) -> TileMap:
+        """Новая карта комнаты; изменения её клеток не видны другим комнатам и файлу"""
+        buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+        return TileMap(self.width, self.height, self.tile_size, buffer, HEADER.size)
+
+    def close(self) -> None:
+        self.buffer.close()
+        self._file.close()
+
+
+_assets: dict[str, MapAsset] = {}
+
+
+def map_asset(path: str | Path) -> MapAsset:
+    """Загруженный ассет карты path; один на процесс (и на всех потомков после fork)"""
+    key = str(Path(path).resolve())
+    asset = _assets.get(key)
+    if asset is None:
+        asset = _assets[key] = MapAsset(path)
+    return asset
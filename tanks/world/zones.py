@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from tanks.entity.typing import EntityId
+from tanks.world.collision import CollisionLayer
+
+if TYPE_CHECKING:
+    from tanks.entity.base import BaseEntity
+    from tanks.world.spatial_hash import SpatialHash
+
+# Событие зоны: 'enter' или 'leave', сущность и зона
+ZoneEvent = tuple[str, 'BaseEntity', 'Zone']
+
+
+class Zone:
+    """
+    Круглая область карты: точка захвата, база, безопасная зона.
+
+    Сущность в зоне, если в зоне её центр.
+
+    Параметры:
+    - name: str - имя зоны
+    - x, y: float - центр
+    - radius: float - радиус
+    - layers: int - слои сущностей, которые учитываются в зоне (см. CollisionLayer)
+    """
+    __slots__ = ('name', 'x', 'y', 'radius', 'layers', 'members')
+
+    def __init__(self, name: str, x: float, y: float, radius: float, layers: int = CollisionLayer.TANK) -> None:
+        self.name = name
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.layers = layers
+        # Сущности в зоне на конец прошлой проверки (поддерживает ZoneTracker)
+        self.members: dict[EntityId, BaseEntity] = {}
+
+    def contains(self, entity: BaseEntity) -> bool:
+        dx = entity.x - self.x
+        dy = entity.y - self.y
+        return dx * dx + dy * dy <= self.radius * self.radius
+
+
+class ZoneTracker:
+    """
+    Вход и выход сущностей из зон.
+
+    Состав зоны пересчитывается только по кандидатам из ячеек широкой
+    фазы, покрывающих зону, и сравнивается с прошлым составом: на выходе
+    события входа и выхода, а не полный список сущностей в зонах.
+    Удалённая из мира сущность покидает зону тем же событием.
+
+    Параметры:
+    - spatial_hash: SpatialHash - широкая фаза мира
+    """
+    def __init__(self, spatial_hash: SpatialHash) -> None:
+        self.spatial_hash = spatial_hash
+        self.zones: dict[str, Zone] = {}
+
+    def add(self, zone: Zone) -> None:
+        self.zones[zone.name] = zone
+
+    def remove(self, name: str) -> Zone:
+        return self.zones.pop(name)
+
+    def update(self) -> list[ZoneEvent]:
+        """Пересчитывает составы зон и возвращает события с прошлой проверки"""
+        query_rect = self.spatial_hash.query_rect
+        events: list[ZoneEvent] = []
+        for zone in self.zones.values():
+            radius = zone.radius
+            cx = zone.x
+            cy = zone.y
+            radius_sq = radius * radius
+            layers = zone.layers
+            previous = zone.members
+            members = {}
+            for entity_id, entity in query_rect(cx - radius, cy - radius, cx + radius, cy + radius).items():
+                if entity._removed or not entity.collision_layer & layers:
+                    continue
+                dx = entity.x - cx
+                dy = entity.y - cy
+                if dx * dx + dy * dy <= radius_sq:
+                    members[entity_id] = entity
+                    if entity_id not in previous:
+                        events.append(('enter', entity, zone))
+            for entity_id, entity in previous.items():
+                if entity_id not in members:
+                    events.append(('leave', entity, zone))
+            zone.members = members
+        return events
+
+    def outside(self, zone: Zone) -> list[BaseEntity]:
+        """
+        Возвращает сущности слоёв зоны, центр которых вне zone.
+
+        Обходятся занятые ячейки широкой фазы, и ячейки целиком внутри зоны
+        пропускаются без проверки сущностей: сущность с центром вне зоны
+        всё равно найдётся в ячейке, где лежит её центр.
+        """
+        cell_size = self.spatial_hash.cell_size
+        cx = zone.x
+        cy = zone.y
+        radius_sq = zone.radius * zone.radius
+        layers = zone.layers
+        found: dict[EntityId, BaseEntity] = {}
+        for (gx, gy), cell in self.spatial_hash.cells.items():
+            min_x = gx * cell_size
+            min_y = gy * cell_size
+            max_x = min_x + cell_size
+            max_y = min_y + cell_size
+            # Дальний от центра зоны угол ячейки
+            far_x = max(cx - min_x, max_x - cx)
+            far_y = max(cy - min_y, max_y - cy)
+            if far_x * far_x + far_y * far_y <= radius_sq:
+                continue
+            for entity_id, entity in cell.items():
+                if entity_id in found or entity._removed or not entity.collision_layer & layers:
+                    continue
+                dx = entity.x - cx
+                dy = entity.y - cy
+                if dx * dx + dy * dy > radius_sq:
+                    found[entity_id] = entity
+        return list(found.values())
@@ -0,0 +1,240 @@
+import asyncio
+import time
+
+import pytest
+
+from tanks.game.base import BaseGame
+from tanks.entity.tank import Tank
+from tanks.entity.tank_bot import TankBot
+from tanks.game.game import Game
+from tanks.game.input import InputManager
+from tanks.game.modes import ApocalypseMode, ClassicMode, TerritoryMode
+from tanks.game.sampler import SlowTickSampler
+from tanks.game.scheduler import GameScheduler
+from tanks.server.metrics import render_metrics
+from tanks.world.profiler import PHASES, TickProfiler
+
+
+class SlowGame(BaseGame):
+    def tick(self) -> None:
+        super().tick()
+        time.sleep(0.03)
+
+
+class BrokenGame(BaseGame):
+    def tick(self) -> None:
+        super().tick()
+        if self.tick_count % 2:
+            raise RuntimeError('сломанный тик')
+
+
+@pytest.mark.asyncio
+async def test_scheduler_ticks_games_at_fixed_rate():
+    scheduler = GameScheduler(tick_rate=100.0)
+    ticked = []
+
+    async def listener(game):
+        ticked.append(game)
+
+    scheduler.add_listener(listener)
+    first = scheduler.add_game(Game())
+    await scheduler.start()
+    second = scheduler.add_game(Game(), tick_rate=50.0)
+    await asyncio.sleep(0.3)
+    await scheduler.stop()
+
+    assert 15 <= first.game.tick_count <= 35
+    assert 7 <= second.game.tick_count <= 18
+    assert len(ticked) == first.game.tick_count + second.game.tick_count
+    assert scheduler.stats()[first.game_id]['ticks'] == first.game.tick_count
+
+
+@pytest.mark.asyncio
+async def test_scheduler_overruns_do_not_starve_event_loop():
+    scheduler = GameScheduler(tick_rate=100.0, max_catch_up_ticks=2)
+    scheduled = scheduler.add_game(SlowGame())
+    wakeups = 0
+
+    async def socket_io():
+        nonlocal wakeups
+        while True:
+            await asyncio.sleep(0)
+            wakeups += 1
+
+    io_task = asyncio.create_task(socket_io())
+    await scheduler.start()
+    await asyncio.sleep(0.3)
+    await scheduler.stop()
+    io_task.cancel()
+
+    stats = scheduler.stats()[scheduled.game_id]
+    assert stats['overruns'] == stats['ticks'] > 0
+    assert stats['dropped_ticks'] > 0
+    assert stats['histogram']['0.05'] == stats['ticks']
+    assert wakeups >= stats['ticks']
+
+
+@pytest.mark.asyncio
+async def test_scheduler_keeps_ticking_after_errors(caplog):
+    scheduler = GameScheduler(tick_rate=100.0)
+    scheduled = scheduler.add_game(BrokenGame())
+
+    async def listener(game):
+        if game.tick_count == 2:
+            raise ValueError('сломанный слушатель')
+
+    scheduler.add_listener(listener)
+    await scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+
+    stats = scheduler.stats()[scheduled.game_id]
+    assert scheduled.game.tick_count > 4
+    # Падает каждый нечётный тик и слушатель второго тика
+    assert stats['errors'] == (scheduled.game.tick_count + 1) // 2 + 1
+    assert 'сломанный слушатель' in caplog.text
+
+
+def test_inputs_are_coalesced_rate_limited_and_applied_at_tick_start():
+    now = 0.0
+    game = Game()
+    game.inputs = InputManager(rate=10.0, burst=3, clock=lambda: now)
+    tank = Tank(x=50.0, y=50.0, world=game.world)
+    game.world.add_entity(tank)
+    game.inputs.bind('sid', tank)
+
+    assert game.inputs.submit('sid', {'seq': 1, 'tracks': [1.0, 1.0]})
+    assert game.inputs.submit('sid', {'seq': 2, 'tracks': [0.5, -0.5], 'shoot': True})
+    assert not game.inputs.submit('sid', {'seq': 2, 'shoot': True})
+    assert game.inputs.submit('sid', {'seq': 4, 'shoot': True})
+    assert not game.inputs.submit('sid', {'seq': 5, 'shoot': True})
+    assert not game.inputs.submit('sid', {'seq': 'x'})
+    # Ввод копится до тика и не трогает танк
+    assert tank.left_track == 0.0
+
+    game.tick()
+    assert (tank.left_track, tank.right_track) == (0.5, -0.5)
+    assert len(game.world.entity_manager.entities) == 2
+    assert game.inputs.acked_seq('sid') == 4
+    assert game.inputs.stats() == {
+        'players': 1, 'received': 6, 'applied': 2, 'coalesced': 2,
+        'rate_limited': 1, 'stale': 1, 'invalid': 1,
+    }
+
+    now += 0.1
+    assert game.inputs.submit('sid', {'seq': 6, 'tracks': [0.0, 0.0]})
+
+    # С выстрелом танку передаётся, на сколько тиков отстаёт мир клиента
+    now += 0.1
+    tank.reload_timer = 0
+    assert game.inputs.submit('sid', {'seq': 7, 'view': game.tick_count - 2, 'shoot': True})
+    assert not game.inputs.submit('sid', {'seq': 8, 'view': 'x'})
+    game.tick()
+    assert tank.view_lag == 3
+    shell = next(entity for entity in game.world.entity_manager.entities.values() if entity.lag)
+    assert shell.lag == 3
+
+
+def test_profiler_collects_phases_entity_costs_and_collisions():
+    profiler = TickProfiler()
+    game = Game(profiler=profiler)
+    world = game.world
+    first = Tank(x=50.0, y=50.0, world=world)
+    world.add_entity(first)
+    world.add_entity(Tank(x=50.5, y=50.0, world=world))
+    world.add_entity(TankBot(x=60.0, y=60.0, world=world))
+    first.shoot()
+    for _ in range(5):
+        game.tick()
+
+    assert profiler.ticks == 5
+    assert set(profiler.phases) == set(PHASES)
+    # Физика без NumPy-бэкенда выполняется в тиках сущностей
+    assert all(seconds > 0 for phase, seconds in profiler.phases.items() if phase != 'physics')
+    assert profiler.entity_ticks['Tank'] == 10
+    assert profiler.entity_ticks['TankBot'] == 5
+    assert profiler.collision_hits > 0
+    assert profiler.collision_pairs >= profiler.collision_hits
+    assert profiler.swept_checks > 0
+
+    text = render_metrics(profiler.as_dict(), {'1': {
+        'ticks': 5, 'total_time': 0.01, 'max_time': 0.003, 'overruns': 0, 'dropped_ticks': 0, 'errors': 0,
+        'jitter_total': 0.002, 'jitter_max': 0.001,
+        'histogram': {'0.001': 1, '+Inf': 5},
+    }})
+    assert 'tanks_tick_phase_seconds_total{phase="collision"}' in text
+    assert 'tanks_entity_ticks_total{type="TankBot"} 5' in text
+    assert f'tanks_collision_pairs_total{{result="hit"}} {profiler.collision_hits}' in text
+    assert 'tanks_tick_duration_seconds_bucket{game="1",le="+Inf"} 5' in text
+
+
+@pytest.mark.asyncio
+async def test_slow_tick_sampler_dumps_only_slow_ticks(tmp_path):
+    sampler = SlowTickSampler(tmp_path, threshold=0.02, interval=0.001)
+    scheduler = GameScheduler(tick_rate=100.0, max_catch_up_ticks=1)
+    scheduler.sampler = sampler
+    scheduler.add_game(SlowGame())
+    scheduler.add_game(Game())
+    sampler.start()
+    await scheduler.start()
+    await asyncio.sleep(0.2)
+    await scheduler.stop()
+    sampler.stop()
+
+    dumps = list(tmp_path.iterdir())
+    assert dumps and len(dumps) == sampler.dumps
+    assert all(path.name.startswith('slow-tick-game1-') for path in dumps)
+    assert 'SlowGame' not in dumps[0].read_text()
+    assert 'tick (test_game.py' in dumps[0].read_text()
+
+
+def test_modes_decide_winners_from_death_and_zone_events():
+    game = Game(mode=ClassicMode())
+    tanks = [Tank(x=20.0 + 30.0 * i, y=20.0, world=game.world) for i in range(3)]
+    for tank in tanks:
+        game.world.add_entity(tank)
+    game.tick()
+    assert game.mode.stats() == {'mode': 'classic', 'finished': False, 'winner': None, 'alive': 3}
+    tanks[0].damage(100)
+    tanks[1].remove()
+    game.tick()
+    assert game.mode.finished and game.mode.winner is tanks[2]
+    assert game.mode.finished_tick == game.tick_count
+
+    territory = TerritoryMode(x=50.0, y=50.0, radius=5.0, capture_ticks=3)
+    game = Game(mode=territory)
+    holder = Tank(x=50.0, y=50.0, world=game.world)
+    rival = Tank(x=80.0, y=80.0, world=game.world)
+    game.world.add_entity(holder)
+    game.world.add_entity(rival)
+    game.tick()
+    game.tick()
+    assert territory.progress == {holder.id: 2}
+    # Пока точка оспаривается, захват не идёт
+    rival.x = rival.y = 51.0
+    game.world.entity_manager.update_entity(rival)
+    game.tick()
+    game.tick()
+    assert territory.progress == {holder.id: 2} and not territory.finished
+    rival.remove()
+    game.tick()
+    assert territory.finished and territory.winner is holder
+
+
+def test_apocalypse_burns_only_tanks_outside_safe_zone():
+    mode = ApocalypseMode(shrink_speed=20.0, min_radius=20.0, burn_interval=2, burn_damage=50)
+    game = Game(mode=mode)
+    inside = Tank(x=50.0, y=55.0, world=game.world)
+    outside = Tank(x=5.0, y=5.0, world=game.world)
+    game.world.add_entity(inside)
+    game.world.add_entity(outside)
+    for _ in range(4):
+        game.tick()
+    assert mode.safe_zone.radius == 20.0
+    assert outside._removed and mode.burned == 2
+    assert inside.health == 100
+    assert not mode.finished
+
+    # Победа засчитывается по событию гибели на следующем тике
+    game.tick()
+    assert mode.finished and mode.winner is inside
@@ -0,0 +1,122 @@
+import asyncio
+
+from tanks.entity.tank import Tank
+from tanks.network.interest import AreaOfInterest, InterestManager
+from tanks.network.network_manager import NetworkManager
+from tanks.network.snapshot import (
+    DELTA, HEADER, KEYFRAME, RECORD_SIZE, apply_snapshot, decode_snapshot,
+)
+from tanks.world.world import World
+
+
+def make_world(count: int = 3) -> tuple[World, list[Tank]]:
+    world = World()
+    tanks = [Tank(x=10.0 + i * 20.0, y=50.0, world=world) for i in range(count)]
+    for tank in tanks:
+        world.add_entity(tank)
+    return world, tanks
+
+
+def broadcast(network: NetworkManager, tick: int) -> dict[str, bytes]:
+    sent = {}
+
+    async def send(sid, data):
+        sent[sid] = data
+
+    asyncio.run(network.broadcast(tick, send))
+    return sent
+
+
+def test_keyframe_then_delta_after_ack():
+    world, tanks = make_world()
+    network = NetworkManager(world)
+    network.add_client('a')
+
+    keyframe = broadcast(network, 1)['a']
+    packet_type, tick, _, updates, removed = decode_snapshot(keyframe)
+    assert packet_type == KEYFRAME and tick == 1
+    assert len(keyframe) == HEADER.size + 3 * RECORD_SIZE
+    assert len(updates) == 3 and removed == []
+
+    network.ack('a', 1)
+    tanks[0].x += 5.0
+    tanks[2].remove()
+    delta = broadcast(network, 2)['a']
+    packet_type, tick, baseline_tick, updates, removed = decode_snapshot(delta)
+    assert (packet_type, tick, baseline_tick) == (DELTA, 2, 1)
+    assert list(updates) == [network.id_allocator.get(tanks[0].id)]
+    assert len(removed) == 1
+
+    _, client_state = apply_snapshot({}, keyframe)
+    _, client_state = apply_snapshot(client_state, delta)
+    assert client_state == network.clients['a'].history[2]
+
+
+def test_keyframe_when_acked_snapshot_is_lost():
+    world, _ = make_world()
+    network = NetworkManager(world, history_size=4)
+    network.add_client('a')
+
+    broadcast(network, 1)
+    network.ack('a', 1)
+    for tick in range(2, 8):
+        data = broadcast(network, tick)['a']
+    assert decode_snapshot(data)[0] == KEYFRAME
+
+    network.ack('a', 7)
+    assert decode_snapshot(broadcast(network, 8)['a'])[0] == DELTA
+
+
+def test_interest_filters_entities_and_reports_enter_leave():
+    world = World(width=200.0, height=200.0)
+    observer = Tank(x=20.0, y=20.0, world=world)
+    near = Tank(x=30.0, y=20.0, world=world)
+    far = Tank(x=150.0, y=150.0, world=world)
+    for tank in (observer, near, far):
+        world.add_entity(tank)
+
+    events = []
+    interest = InterestManager(AreaOfInterest(radius=25.0))
+    interest.add_listener(lambda key, entered, left: events.append((key, entered, left)))
+    network = NetworkManager(world, interest=interest)
+    network.add_client('a', observer=observer)
+
+    ids = network.id_allocator
+    _, _, _, updates, _ = decode_snapshot(broadcast(network, 1)['a'])
+    assert set(updates) == {ids.get(observer.id), ids.get(near.id)}
+    assert events == [('a', [observer, near], [])]
+
+    network.ack('a', 1)
+    far.x = far.y = 35.0
+    world.entity_manager.update_entity(far)
+    near.x = 100.0
+    world.entity_manager.update_entity(near)
+    _, _, _, updates, removed = decode_snapshot(broadcast(network, 2)['a'])
+    assert list(updates) == [ids.get(far.id)]
+    assert removed == [ids.get(near.id)]
+    assert events[-1] == ('a', [far], [near])
+
+
+def test_interest_filters_hide_entities():
+    world, tanks = make_world()
+    interest = InterestManager(AreaOfInterest(half_width=100.0, half_height=100.0))
+    interest.add_filter(lambda observer, entity: entity is not tanks[2])
+
+    visible = interest.update('a', tanks[0])
+    assert set(visible.values()) == {tanks[0], tanks[1]}
+
+
+def test_broadcast_skips_client_that_left_mid_broadcast():
+    world, _ = make_world()
+    network = NetworkManager(world)
+    network.add_client('a')
+    network.add_client('b')
+    sent = {}
+
+    async def send(sid, data):
+        sent[sid] = data
+        # Отключение другого клиента во время рассылки
+        network.remove_client('b')
+
+    asyncio.run(network.broadcast(1, send))
+    assert list(sent) == ['a']
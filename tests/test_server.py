@@ -1,5 +1,20 @@
+import asyncio
+import sqlite3
+import subprocess
+import sys
+
 import pytest
 
+from tanks.game.scheduler import GameScheduler
+from tanks.network.snapshot import KEYFRAME, decode_snapshot
+from tanks.server import socket_manager
+from tanks.server.matchmaking import Matchmaker
+from tanks.server.metrics import render_metrics
+from tanks.server.rooms import JoinError, RoomRegistry
+from tanks.server.sharding import ShardedRoomManager
+from tanks.server.stats import StatsRecorder
+from tanks.world.state import Replay, ReplayRunner, capture_world
+
 
 def test_read_main(client):
     response = client.get("/")
@@ -7,6 +22,14 @@ def test_read_main(client):
     assert response.json() == {'Hello': 'World'}
 
 
+def test_metrics(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert '# TYPE tanks_tick_duration_seconds histogram' in response.text
+    assert '# TYPE tanks_tick_jitter_seconds_max gauge' in response.text
+
+
 @pytest.mark.asyncio
 async def test_root(async_client):
     async with async_client as ac:
@@ -19,3 +42,284 @@ async def test_root(async_client):
 async def test_socketio(socketio_client):
     socketio_client.connect("/", namespaces=[])
     socketio_client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_malformed_snapshot_acks_are_ignored(monkeypatch):
+    sent = []
+
+    async def send(sid, data):
+        sent.append(data)
+
+    rooms = RoomRegistry(GameScheduler(), send)
+    monkeypatch.setattr(socket_manager, 'rooms', rooms)
+    room, _ = rooms.join('a')
+    for _ in range(3):
+        room.game.tick()
+        await rooms.on_tick(room.game)
+    client = room.network.clients['a']
+
+    for tick in (None, {'tick': 2}, 'abc', float('inf'), -1, 99):
+        await socket_manager.snapshot_ack('a', tick)
+    assert client.acked_tick is None
+    await socket_manager.snapshot_ack('a', '2')
+    assert client.acked_tick == 2
+
+
+@pytest.mark.asyncio
+async def test_sharded_rooms_are_placed_on_least_loaded_worker():
+    received = {}
+
+    async def send(sid, data):
+        received.setdefault(sid, []).append(data)
+
+    manager = ShardedRoomManager(workers=2, send=send, tick_rate=100.0, players_per_room=1)
+    await manager.start()
+    try:
+        first = await manager.join_player('a')
+        second = await manager.join_player('b')
+        assert first['room'] != second['room']
+        assert [len(worker.rooms) for worker in manager.workers] == [1, 1]
+
+        await asyncio.sleep(0.2)
+        assert decode_snapshot(received['a'][0])[0] == KEYFRAME
+        assert received['b']
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_sharded_join_fails_instead_of_hanging():
+    async def send(sid, data):
+        pass
+
+    manager = ShardedRoomManager(workers=1, send=send, tick_rate=100.0)
+    await manager.start()
+    try:
+        room_id = manager.create_room()
+        await manager.close_room(room_id)
+        with pytest.raises(JoinError):
+            await manager.join_player('a', room_id)
+
+        # Воркер не знает комнату: он отвечает ошибкой, а учёт игрока откатывается
+        worker = manager.workers[0]
+        manager.room_workers[room_id] = worker
+        manager.room_players[room_id] = 0
+        with pytest.raises(JoinError, match='KeyError'):
+            await manager.join_player('a', room_id)
+        assert 'a' not in manager.by_sid and worker.players == 0 and manager.room_players[room_id] == 0
+
+        worker.process.kill()
+        with pytest.raises(JoinError):
+            await asyncio.wait_for(manager.join_player('b'), 3)
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_matchmaker_pairs_by_skill_and_latency_then_widens():
+    now = 0.0
+    rooms = RoomRegistry(GameScheduler(), send=None)
+    matchmaker = Matchmaker(rooms, match_sizes={'classic': 2, 'territory': 8}, clock=lambda: now)
+    first = matchmaker.enqueue('a', skill=1000, latency=0.02)
+    second = matchmaker.enqueue('b', skill=1050, latency=0.03)
+    strong = matchmaker.enqueue('c', skill=1500, latency=0.02)
+    far = matchmaker.enqueue('d', skill=1000, latency=0.3)
+    few = [matchmaker.enqueue(sid, mode='territory', skill=skill) for sid, skill in (('e', 900), ('f', 1400), ('g', 2000))]
+
+    assert await matchmaker.run_pass() == 1
+    assert (await first)['room'] == (await second)['room']
+    assert not strong.done() and not far.done()
+    # Через skill_widen_after рейтинг не учитывается, но корзины задержки разные
+    now = 9.0
+    assert await matchmaker.run_pass() == 0
+    # Через latency_widen_after не учитывается и задержка, но неполный матч
+    # собирается только из min_sizes игроков (для territory - из четырёх)
+    now = 21.0
+    assert await matchmaker.run_pass() == 1
+    assert (await strong)['room'] == (await far)['room'] != (await first)['room']
+    assert (await far)['mode'] == 'classic' and 'd' in rooms.by_sid
+    assert not any(future.done() for future in few)
+
+    stats = matchmaker.stats()['modes']['classic']
+    assert (stats['queued'], stats['matched'], stats['matches']) == (0, 4, 2)
+    assert stats['wait_max'] == 21.0 and stats['histogram']['+Inf'] == 4
+    assert matchmaker.stats()['modes']['territory']['queued'] == 3
+    assert 'tanks_matchmaking_queue_depth{mode="classic"} 0' in render_metrics(None, {}, matchmaker.stats()['modes'])
+
+    # Комната матча закрывается, когда из неё вышел последний игрок
+    room_id = (await first)['room']
+    rooms.leave('a')
+    assert room_id in rooms.rooms
+    rooms.leave('b')
+    assert room_id not in rooms.rooms and room_id not in rooms.reserved
+
+
+@pytest.mark.asyncio
+async def test_duel_bracket_advances_on_room_results():
+    now = 0.0
+    notified = []
+
+    async def notify(sid, data):
+        notified.append((sid, data))
+
+    async def send(sid, data):
+        pass
+
+    rooms = RoomRegistry(GameScheduler(), send)
+    matchmaker = Matchmaker(rooms, notify=notify, match_sizes={'duel': 4}, clock=lambda: now)
+    futures = {sid: matchmaker.enqueue(sid, mode='duel', skill=skill)
+               for sid, skill in (('weak', 1100), ('best', 1300), ('mid', 1200))}
+    assert await matchmaker.run_pass() == 0
+    now = 21.0
+    assert await matchmaker.run_pass() == 1
+
+    # Сильнейший против слабейшего, средний проходит без боя
+    assert (await futures['mid'])['room'] is None
+    duel_room = (await futures['best'])['room']
+    assert (await futures['weak'])['room'] == duel_room
+
+    async def finish(room_id, loser):
+        room = rooms.rooms[room_id]
+        room.players[loser].damage(100)
+        room.game.tick()
+        await rooms.on_tick(room.game)
+        await asyncio.gather(*matchmaker._background)
+
+    await finish(duel_room, 'weak')
+    assert sorted(sid for sid, _ in notified) == ['best', 'mid']
+    final_room = notified[0][1]['room']
+    assert final_room != duel_room and rooms.by_sid['mid'].room_id == final_room
+
+    await finish(final_room, 'best')
+    assert notified[-1] == ('mid', {'mode': 'duel', 'champion': True})
+    assert matchmaker.stats()['brackets_finished'] == 1 and matchmaker.duels == {}
+    # Комнаты сыгранных дуэлей закрыты и сняты с планировщика
+    await asyncio.gather(*rooms._closing)
+    assert rooms.rooms == {} and rooms.scheduler.games == {}
+
+
+@pytest.mark.asyncio
+async def test_plain_join_does_not_enter_duel_rooms():
+    async def send(sid, data):
+        pass
+
+    rooms = RoomRegistry(GameScheduler(), send)
+    matchmaker = Matchmaker(rooms, match_sizes={'duel': 4})
+    futures = [matchmaker.enqueue(sid, mode='duel', skill=skill)
+               for sid, skill in (('a', 1000), ('b', 1010), ('c', 1020), ('d', 1030))]
+    assert await matchmaker.run_pass() == 1
+    await asyncio.gather(*futures)
+
+    # Обычный вход получает свою комнату, а не одну из дуэлей сетки
+    room, _ = rooms.join('plain')
+    assert room.room_id not in matchmaker.duels and rooms.default_room() is room
+    assert [len(rooms.rooms[room_id].players) for room_id in matchmaker.duels] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_kills_and_match_results_are_written_in_batches(tmp_path):
+    async def send(sid, data):
+        pass
+
+    recorder = StatsRecorder(tmp_path / 'stats.db', flush_interval=60.0, batch_size=2)
+    recorder.start()
+    rooms = RoomRegistry(GameScheduler(), send, mode='classic', recorder=recorder)
+    room = rooms.create_room()
+    rooms.join('a', room)
+    rooms.join('b', room)
+    shooter, target = room.players['a'], room.players['b']
+    target.damage(30, shooter)
+    target.damage(80, shooter)
+    room.game.tick()
+    await rooms.on_tick(room.game)
+    # Тик только поставил события в очередь: запись - при остановке потока
+    assert recorder.stats()['pending'] == 3
+    recorder.stop()
+
+    assert recorder.stats()['written'] == 3 and recorder.stats()['batches'] == 2
+    assert recorder.leaderboard('kills') == [
+        {'player': 'a', 'kills': 1, 'deaths': 0, 'damage_dealt': 110, 'damage_taken': 0, 'matches': 1, 'wins': 1},
+        {'player': 'b', 'kills': 0, 'deaths': 1, 'damage_dealt': 0, 'damage_taken': 110, 'matches': 1, 'wins': 0},
+    ]
+    [match] = recorder.recent_matches()
+    assert (match['mode'], match['winner'], match['players']) == ('classic', 'a', 2)
+    with pytest.raises(ValueError):
+        recorder.leaderboard('deaths')
+
+
+@pytest.mark.asyncio
+async def test_room_match_is_recorded_with_joins_and_leaves(tmp_path):
+    async def send(sid, data):
+        pass
+
+    from tanks.game.game import Game
+    from tanks.game.modes import MODES
+
+    rooms = RoomRegistry(GameScheduler(), send, mode='apocalypse', replay_dir=tmp_path)
+    room = rooms.create_room()
+    game = room.game
+    for tick in range(1, 91):
+        if tick in (1, 20, 40):
+            rooms.join(f'player-{tick}', room)
+        if tick == 60:
+            rooms.leave('player-20')
+        for index, sid in enumerate(room.players):
+            rooms.input(sid, {'seq': tick, 'tracks': [1.0, 0.5 - index], 'shoot': tick % 15 == index})
+        game.tick()
+        await rooms.on_tick(game)
+    expected = capture_world(game.world, game.tick_count).checksum()
+    await rooms.close_room(room.room_id)
+
+    [path] = tmp_path.iterdir()
+    replay = Replay.from_bytes(path.read_bytes())
+    commands = {command for entries in replay.inputs.entries.values() for _, command, _ in entries}
+    assert {'spawn', 'remove', 'set_tracks', 'shoot'} <= commands
+    assert replay.last_tick == 90
+
+    # Правила режима (огонь апокалипсиса) воспроизводит игра с тем же режимом
+    replay_game = Game(mode=MODES['apocalypse']())
+    runner = ReplayRunner(replay, replay_game.world, replay_game)
+    assert runner.run() == []
+    assert capture_world(replay_game.world, runner.tick).checksum() == expected
+
+
+def test_stats_writer_survives_failed_batches(tmp_path, monkeypatch):
+    recorder = StatsRecorder(tmp_path / 'stats.db', flush_interval=0.01)
+    write = recorder._write
+    failures = []
+
+    def flaky_write(db, batch):
+        if not failures:
+            failures.append(len(batch))
+            raise sqlite3.OperationalError('database is locked')
+        write(db, batch)
+
+    monkeypatch.setattr(recorder, '_write', flaky_write)
+    recorder.start()
+    recorder.damage(1, 1, 'a', 'b', 10, False)
+    recorder.stop()
+    # Неудавшаяся пачка вернулась в очередь и записана следующим проходом
+    stats = recorder.stats()
+    assert failures == [1]
+    assert (stats['errors'], stats['written'], stats['pending']) == (1, 1, 0)
+    assert 'database is locked' in stats['last_error']
+    assert recorder.player('a')['damage_dealt'] == 10
+
+    # Кэш чтений ограничен: запросы несуществующих игроков не копятся
+    recorder.cache_size = 4
+    for index in range(10):
+        assert recorder.player(f'nobody-{index}') is None
+    assert recorder.stats()['cached'] == 4
+
+
+def test_game_modules_are_imported_with_first_room():
+    code = (
+        'import sys\n'
+        'from tanks.server import create_server\n'
+        'create_server()\n'
+        'assert "tanks.game.game" not in sys.modules and "numpy" not in sys.modules\n'
+        'create_server(preload=True)\n'
+        'assert "tanks.game.game" in sys.modules\n'
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
@@ -0,0 +1,585 @@
+import random
+from math import pi
+from uuid import UUID
+
+import pytest
+
+from tanks.entity.base import BaseEntity, VelocityMixin
+from tanks.entity.tank import Tank
+from tanks.entity.tank_bot import TankBot
+from tanks.entity.tank_shell import TankShell
+from tanks.world.base import EntityManager
+from tanks.world.lag import LagCompensator
+from tanks.world.state import (
+    Replay, ReplayRecorder, ReplayRunner, SnapshotRing, WorldSnapshot, capture_world, restore_world,
+)
+from tanks.world.navigation import Navigator, find_path
+from tanks.world.tilemap import Tile, TileMap, map_asset
+from tanks.world.world import World
+
+
+class RecordingEntity(VelocityMixin, BaseEntity):
+    def __init__(self, log: list, **kwargs) -> None:
+        super().__init__(friction=0.0, **kwargs)
+        self.log = log
+
+    def on_collision(self, other: BaseEntity) -> None:
+        self.log.append((self.uuid, other.uuid))
+
+
+class BruteForceEntityManager(EntityManager):
+    def candidate_pairs(self):
+        entities = list(self.entities.values())
+        return [(first, second) for i, first in enumerate(entities) for second in entities[i + 1:]]
+
+
+def simulate(entity_manager: EntityManager, seed: int, ticks: int = 20) -> list:
+    rng = random.Random(seed)
+    world = World(width=60.0, height=60.0)
+    world.entity_manager = entity_manager
+    log = []
+
+    for i in range(150):
+        entity = RecordingEntity(
+            log=log,
+            x=rng.uniform(0, 60),
+            y=rng.uniform(0, 60),
+            world=world,
+            entity_id=UUID(int=i),
+            size=rng.choice([0.2, 1.0, 3.0, 6.0]),
+        )
+        entity.velocity_x = rng.uniform(-2, 2)
+        entity.velocity_y = rng.uniform(-2, 2)
+        world.add_entity(entity)
+
+    for _ in range(ticks):
+        world.tick()
+    return log
+
+
+def test_spatial_hash_matches_brute_force():
+    for seed in range(3):
+        expected = simulate(BruteForceEntityManager(), seed)
+        assert expected
+        assert simulate(EntityManager(), seed) == expected
+
+
+def test_spatial_hash_tracks_moves_and_removal():
+    world = World()
+    first = RecordingEntity(log=[], x=10.0, y=10.0, world=world)
+    second = RecordingEntity(log=[], x=50.0, y=50.0, world=world)
+    world.add_entity(first)
+    world.add_entity(second)
+
+    assert world.entity_manager.candidate_pairs() == []
+
+    first.velocity_x = first.velocity_y = 40.0
+    first.apply_velocity()
+    assert [set(pair) for pair in world.entity_manager.candidate_pairs()] == [{first, second}]
+
+    world.remove_entity(second)
+    assert world.entity_manager.candidate_pairs() == []
+    assert second not in world.entity_manager.spatial_hash
+
+
+def test_contacts_are_unique_pairs_filtered_by_layer():
+    world = World()
+    log = []
+    first = RecordingEntity(log=log, x=10.0, y=10.0, world=world, size=3.0)
+    second = RecordingEntity(log=log, x=12.0, y=10.0, world=world, size=3.0)
+    left = Tank(x=40.0, y=40.0, world=world)
+    right = Tank(x=41.0, y=40.0, world=world)
+    for entity in (first, second, left, right):
+        world.add_entity(entity)
+    shells = [
+        TankShell(x=70.0, y=70.0 + i * 0.1, angle=0.0, velocity=0.0, world=world, creator=left)
+        for i in range(2)
+    ]
+    for shell in shells:
+        world.add_entity(shell)
+
+    contacts = world.entity_manager.find_contacts()
+    assert contacts == [(first, second), (left, right)]
+
+    world.collide()
+    assert log == [(first.uuid, second.uuid), (second.uuid, first.uuid)]
+    # Отталкивание применяется к каждому танку один раз и симметрично
+    assert left.velocity_x == pytest.approx(-right.velocity_x)
+    assert left.velocity_x < 0
+    assert not any(shell._removed for shell in shells)
+
+
+def test_fast_shell_does_not_tunnel_through_tank():
+    world = World(width=200.0, height=200.0)
+    shooter = Tank(x=20.0, y=50.0, world=world)
+    near = Tank(x=53.0, y=50.0, world=world)
+    far = Tank(x=60.0, y=50.0, world=world)
+    for tank in (shooter, near, far):
+        world.add_entity(tank)
+    # За тик снаряд пролетает 20 единиц: из 40 в 60, насквозь через near
+    shell = TankShell(x=40.0, y=50.0, angle=0.0, velocity=10.0, world=world, creator=shooter)
+    world.add_entity(shell)
+
+    world.tick()
+    assert shell._removed
+    assert near.health < far.health == shooter.health
+    # Снаряд остановлен в точке первого касания
+    assert shell.x == pytest.approx(near.x - near.size - shell.size)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_lagged_shell_hits_target_where_shooter_saw_it(vectorized):
+    world = World(width=200.0, height=200.0, vectorized=vectorized)
+    shooter = Tank(x=50.0, y=50.0, world=world)
+    target = Tank(x=50.0, y=60.0, world=world)
+    bystander = Tank(x=150.0, y=150.0, world=world)
+    for tank in (shooter, target, bystander):
+        world.add_entity(tank)
+    shooter.angle = pi / 2
+    world.tick()
+    world.tick()
+
+    # Цель ушла с линии огня, но стрелок видел её на месте тик назад
+    target.x = 56.0
+    bystander.x = 140.0
+    world.entity_manager.update_entity(target)
+    world.entity_manager.update_entity(bystander)
+    shooter.set_view_lag(1)
+    shooter.shoot()
+    world.tick()
+    assert target.health == 90
+    assert (target.x, target.y) == (56.0, 60.0)
+    assert bystander.x == 140.0
+    assert world.entity_manager.lag_compensator.stats() == {'tracked': 3, 'rewinds': 1}
+
+    # Без задержки тот же выстрел проходит мимо
+    shooter.reload_timer = 0
+    shooter.set_view_lag(0)
+    shooter.shoot()
+    for _ in range(3):
+        world.tick()
+    assert target.health == 90
+
+
+def test_lag_history_ring_wraps_and_reuses_rows():
+    world = World()
+    tanks = [Tank(x=10.0 * i, y=10.0, world=world) for i in range(1, 4)]
+    compensator = LagCompensator(capacity=3, rows=1)
+    for tank in tanks[:2]:
+        compensator.track(tank)
+    for step in range(5):
+        for tank in tanks[:2]:
+            tank.y = 10.0 + step
+        compensator.record()
+    compensator.track(tanks[2])
+
+    for tank in tanks:
+        tank.y = 0.0
+    saved = compensator.rewind(tanks, 1)
+    # Хранятся только три последних тика; у новой сущности истории ещё нет
+    assert [tank.y for tank in tanks] == [13.0, 13.0, 0.0]
+    compensator.restore(saved)
+    compensator.rewind(tanks[:1], 10)
+    assert tanks[0].y == 12.0
+    compensator.restore(saved)
+    assert [tank.y for tank in tanks] == [0.0, 0.0, 0.0]
+
+    compensator.untrack(tanks[0])
+    compensator.track(tanks[0])
+    assert compensator.rows[tanks[0].id] != compensator.rows[tanks[2].id]
+    assert compensator.rewind(tanks[:1], 0) == []
+
+
+def build_tanks(vectorized: bool) -> World:
+    world = World(width=1000.0, height=1000.0, vectorized=vectorized)
+    for i in range(20):
+        tank = Tank(x=50.0 + i * 40.0, y=500.0, world=world, entity_id=UUID(int=i))
+        tank.set_tracks(left=1.0 - i * 0.1, right=-1.0 + i * 0.1)
+        world.add_entity(tank)
+    return world
+
+
+def test_vectorized_physics_matches_scalar():
+    pytest.importorskip('numpy')
+
+    scalar = build_tanks(vectorized=False)
+    vectorized = build_tanks(vectorized=True)
+    for world in (scalar, vectorized):
+        for tank in list(world.entity_manager.entities.values()):
+            if tank.uuid.int % 4 == 0:
+                tank.shoot()
+
+    for _ in range(15):
+        scalar.tick()
+        vectorized.tick()
+
+    expected_entities = list(scalar.entity_manager.entities.values())
+    actual_entities = list(vectorized.entity_manager.entities.values())
+    # Все пять снарядов попадают в соседние танки, а не пролетают сквозь них
+    assert len(actual_entities) == len(expected_entities) == 20
+    for expected, actual in zip(expected_entities, actual_entities):
+        assert actual.physics_batched
+        assert actual.x == pytest.approx(expected.x)
+        assert actual.y == pytest.approx(expected.y)
+        assert actual.velocity_x == pytest.approx(expected.velocity_x)
+        assert actual.health == expected.health
+        if isinstance(expected, Tank):
+            assert actual.angle == pytest.approx(expected.angle)
+
+
+def test_vectorized_entity_is_restored_on_remove():
+    pytest.importorskip('numpy')
+
+    world = build_tanks(vectorized=True)
+    first, second, *_ = world.entity_manager.entities.values()
+    last = list(world.entity_manager.entities.values())[-1]
+    world.tick()
+
+    x = first.x
+    world.remove_entity(first)
+    assert type(first) is Tank
+    assert first.x == x
+    assert last._row == 0
+
+    second.x = 123.0
+    assert world.entity_manager.physics.state[0, second._row] == 123.0
+
+
+def test_entities_are_slotted_with_integer_ids():
+    world = World()
+    first = Tank(x=10.0, y=10.0, world=world)
+    second = TankBot(x=20.0, y=20.0, world=world)
+
+    assert not hasattr(first, '__dict__') and not hasattr(second, '__dict__')
+    assert second.id == first.id + 1
+    assert first._uuid is None
+    assert first.uuid == first.uuid
+
+
+def test_shells_are_recycled_through_pool():
+    world = World()
+    tank = Tank(x=50.0, y=50.0, world=world)
+    world.add_entity(tank)
+    pool = world.entity_manager.shell_pool
+
+    tank.shoot()
+    first = next(entity for entity in world.entity_manager.entities.values() if entity is not tank)
+    first_id = first.id
+    first.remove()
+    tank.reload_timer = 0
+    tank.shoot()
+    assert pool.stats()['misses'] == 2
+
+    world.tick()
+    second = next(entity for entity in world.entity_manager.entities.values() if entity is not tank)
+    second.remove()
+    world.tick()
+    tank.reload_timer = 0
+    tank.shoot()
+
+    reused = next(entity for entity in world.entity_manager.entities.values() if entity is not tank)
+    assert reused in (first, second)
+    assert reused.id != first_id and not reused._removed
+    assert pool.stats()['hits'] == 1
+
+
+def test_target_index_matches_brute_force():
+    rng = random.Random(1)
+    world = World(width=500.0, height=500.0)
+    bots = []
+    for _ in range(120):
+        bot = TankBot(x=rng.uniform(0, 500), y=rng.uniform(0, 500), world=world)
+        world.add_entity(bot)
+        bots.append(bot)
+
+    for bot in bots:
+        expected = min(
+            (other for other in bots if other is not bot),
+            key=lambda other: (other.x - bot.x) ** 2 + (other.y - bot.y) ** 2,
+        )
+        assert bot.find_nearest_player() is expected
+
+    index = world.entity_manager.target_index
+    assert index.nearest(-1000.0, -1000.0, radius=10.0) is None
+    lonely = bots[0]
+    assert index.nearest(lonely.x, lonely.y, radius=0.5) is lonely
+
+
+def test_bot_targets_are_resolved_in_batch():
+    world = World()
+    bot = TankBot(x=10.0, y=10.0, world=world)
+    tank = Tank(x=60.0, y=60.0, world=world)
+    world.add_entity(bot)
+    world.add_entity(tank)
+
+    for _ in range(bot.update_target_interval - 1):
+        world.tick()
+    assert bot.target is None
+    assert bot.target_update_due()
+
+    world.tick()
+    assert bot.target is tank
+    assert not world.entity_manager.target_index.resolved
+
+
+def test_spawns_and_despawns_are_applied_after_tick():
+    world = World()
+    manager = world.entity_manager
+    tank = Tank(x=50.0, y=50.0, world=world)
+    victim = Tank(x=20.0, y=20.0, world=world)
+    world.add_entity(tank)
+    world.add_entity(victim)
+
+    with manager.deferred():
+        shell = manager.spawn_shell(x=52.0, y=50.0, angle=0.0, velocity=1.0, creator=tank)
+        victim.remove()
+        assert shell.id not in manager.entities
+        assert victim.id in manager.entities and victim._removed
+
+        short_lived = manager.spawn_shell(x=52.0, y=50.0, angle=0.0, velocity=1.0, creator=tank)
+        short_lived.remove()
+
+    assert shell.id in manager.entities and shell in manager.spatial_hash
+    assert victim.id not in manager.entities and victim not in manager.spatial_hash
+    assert short_lived.id not in manager.entities
+
+    # Бот стреляет посреди тика, а словарь сущностей обходится без копирования
+    bot = TankBot(x=40.0, y=50.0, world=world)
+    world.add_entity(bot)
+    for _ in range(120):
+        world.tick()
+    assert manager.shell_pool.stats()['hits'] > 0
+
+
+def build_match(vectorized: bool = False) -> World:
+    world = World(width=120.0, height=120.0, vectorized=vectorized)
+    rng = random.Random(3)
+    for _ in range(10):
+        world.add_entity(Tank(x=rng.uniform(10, 110), y=rng.uniform(10, 110), world=world))
+    for _ in range(10):
+        world.add_entity(TankBot(x=rng.uniform(10, 110), y=rng.uniform(10, 110), world=world))
+    return world
+
+
+def test_snapshot_ring_rewinds_world():
+    world = build_match()
+    ring = SnapshotRing(capacity=8)
+    for tick in range(1, 41):
+        world.tick()
+        ring.push(capture_world(world, tick))
+
+    assert ring.get(32) is None
+    expected = ring.get(35)
+    ring.rewind(world, 35)
+    assert capture_world(world, 35).checksum() == expected.checksum()
+
+    # После отката симуляция повторяется тик в тик
+    for tick in range(36, 41):
+        world.tick()
+        assert capture_world(world, tick).checksum() == ring.get(tick).checksum()
+
+    restored = WorldSnapshot.from_bytes(expected.to_bytes())
+    assert restored.checksum() == expected.checksum()
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_replay_reproduces_recorded_match(vectorized):
+    if vectorized:
+        pytest.importorskip('numpy')
+
+    world = build_match(vectorized)
+    recorder = ReplayRecorder(world, checksum_interval=5)
+    tanks = [entity for entity in world.entity_manager.entities.values() if type(entity) is Tank]
+    rng = random.Random(4)
+    for tick in range(1, 121):
+        for tank in tanks:
+            if tank._removed:
+                continue
+            if rng.random() < 0.2:
+                left, right = rng.uniform(-1, 1), rng.uniform(-1, 1)
+                tank.set_tracks(left, right)
+                recorder.record_input(tick, tank.id, 'set_tracks', left, right)
+            if rng.random() < 0.1:
+                tank.shoot()
+                recorder.record_input(tick, tank.id, 'shoot')
+        world.tick()
+        recorder.end_tick(tick)
+
+    replay = Replay.from_bytes(recorder.replay.to_bytes())
+    runner = ReplayRunner(replay, World(width=120.0, height=120.0, vectorized=vectorized))
+    assert runner.run() == []
+    assert runner.tick == 120
+    assert capture_world(runner.world, 120).checksum() == capture_world(world, 120).checksum()
+
+
+def test_tilemap_stops_shells_and_pushes_tanks_out(tmp_path):
+    rows = ['.' * 20] * 10
+    rows = [row[:10] + '+' + row[11:15] + '#' + row[16:] for row in rows]
+    TileMap.from_rows(rows).save(tmp_path / 'arena.map')
+    tilemap = TileMap.load(tmp_path / 'arena.map')
+    assert (tilemap.width, tilemap.height) == (20, 10)
+    assert [tilemap.clearance[5 * 20 + tx] for tx in (0, 7, 10, 12, 18)] == [8, 3, 0, 2, 3]
+    assert tilemap.raycast(2.5, 2.5, 19.5, 2.5) == (pytest.approx(7.5 / 17), 10, 2)
+    assert tilemap.raycast(2.5, 2.5, 9.5, 8.5) is None
+
+    world = World(tilemap=tilemap)
+    assert (world.width, world.height) == (20.0, 10.0)
+    shooter = Tank(x=3.0, y=5.0, world=world)
+    behind = Tank(x=12.5, y=5.0, world=world)
+    stuck = Tank(x=15.4, y=2.0, world=world)
+    for tank in (shooter, behind, stuck):
+        world.add_entity(tank)
+    shell = TankShell(x=6.0, y=5.0, angle=0.0, velocity=10.0, world=world, creator=shooter)
+    world.add_entity(shell)
+    before = capture_world(world, 0)
+
+    world.tick()
+    # Снаряд разрушил кирпич на пути и не задел танк за ним
+    assert shell._removed
+    assert behind.health == 100
+    assert tilemap.get(10, 5) == Tile.EMPTY
+    # Танк вытолкнут из стены через ближайшую сторону
+    assert stuck.x == pytest.approx(14.0)
+    assert tilemap.push_out(stuck.x, stuck.y, stuck.size) is None
+
+    restore_world(world, before)
+    assert tilemap.get(10, 5) == Tile.BRICK
+    # Разрушения не попадают в файл карты
+    assert TileMap.load(tmp_path / 'arena.map').get(10, 5) == Tile.BRICK
+
+
+def test_map_asset_gives_rooms_independent_copies(tmp_path):
+    TileMap.from_rows(['..+..', '.....']).save(tmp_path / 'arena.map')
+    asset = map_asset(tmp_path / 'arena.map')
+    assert map_asset(str(tmp_path / 'arena.map')) is asset
+    first = asset.instantiate()
+    second = asset.instantiate()
+    assert first.damage(2, 0)
+    assert first.get(2, 0) == Tile.EMPTY
+    assert second.get(2, 0) == Tile.BRICK
+    assert asset.instantiate().get(2, 0) == Tile.BRICK
+
+    (tmp_path / 'broken.map').write_bytes((tmp_path / 'arena.map').read_bytes()[:-3])
+    with pytest.raises(ValueError):
+        map_asset(tmp_path / 'broken.map')
+
+
+def test_tilemap_clearance_is_updated_incrementally():
+    tilemap = TileMap.from_rows(['.' * 30] * 30)
+    tilemap.set(20, 20, Tile.WALL)
+    expected = TileMap.from_rows(['.' * 30] * 20 + ['.' * 20 + '#' + '.' * 9] + ['.' * 30] * 9)
+    assert bytes(tilemap.clearance) == bytes(expected.clearance)
+    assert tilemap.push_out(20.5, 19.5, 1.0) == (20.5, 19.0, 20, 20)
+    assert tilemap.push_out(20.5, 18.9, 1.0) is None
+    assert tilemap.push_out(10.5, 10.5, 1.0) is None
+
+
+def test_destroyed_wall_opens_route():
+    tilemap = TileMap.from_rows(['....+.....'] * 10)
+    assert find_path(tilemap, (0, 5), (9, 5), 1)[0] is None
+    for ty in range(10):
+        assert tilemap.damage(4, ty)
+    # Зазоры вокруг разрушенной стены такие же, как у карты, построенной без неё
+    assert bytes(tilemap.clearance) == bytes(TileMap.from_rows(['.' * 10] * 10).clearance)
+    path, _ = find_path(tilemap, (0, 5), (9, 5), 1)
+    assert path is not None and path[-1] == (9, 5)
+
+
+def build_walled_world() -> World:
+    # Стена поперёк карты с проходом внизу
+    rows = ['.' * 15 + ('#' if y < 15 else '.') + '.' * 14 for y in range(20)]
+    return World(tilemap=TileMap.from_rows(rows))
+
+
+def test_bot_follows_route_around_wall():
+    world = build_walled_world()
+    world.add_entity(Tank(x=25.0, y=5.0, world=world))
+    bot = TankBot(x=5.0, y=3.0, world=world)
+    world.add_entity(bot)
+
+    positions = []
+    for _ in range(30):
+        world.tick()
+        positions.append((bot.x, bot.y))
+    # Бот объехал стену через проход, а не упёрся в неё
+    assert any(x > 16.0 for x, _ in positions)
+    assert not any(14.5 < x < 16.5 and y < 14.5 for x, y in positions)
+    assert world.entity_manager.navigator.stats()['searches'] == 1
+
+
+def test_navigator_shares_flow_fields_caches_and_respects_budget():
+    world = build_walled_world()
+    target = Tank(x=25.0, y=5.0, world=world)
+    bots = [TankBot(x=5.0, y=2.0 + i * 3.0, world=world) for i in range(4)]
+    for bot in bots:
+        bot.target = target
+
+    navigator = Navigator(world.tilemap, budget=1, flow_field_agents=4)
+    navigator.resolve(bots)
+    assert navigator.flow_fields == 1
+    assert all(bot.route[-1] == (25, 5) and bot.route_wait == 0 for bot in bots)
+    assert all(any(ty >= 15 for _, ty in bot.route) for bot in bots)
+
+    # Одиночные поиски: бюджет в 1 раскрытие пропускает один запрос за тик
+    navigator.flow_field_agents = 5
+    for bot in bots:
+        bot.route = ()
+    navigator.resolve(bots[:2])
+    assert navigator.cache_hits == 2 and navigator.searches == 0
+    world.tilemap.set(0, 0, Tile.WALL)
+    for bot in bots[:2]:
+        bot.route = ()
+    navigator.resolve(bots[:2])
+    assert (navigator.searches, bots[0].route_wait, bots[1].route_wait) == (1, 0, 1)
+    assert not bots[1].route
+    navigator.resolve(bots[1:2])
+    assert bots[1].route and navigator.searches == 2
+
+
+def test_ai_scheduler_staggers_and_budgets_bot_decisions():
+    world = World(width=400.0, height=400.0)
+    world.add_entity(Tank(x=20.0, y=20.0, world=world))
+    near = [TankBot(x=30.0 + i, y=30.0, world=world) for i in range(3)]
+    # Боты тоже цели, поэтому дальние стоят далеко и друг от друга
+    far = [TankBot(x=250.0 + i * 60.0, y=300.0, world=world) for i in range(3)]
+    for bot in near + far:
+        world.add_entity(bot)
+    ai = world.entity_manager.ai
+
+    for _ in range(20):
+        world.tick()
+    assert all(bot.think_interval == ai.near_interval for bot in near)
+    assert all(bot.think_interval == ai.far_interval for bot in far)
+
+    before = {bot.id: bot.think_wait for bot in far}
+    thinks = ai.thinks
+    for _ in range(ai.far_interval):
+        world.tick()
+    # Дальние боты решили по разу за период, ближние - каждый тик
+    assert ai.thinks - thinks == len(near) * ai.far_interval + len(far)
+    assert {bot.id: bot.think_wait for bot in far} == before
+
+    ai.budget = 2
+    thinking = ai.select(world.entity_manager.seekers.values())
+    assert len(thinking) == 2 and ai.deferred > 0
+
+
+def test_batched_bot_decisions_match_scalar():
+    pytest.importorskip('numpy')
+    world = World(width=200.0, height=200.0, vectorized=True)
+    rng = random.Random(5)
+    bots = []
+    for _ in range(40):
+        bot = TankBot(x=rng.uniform(0, 200), y=rng.uniform(0, 200), world=world)
+        world.add_entity(bot)
+        bots.append(bot)
+    for bot in bots:
+        bot.target = bots[(bots.index(bot) + 7) % len(bots)]
+
+    world.entity_manager.ai.think(bots, world.entity_manager.physics)
+    batched = [value for bot in bots for value in (bot.heading, bot.target_angle, bot.target_distance)]
+    for bot in bots:
+        bot.think()
+    assert batched == pytest.approx([
+        value for bot in bots for value in (bot.heading, bot.target_angle, bot.target_distance)
+    ])